@@ -1,3 +1,5 @@
+import logging
+
 import pygame
 
 from sim.body import DestroyablePressurizedSoftBody, PressurizedSoftBody
@@ -7,10 +9,10 @@ from sim.sim import Simulation, SimulationConfig
 from sim.spring import Spring
 
 
-def build():
+def build(sides=12):
     poppable_ball = DestroyablePressurizedSoftBody(
         pos=pygame.Vector2(WIDTH / 2 - 300, HEIGHT / 2),
-        sides=12,
+        sides=sides,
         initial_radius=50,
         pressure_force=500_000,
         spring_force=20,
@@ -22,7 +24,7 @@ def build():
     )
     inflated_ball = PressurizedSoftBody(
         pos=pygame.Vector2(WIDTH / 2 - 200, HEIGHT / 2),
-        sides=12,
+        sides=sides,
         initial_radius=50,
         pressure_force=500_000,
         spring_force=20,
@@ -32,7 +34,7 @@ def build():
     )
     deflated_ball = PressurizedSoftBody(
         pos=pygame.Vector2(WIDTH / 2, HEIGHT / 2),
-        sides=12,
+        sides=sides,
         initial_radius=50,
         pressure_force=75_000,
         spring_force=20,
@@ -42,7 +44,7 @@ def build():
     )
     balloon = PressurizedSoftBody(
         pos=pygame.Vector2(WIDTH / 2 + 200, HEIGHT / 2 - 100),
-        sides=12,
+        sides=sides,
         initial_radius=50,
         pressure_force=400_000,
         spring_force=20,
@@ -56,20 +58,22 @@ def build():
     return nodes, springs, [poppable_ball, inflated_ball, deflated_ball, balloon]
 
 
-config = SimulationConfig(
-    width=WIDTH, height=HEIGHT, fps=FPS, substeps=SUBSTEPS, background_color=BG_COLOR, debug_font_size=DEBUG_FONT
-)
-pygame.init()
-display = pygame.display.set_mode((config.width, config.height))
-pygame.display.set_caption("Pressurized Balls Demo")
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")  # debug and cProfile reports
+    config = SimulationConfig(
+        width=WIDTH, height=HEIGHT, fps=FPS, substeps=SUBSTEPS, background_color=BG_COLOR, debug_font_size=DEBUG_FONT
+    )
+    pygame.init()
+    display = pygame.display.set_mode((config.width, config.height))
+    pygame.display.set_caption("Pressurized Balls Demo")
 
-nodes, springs, bodies = build()
-sim = Simulation(
-    display,
-    config=config,
-    nodes=nodes,
-    springs=springs,
-    bodies=bodies,
-    debug=True,
-)
-sim.simulate()
+    nodes, springs, bodies = build()
+    sim = Simulation(
+        display,
+        config=config,
+        nodes=nodes,
+        springs=springs,
+        bodies=bodies,
+        debug=True,
+    )
+    sim.simulate()
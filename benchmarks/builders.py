@@ -0,0 +1,65 @@
+"""
+Building scenes from arrays against building them from objects.
+
+Builds the tearable cloth at growing sizes twice: node by node with the Node and Spring objects of
+cloth.build (gathered into a Scene), and in one shot with the vectorized cloth builder of
+sim.builders, which never creates an object. The largest size is about a million springs.
+Then checks that both scenes of the smallest size hold the same state, and steps the largest
+built scene a few ticks to show it goes straight into the array engines.
+
+Run from the repository root:
+    python -m benchmarks.builders
+    python -m benchmarks.builders --sizes 100 300 --object-limit 300
+"""
+
+import argparse
+from time import perf_counter
+
+import numpy as np
+
+import cloth
+from sim.headless import HeadlessSimulation
+from sim.scene import Scene
+from sim.sim import SimulationConfig
+
+
+def timed(function):
+    start = perf_counter()
+    result = function()
+    return result, (perf_counter() - start) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 100, 200, 400, 708], help="rows and columns")
+    parser.add_argument("--object-limit", type=int, default=200, help="largest size to also build from objects")
+    parser.add_argument("--ticks", type=int, default=5, help="ticks to step the largest scene")
+    args = parser.parse_args(argv)
+
+    print(f"{'size':>5} {'nodes':>9} {'springs':>9} {'arrays ms':>10} {'objects ms':>11} {'speedup':>8}")
+    for size in args.sizes:
+        options = dict(rows=size, cols=size, node_distance_x=4, node_distance_y=4)
+        scene, array_time = timed(lambda: cloth.build_scene(**options))
+        object_time = float("nan")
+        if size <= args.object_limit:
+            _, object_time = timed(lambda: Scene.from_objects(*cloth.build(**options), []))
+        print(
+            f"{size:>5} {scene.nodes.size:>9} {scene.springs.size:>9} {array_time:>10.1f} {object_time:>11.1f}"
+            f" {object_time / array_time:>8.1f}",
+            flush=True,
+        )
+
+    # Both ways give the same state
+    options = dict(rows=args.sizes[0], cols=args.sizes[0])
+    built, gathered = cloth.build_scene(**options), Scene.from_objects(*cloth.build(**options), [])
+    for store in ("nodes", "springs"):
+        for name in type(getattr(built, store)).FIELDS:
+            assert np.array_equal(getattr(getattr(built, store), name), getattr(getattr(gathered, store), name)), name
+
+    sim = HeadlessSimulation.from_scene(scene, SimulationConfig(substeps=1))
+    _, tick_time = timed(lambda: sim.run(args.ticks))
+    print(f"{scene.springs.size} springs: {tick_time / args.ticks:.1f} ms/tick")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Memory and attribute access cost of the Node and Spring objects of a large cloth.
+
+Builds a cloth of about 100k springs (224 x 224 nodes by default) and reports, through
+tracemalloc, the memory held by the objects alone and after an engine gathered them, the peak
+reached on the way, the size of a single node and spring, and the time to read a few attributes
+from every object.
+
+The same cloth is then copied into BaselineNode and BaselineSpring, the objects as they were
+before __slots__ and the engine arrays: an attribute dictionary each, their own pygame.Vector2
+position, velocity and force and their own colors. Both are reported side by side.
+
+Run from the repository root:
+    python -m benchmarks.memory
+    python -m benchmarks.memory --size 100
+"""
+
+import argparse
+import gc
+import sys
+import tracemalloc
+from time import perf_counter
+
+import pygame
+
+from benchmarks.scenes import build_cloth
+from sim.constants import COLOR_1, COLOR_2, NODE_RADIUS, SPRING_COLOR, SPRING_WIDTH
+from sim.headless import HeadlessSimulation
+
+
+class BaselineNode:
+    # The attributes a Node held in its __dict__ before __slots__ and the engine arrays
+    def __init__(self, node):
+        self.pos = pygame.Vector2(node.pos)
+        self.mass = node.mass
+        self.vel = pygame.Vector2(node.vel)
+        self.gravity = node.gravity
+        self.radius = NODE_RADIUS
+        self.elasticity = node.elasticity
+        self.friction = node.friction
+        self.color = node.color
+        self.dragging_color = node.dragging_color
+        self.draggable = node.draggable
+        self.static = node.static
+        self.static_color = node.static_color
+        self.dragging = False
+
+
+class BaselineSpring:
+    # The attributes a ColorizedDestroyableSpring held in its __dict__ before the material tables
+    def __init__(self, spring, point1, point2):
+        self.point1 = point1
+        self.point2 = point2
+        self.force = spring.force
+        self.desired_length = spring.desired_length
+        self.damping = spring.damping
+        self.color = SPRING_COLOR
+        self.width = SPRING_WIDTH
+        self.last_direction = pygame.Vector2(0, 0)
+        self.max_force = spring.max_force
+        self.broken = False
+        self.total_force = pygame.Vector2(0, 0)
+        self.color1 = pygame.Color(COLOR_1)
+        self.color2 = pygame.Color(COLOR_2)
+
+
+def object_size(obj):
+    # The instance plus its attribute dictionary, if it has one
+    return sys.getsizeof(obj) + (sys.getsizeof(obj.__dict__) if hasattr(obj, "__dict__") else 0)
+
+
+def megabytes(size):
+    return size / 2**20
+
+
+def read_attributes(nodes, springs):
+    # Seconds per attribute read over a few attributes of every object
+    start = perf_counter()
+    for node in nodes:
+        node.color, node.mass, node.static
+    for spring in springs:
+        spring.color, spring.force, spring.point1
+    return (perf_counter() - start) / (3 * (len(nodes) + len(springs)))
+
+
+def build_baseline(nodes, springs):
+    baseline_nodes = {node: BaselineNode(node) for node in nodes}
+    baseline_springs = [
+        BaselineSpring(spring, baseline_nodes[spring.point1], baseline_nodes[spring.point2]) for spring in springs
+    ]
+    return list(baseline_nodes.values()), baseline_springs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=224, help="cloth rows and columns (default: 224, ~100k springs)")
+    args = parser.parse_args(argv)
+
+    gc.collect()
+    tracemalloc.start()
+    start = perf_counter()
+    nodes, springs = build_cloth(args.size)
+    build_time = perf_counter() - start
+    built, build_peak = tracemalloc.get_traced_memory()
+
+    tracemalloc.reset_peak()
+    start = perf_counter()
+    sim = HeadlessSimulation(nodes=nodes, springs=springs)
+    gather_time = perf_counter() - start
+    gathered, gather_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    access_time = read_attributes(nodes, springs)
+
+    # Only what the copy allocates is traced, the slotted objects already exist
+    gc.collect()
+    tracemalloc.start()
+    start = perf_counter()
+    baseline_nodes, baseline_springs = build_baseline(nodes, springs)
+    baseline_time = perf_counter() - start
+    baseline, baseline_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    baseline_access_time = read_attributes(baseline_nodes, baseline_springs)
+
+    print(f"cloth {args.size}x{args.size}: {len(nodes)} nodes, {len(springs)} springs")
+    print(f"{'':<22} {'MB':>8} {'peak MB':>8} {'seconds':>8}")
+    print(f"{'baseline objects':<22} {megabytes(baseline):>8.1f} {megabytes(baseline_peak):>8.1f} {baseline_time:>8.2f}")
+    print(f"{'objects built':<22} {megabytes(built):>8.1f} {megabytes(build_peak):>8.1f} {build_time:>8.2f}")
+    print(f"{'gathered into engine':<22} {megabytes(gathered):>8.1f} {megabytes(gather_peak):>8.1f} {gather_time:>8.2f}")
+    print(f"{'':<22} {'baseline':>8} {'slotted':>8}")
+    print(f"{'bytes per node object':<22} {object_size(baseline_nodes[0]):>8} {object_size(nodes[0]):>8}")
+    print(f"{'bytes per spring':<22} {object_size(baseline_springs[0]):>8} {object_size(springs[0]):>8}")
+    print(f"{'attribute read ns':<22} {baseline_access_time * 1e9:>8.0f} {access_time * 1e9:>8.0f}")
+    return sim
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Cost of stepping the Node and Spring objects themselves.
+
+The per-object engine ("python") updates every body, spring and node object one at a time. Since
+the objects became views onto shared NumPy arrays, each scalar they read or write goes through a
+memoryview of the arrays rather than a pygame.Vector2 attribute, so this path is slower than when
+every object owned its vectors: Node.update, Node.apply_force and the Spring updates work on plain
+floats to keep that cost down, but 60 ticks of the 300-node cloth still take about 1.4x as long as
+they used to (about 0.9 s against 0.65 s here, measured against the objects of the first release).
+The array engines do not go through the objects at all.
+
+Reports ms per tick of the python engine on every demo, against the numpy engine on the same scene.
+
+Run from the repository root:
+    python -m benchmarks.objects
+    python -m benchmarks.objects --ticks 20 --substeps 10
+"""
+
+import argparse
+from time import perf_counter
+
+import balls
+import bridge
+import building
+import cloth
+from sim.headless import HeadlessSimulation
+from sim.sim import SimulationConfig
+
+DEMOS = {"cloth": cloth.build, "balls": balls.build, "building": building.build, "bridge": bridge.build}
+
+
+def ms_per_tick(build, engine, ticks, substeps):
+    sim = HeadlessSimulation.from_scene(build(), SimulationConfig(engine=engine, substeps=substeps))
+    start = perf_counter()
+    sim.run(ticks)
+    return (perf_counter() - start) * 1000 / ticks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticks", type=int, default=60, help="ticks per demo")
+    parser.add_argument("--substeps", type=int, default=5, help="substeps per tick")
+    args = parser.parse_args(argv)
+
+    print(f"{'demo':>9} {'objects ms/tick':>16} {'numpy ms/tick':>14} {'ratio':>6}")
+    for name, build in DEMOS.items():
+        objects = ms_per_tick(build, "python", args.ticks, args.substeps)
+        arrays = ms_per_tick(build, "numpy", args.ticks, args.substeps)
+        print(f"{name:>9} {objects:>16.2f} {arrays:>14.2f} {objects / arrays:>6.1f}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Static obstacle queries against the number of obstacle segments.
+
+Lays a jagged terrain polyline of a growing number of segments along an ever wider world,
+scatters a fixed number of nodes over it (so each node touches about as many segments at
+every size) and times building the SegmentBVH and querying the contacts of all nodes at once,
+against testing every node against every segment. The BVH query time should grow with the
+logarithm of the segment count, the brute force one linearly.
+Then runs the balls demo on top of the terrain in a world as wide, to show the cost per tick.
+
+Run from the repository root:
+    python -m benchmarks.obstacles
+    python -m benchmarks.obstacles --counts 1000 100000 --nodes 20000
+"""
+
+import argparse
+from time import perf_counter
+
+import numpy as np
+
+import balls
+from sim.constants import HEIGHT
+from sim.headless import HeadlessSimulation
+from sim.sim import SimulationConfig
+from sim.static import SegmentBVH, StaticGeometry
+
+SEGMENT_LENGTH = 10
+
+
+def build_terrain(count, rng):
+    # A ragged ground line near the bottom of the screen, SEGMENT_LENGTH wide per segment
+    x = np.arange(count + 1) * SEGMENT_LENGTH
+    y = HEIGHT - 60 + np.cumsum(rng.normal(0, 2, count + 1)).clip(-40, 40)
+    geometry = StaticGeometry()
+    geometry.add_polyline(np.stack((x, y), axis=1))
+    return geometry
+
+
+def brute_force(segments, points, radius, chunk=256):
+    # Every node against every segment, a chunk of nodes at a time
+    hits = 0
+    start, edge = segments[:, 0], segments[:, 1] - segments[:, 0]
+    length = np.einsum("ij,ij->i", edge, edge)
+    for first in range(0, len(points), chunk):
+        offset = points[first : first + chunk, None] - start
+        t = np.clip(np.einsum("kij,ij->ki", offset, edge) / length, 0, 1)
+        delta = offset - edge * t[..., None]
+        hits += int((np.hypot(delta[..., 0], delta[..., 1]) < radius[first : first + chunk, None]).any(axis=1).sum())
+    return hits
+
+
+def timed(function, repeat=1):
+    start = perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return result, (perf_counter() - start) * 1000 / repeat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--counts", type=int, nargs="+", default=[1_000, 4_000, 16_000, 64_000, 256_000], help="segment counts"
+    )
+    parser.add_argument("--nodes", type=int, default=10_000, help="nodes queried at once")
+    parser.add_argument("--brute-force-limit", type=int, default=64_000, help="largest count to brute force")
+    parser.add_argument("--ticks", type=int, default=100, help="ticks of the balls demo on the terrain")
+    args = parser.parse_args(argv)
+    rng = np.random.default_rng(0)
+
+    print(
+        f"{'segments':>9} {'depth':>6} {'build ms':>9} {'query ms':>9} {'us/node':>8} {'brute ms':>9}"
+        f" {'contacts':>9} {'balls ms/tick':>14}"
+    )
+    for count in args.counts:
+        geometry = build_terrain(count, rng)
+        bvh, build_time = timed(lambda: SegmentBVH(geometry.segments))
+
+        # Nodes around the terrain line along the whole world, about half of them touching it
+        ground = geometry.segments[rng.integers(0, count, args.nodes), 0]
+        points = ground + rng.normal(0, 8, (args.nodes, 2))
+        radius = np.full(args.nodes, 6.0)
+        (hit, _, _), query_time = timed(lambda: bvh.contacts(points, radius), repeat=5)
+
+        brute_time = float("nan")
+        if count <= args.brute_force_limit:
+            hits, brute_time = timed(lambda: brute_force(geometry.segments, points, radius))
+            assert hits == hit.size, (hits, hit.size)
+
+        # The balls demo falling onto the terrain, in a world as wide as it
+        width = count * SEGMENT_LENGTH
+        config = SimulationConfig(substeps=5, world_bounds=(0, 0, width, HEIGHT))
+        sim = HeadlessSimulation.from_scene(balls.build(), config, geometry=geometry)
+        _, tick_time = timed(lambda: sim.run(args.ticks))
+
+        print(
+            f"{count:>9} {len(bvh.levels):>6} {build_time:>9.1f} {query_time:>9.2f} {query_time * 1000 / args.nodes:>8.2f}"
+            f" {brute_time:>9.1f} {hit.size:>9} {tick_time / args.ticks:>14.2f}",
+            flush=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Building scenes from objects vs loading them from scene files.
+
+Generates square cloths of increasing size and times constructing their Node and Spring objects
+and gathering them into an engine, against loading the same scene from an .npz scene file into
+an engine, and against resetting the engine to its initial state.
+
+Run from the repository root:
+    python -m benchmarks.scene_io
+    python -m benchmarks.scene_io --sizes 100 300 --engine xpbd
+"""
+
+import argparse
+import os
+import tempfile
+from time import perf_counter
+
+from benchmarks.scenes import build_cloth
+from sim.headless import HeadlessSimulation
+from sim.scene import Scene
+from sim.sim import SimulationConfig
+
+
+def timed(function):
+    start = perf_counter()
+    result = function()
+    return result, (perf_counter() - start) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 100, 200, 400], help="cloth rows and columns")
+    parser.add_argument("--engine", choices=["numpy", "xpbd"], default="numpy")
+    parser.add_argument("--compressed", action="store_true", help="write compressed scene files")
+    args = parser.parse_args(argv)
+    config = SimulationConfig(engine=args.engine)
+
+    print(f"{'cloth':>9} {'nodes':>8} {'springs':>8} {'build ms':>9} {'load ms':>9} {'engine ms':>10} {'reset ms':>9} {'MB':>6}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            path = os.path.join(directory, f"cloth_{size}.npz")
+            sim, build_time = timed(lambda: HeadlessSimulation.from_scene(build_cloth(size), config))
+            sim.engine.scene.save(path, args.compressed)
+
+            scene, load_time = timed(lambda: Scene.load(path))
+            sim, engine_time = timed(lambda: HeadlessSimulation.from_scene(scene, config))
+            sim.run(10)
+            _, reset_time = timed(sim.reset)
+
+            megabytes = os.path.getsize(path) / 2**20
+            print(
+                f"{size:>4}x{size:<4} {sim.engine.nodes.size:>8} {sim.engine.springs.size:>8} {build_time:>9.1f}"
+                f" {load_time:>9.1f} {engine_time:>10.1f} {reset_time:>9.2f} {megabytes:>6.1f}",
+                flush=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Throughput benchmark over the bundled demo scenes.
+
+Builds the cloth, bridge, building and pressurized ball scenes at increasing sizes, runs each
+one headlessly and reports node updates/sec, spring updates/sec and ms per substep.
+
+Run from the repository root:
+    python -m benchmarks.scenes --engine numpy --json bench.json
+    python -m benchmarks.scenes --baseline bench.json  # compare against an earlier run
+"""
+
+import argparse
+import json
+import platform
+import sys
+from time import perf_counter
+
+import numpy as np
+import pygame
+
+import balls
+import bridge
+import building
+import cloth
+from sim.body import PressurizedSoftBody
+from sim.constants import HEIGHT, WIDTH
+from sim.headless import HeadlessSimulation
+from sim.sim import SimulationConfig
+
+
+def build_cloth(size):
+    # Square cloth, squeezed so that it still fits on the screen
+    return cloth.build(
+        rows=size,
+        cols=size,
+        node_distance_x=min(cloth.node_distance_x, (WIDTH - 40) / size),
+        node_distance_y=min(cloth.node_distance_y, (HEIGHT - 40) / size),
+    )
+
+
+def build_balloons(count):
+    # A grid of identical pressurized balloons
+    columns = int(count**0.5) or 1
+    spacing_x = WIDTH / (columns + 1)
+    spacing_y = HEIGHT / (count // columns + 2)
+    bodies = [
+        PressurizedSoftBody(
+            pos=pygame.Vector2(spacing_x * (i % columns + 1), spacing_y * (i // columns + 1)),
+            sides=12,
+            initial_radius=min(spacing_x, spacing_y) / 3,
+            pressure_force=50_000,
+            spring_force=20,
+            desired_length=2,
+            spring_damping=50,
+        )
+        for i in range(count)
+    ]
+    return [], [], bodies
+
+
+# name -> (builder, size parameter, sizes), sizes go up to roughly 100k springs
+SCENES = {
+    "cloth": (build_cloth, "rows x cols", [15, 50, 100, 224]),
+    "bridge": (lambda size: bridge.build(bridge_length=size), "bridge_length", [14, 250, 2_500, 25_000]),
+    "building": (lambda size: building.build(building_height=size), "building_height", [9, 80, 800, 7_600]),
+    "balls": (lambda size: balls.build(sides=size), "sides", [12, 100, 1_000, 12_500]),
+    "balloons": (build_balloons, "count", [4, 100, 1_000, 8_000]),
+}
+
+
+def run_case(scene, size, config, ticks):
+    builder = SCENES[scene][0]
+
+    start = perf_counter()
+    values = builder(size)
+    build_time = perf_counter() - start
+
+    start = perf_counter()
+    sim = HeadlessSimulation.from_scene(values, config)
+    setup_time = perf_counter() - start
+
+    sim.step()  # warm up
+    start = perf_counter()
+    sim.run(ticks)
+    elapsed = perf_counter() - start
+
+    substeps = ticks * config.substeps
+    node_count = sim.engine.nodes.size
+    spring_count = sim.engine.springs.size
+    return {
+        "scene": scene,
+        "size": size,
+        "nodes": node_count,
+        "springs": spring_count,
+        "build_ms": build_time * 1000,
+        "setup_ms": setup_time * 1000,
+        "ms_per_substep": elapsed * 1000 / substeps,
+        "node_updates_per_sec": node_count * substeps / elapsed,
+        "spring_updates_per_sec": spring_count * substeps / elapsed,
+    }
+
+
+def estimate_springs(scene, size):
+    # Cheap upper bound, so oversized cases can be skipped without building them
+    return {
+        "cloth": 2 * size * (size - 1),
+        "bridge": 4 * size,
+        "building": 13 * size,
+        "balls": 4 * size + 2,
+        "balloons": 12 * size,
+    }[scene]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engine", default="numpy", help="engine to benchmark (default: numpy)")
+    parser.add_argument("--scenes", nargs="+", choices=list(SCENES), default=list(SCENES))
+    parser.add_argument("--ticks", type=int, default=20, help="ticks to time per case (default: 20)")
+    parser.add_argument("--substeps", type=int, default=SimulationConfig.substeps)
+    parser.add_argument("--max-springs", type=int, default=100_000, help="skip cases larger than this")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="earlier --json output to compare against")
+    args = parser.parse_args(argv)
+
+    config = SimulationConfig(engine=args.engine, substeps=args.substeps)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = {(case["scene"], case["size"]): case for case in json.load(file)["results"]}
+
+    results = []
+    print(f"{'scene':<10} {'size':>7} {'nodes':>8} {'springs':>8} {'ms/substep':>11} {'nodes/s':>11} {'springs/s':>11}")
+    for scene in args.scenes:
+        for size in SCENES[scene][2]:
+            if estimate_springs(scene, size) > args.max_springs:
+                continue
+            case = run_case(scene, size, config, args.ticks)
+            results.append(case)
+
+            line = (
+                f"{scene:<10} {size:>7} {case['nodes']:>8} {case['springs']:>8} {case['ms_per_substep']:>11.3f} "
+                f"{case['node_updates_per_sec']:>11.3g} {case['spring_updates_per_sec']:>11.3g}"
+            )
+            if (scene, size) in baseline:
+                line += f"  x{baseline[(scene, size)]['ms_per_substep'] / case['ms_per_substep']:.2f} vs baseline"
+            print(line, flush=True)
+
+    if args.json:
+        report = {
+            "engine": args.engine,
+            "ticks": args.ticks,
+            "substeps": args.substeps,
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "results": results,
+        }
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
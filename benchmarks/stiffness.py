@@ -0,0 +1,74 @@
+"""
+Explicit vs implicit integration of stiff springs.
+
+Shakes an unbreakable building.py tower with increasingly stiff springs. For every integrator
+the fewest substeps that keep it stable (no spring stretched or squashed by more than
+--max-strain, nothing blowing up) are searched for, and the wall time per tick at that
+substep count is reported, so both integrators are compared at equal stability.
+
+Run from the repository root:
+    python -m benchmarks.stiffness
+    python -m benchmarks.stiffness --stiffness 75 5000 --width 20 --height 30
+"""
+
+import argparse
+from time import perf_counter
+
+import numpy as np
+
+import building
+from sim.headless import HeadlessSimulation
+from sim.sim import SimulationConfig
+
+SUBSTEPS = [1, 2, 4, 8, 16, 32, 64, 128]
+
+
+def run_case(stiffness, integrator, substeps, args):
+    values = building.build(
+        building_width=args.width,
+        building_height=args.height,
+        building_stiffness=stiffness,
+        building_strength=float("inf"),
+    )
+    # The same earthquake for every case
+    config = SimulationConfig(integrator=integrator, substeps=substeps, seed=args.seed)
+    sim = HeadlessSimulation.from_scene(values, config)
+    nodes, springs = sim.engine.nodes, sim.engine.springs
+
+    worst = 0
+    start = perf_counter()
+    for _ in range(args.ticks):
+        sim.step(building.earthquake)
+        delta = nodes.pos[springs.node2] - nodes.pos[springs.node1]
+        strain = np.abs(np.hypot(delta[:, 0], delta[:, 1]) / springs.desired_length - 1)
+        worst = max(worst, float(strain.max()))
+        if not worst <= args.max_strain:  # also catches nan
+            return None, worst
+    return (perf_counter() - start) * 1000 / args.ticks, worst
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stiffness", type=float, nargs="+", default=[75, 1_000, 5_000, 20_000])
+    parser.add_argument("--integrators", nargs="+", choices=["explicit", "implicit"], default=["explicit", "implicit"])
+    parser.add_argument("--width", type=int, default=building.building_width, help="building width in nodes")
+    parser.add_argument("--height", type=int, default=building.building_height, help="building height in nodes")
+    parser.add_argument("--ticks", type=int, default=300, help="ticks to run per case (default: 300)")
+    parser.add_argument("--max-strain", type=float, default=0.5, help="largest strain still counted as stable")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the earthquake")
+    args = parser.parse_args(argv)
+
+    print(f"{'stiffness':>10} {'integrator':<10} {'substeps':>9} {'ms/tick':>9} {'max strain':>11}")
+    for stiffness in args.stiffness:
+        for integrator in args.integrators:
+            for substeps in SUBSTEPS:
+                ms_per_tick, worst = run_case(stiffness, integrator, substeps, args)
+                if ms_per_tick is not None:
+                    print(f"{stiffness:>10g} {integrator:<10} {substeps:>9} {ms_per_tick:>9.2f} {worst:>11.3f}", flush=True)
+                    break
+            else:
+                print(f"{stiffness:>10g} {integrator:<10} {'unstable':>9}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
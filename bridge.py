@@ -1,5 +1,8 @@
+import logging
+
 import pygame
 
+from sim.builders import SceneBuilder, truss
 from sim.constants import BG_COLOR, DEBUG_FONT, FPS, HEIGHT, SUBSTEPS, WIDTH
 from sim.node import Node
 from sim.sim import Simulation, SimulationConfig
@@ -12,10 +15,16 @@ bridge_strength = 500
 bridge_damping = 50_000
 bridge_mass = 2
 
-separation = WIDTH / (bridge_length + 1)
-
 
-def build():
+def build(
+    bridge_length=bridge_length,
+    bridge_height=bridge_height,
+    spring_force=spring_force,
+    bridge_strength=bridge_strength,
+    bridge_damping=bridge_damping,
+    bridge_mass=bridge_mass,
+):
+    separation = WIDTH / (bridge_length + 1)
     nodes = []
     springs = []
     for i in range(bridge_length):
@@ -62,16 +71,47 @@ def build():
     return nodes, springs
 
 
-config = SimulationConfig(
-    width=WIDTH, height=HEIGHT, fps=FPS, substeps=SUBSTEPS, background_color=BG_COLOR, debug_font_size=DEBUG_FONT
-)
-pygame.init()
-display = pygame.display.set_mode((config.width, config.height))
-pygame.display.set_caption("Wobbly Rope Bridge Demo")
-
-nodes, springs = build()
-sim = Simulation(display, config=config, nodes=nodes, springs=springs, debug=True)
-sim.simulate()
+def build_scene(
+    bridge_length=bridge_length,
+    bridge_height=bridge_height,
+    spring_force=spring_force,
+    bridge_strength=bridge_strength,
+    bridge_damping=bridge_damping,
+    bridge_mass=bridge_mass,
+):
+    # The same bridge as build, straight into arrays
+    separation = WIDTH / (bridge_length + 1)
+    builder = SceneBuilder()
+    truss(
+        builder,
+        (separation, HEIGHT / 2 + bridge_height / 2),
+        (separation * bridge_length, HEIGHT / 2 + bridge_height / 2),
+        bridge_length - 1,
+        bridge_height,
+        mass=bridge_mass,
+        stiffness=spring_force,
+        damping=bridge_damping,
+        max_force=bridge_strength,
+    )
+    return builder.build()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")  # debug and cProfile reports
+    config = SimulationConfig(
+        width=WIDTH, height=HEIGHT, fps=FPS, substeps=SUBSTEPS, background_color=BG_COLOR, debug_font_size=DEBUG_FONT
+    )
+    pygame.init()
+    display = pygame.display.set_mode((config.width, config.height))
+    pygame.display.set_caption("Wobbly Rope Bridge Demo")
+
+    if config.engine == "python":
+        # The python engine steps Node and Spring objects, so it needs the bridge built node by node
+        nodes, springs = build()
+        sim = Simulation(display, config=config, nodes=nodes, springs=springs, debug=True)
+    else:
+        sim = Simulation(display, config=config, scene=build_scene(), debug=True)
+    sim.simulate()
 
 # clock = pygame.time.Clock()
 # dt = 1
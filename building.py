@@ -1,7 +1,8 @@
-from random import uniform
+import logging
 
 import pygame
 
+from sim.builders import SceneBuilder, braced_tower
 from sim.constants import BG_COLOR, DEBUG_FONT, FPS, HEIGHT, SUBSTEPS, WIDTH
 from sim.node import Node
 from sim.sim import Simulation, SimulationConfig
@@ -12,7 +13,7 @@ def earthquake(sim):
     leftmost_pos = sim.nodes[0].pos.x
     rightmost_pos = leftmost_pos + (building_width - 1) * node_spacing_x
     shake = (
-        uniform(
+        sim.rng.uniform(
             -min(earthquake_strength, abs(leftmost_pos)),
             min(earthquake_strength, abs(WIDTH - rightmost_pos)),
         )
@@ -47,7 +48,15 @@ x1 = building_x - node_spacing_x / 2
 x2 = building_x + node_spacing_x / 2
 
 
-def build():
+def build(
+    building_height=building_height,
+    building_width=building_width,
+    building_strength=building_strength,
+    level_difference=level_difference,
+    node_mass=node_mass,
+    building_stiffness=building_stiffness,
+    building_damping=building_damping,
+):
     nodes = []
     springs = []
 
@@ -107,19 +116,47 @@ def build():
     return [nodes, springs]
 
 
-config = SimulationConfig(
-    width=WIDTH, height=HEIGHT, fps=FPS, substeps=SUBSTEPS, background_color=BG_COLOR, debug_font_size=DEBUG_FONT
-)
-pygame.init()
-display = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Earthquake Simulation Demo")
-
-nodes, springs = build()
-sim = Simulation(
-    display,
-    config=config,
-    nodes=nodes,
-    springs=springs,
-    debug=True,
-)
-sim.simulate(earthquake)  # never stops until the user closes the window or sim.stop is called
+def build_scene(
+    building_height=building_height,
+    building_width=building_width,
+    building_strength=building_strength,
+    level_difference=level_difference,
+    node_mass=node_mass,
+    building_stiffness=building_stiffness,
+    building_damping=building_damping,
+):
+    # The same building as build, straight into arrays
+    builder = SceneBuilder()
+    braced_tower(
+        builder,
+        (building_x, HEIGHT),
+        building_height,
+        building_width,
+        (node_spacing_x, node_spacing_y),
+        mass=node_mass,
+        stiffness=building_stiffness,
+        damping=building_damping,
+        strength=building_strength,
+        strength_step=level_difference,
+    )
+    return builder.build()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")  # debug and cProfile reports
+    config = SimulationConfig(
+        width=WIDTH, height=HEIGHT, fps=FPS, substeps=SUBSTEPS, background_color=BG_COLOR, debug_font_size=DEBUG_FONT
+    )
+    pygame.init()
+    display = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Earthquake Simulation Demo")
+
+    nodes, springs = build()
+    sim = Simulation(
+        display,
+        config=config,
+        nodes=nodes,
+        springs=springs,
+        debug=True,
+    )
+    sim.simulate(earthquake)  # never stops until the user closes the window or sim.stop is called
@@ -1,5 +1,8 @@
+import logging
+
 import pygame
 
+from sim.builders import SceneBuilder, cloth
 from sim.constants import FPS, HEIGHT, SUBSTEPS, WIDTH, BG_COLOR, DEBUG_FONT
 from sim.node import Node
 from sim.sim import Simulation, SimulationConfig
@@ -17,7 +20,15 @@ cloth_stiffness = 1  # Adjusts the stiffness of each spring
 cloth_damping = 10  # Adjusts the damping of each spring
 
 
-def build():
+def build(
+    rows=rows,
+    cols=cols,
+    node_distance_x=node_distance_x,
+    node_distance_y=node_distance_y,
+    cloth_strength=cloth_strength,
+    cloth_stiffness=cloth_stiffness,
+    cloth_damping=cloth_damping,
+):
     nodes = []
     springs = []
 
@@ -58,16 +69,47 @@ def build():
     return nodes, springs
 
 
-config = SimulationConfig(
-    width=WIDTH, height=HEIGHT, fps=FPS, substeps=SUBSTEPS, background_color=BG_COLOR, debug_font_size=DEBUG_FONT
-)
-pygame.init()
-display = pygame.display.set_mode((config.width, config.height))
-pygame.display.set_caption("Tearable Cloth Demo")
-
-nodes, springs = build()
-sim = Simulation(display, config=config, nodes=nodes, springs=springs, debug=True)
-sim.simulate()  # never stops until the user closes the window or sim.stop is called
+def build_scene(
+    rows=rows,
+    cols=cols,
+    node_distance_x=node_distance_x,
+    node_distance_y=node_distance_y,
+    cloth_strength=cloth_strength,
+    cloth_stiffness=cloth_stiffness,
+    cloth_damping=cloth_damping,
+):
+    # The same cloth as build, straight into arrays, for sizes too large to build node by node
+    builder = SceneBuilder()
+    cloth(
+        builder,
+        rows,
+        cols,
+        (start_x - cols * node_distance_x // 2, start_y),
+        (node_distance_x, node_distance_y),
+        mass=(node_distance_x + node_distance_y) / 150,
+        stiffness=cloth_stiffness,
+        damping=cloth_damping,
+        max_force=cloth_strength,
+    )
+    return builder.build()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")  # debug and cProfile reports
+    config = SimulationConfig(
+        width=WIDTH, height=HEIGHT, fps=FPS, substeps=SUBSTEPS, background_color=BG_COLOR, debug_font_size=DEBUG_FONT
+    )
+    pygame.init()
+    display = pygame.display.set_mode((config.width, config.height))
+    pygame.display.set_caption("Tearable Cloth Demo")
+
+    if config.engine == "python":
+        # The python engine steps Node and Spring objects, so it needs the cloth built node by node
+        nodes, springs = build()
+        sim = Simulation(display, config=config, nodes=nodes, springs=springs, debug=True)
+    else:
+        sim = Simulation(display, config=config, scene=build_scene(), debug=True)
+    sim.simulate()  # never stops until the user closes the window or sim.stop is called
 
 # Alternative code below for those who want more control
 # # don't call simulate() if you want to control the simulation loop yourself
@@ -1,5 +1,14 @@
 from .body import DestroyablePressurizedSoftBody, PressurizedSoftBody, SoftBody
+from .builders import SceneBuilder
 from .constants import *
+from .engine import Engine, NumpyEngine, PythonEngine, XpbdEngine
+from .headless import HeadlessSimulation
+from .lockstep import LockstepResult, lockstep
 from .node import Node
+from .recording import TrajectoryRecorder, TrajectoryReplay
+from .scene import Scene
 from .sim import Simulation, SimulationConfig
 from .spring import ColorizedDestroyableSpring, DestroyableSpring, Spring
+from .state import NodeArrays, SpringArrays
+from .static import SegmentBVH, StaticGeometry
+from .sweep import SweepResult, sweep
@@ -0,0 +1,75 @@
+from math import ceil
+
+import numpy as np
+
+
+class AdaptiveSubsteps:
+    """
+    Picks the number of substeps of every tick from the state of the scene, within bounds.
+    Three limits each ask for a number of substeps, and the largest one wins:
+        travel: no node may move further than max_travel of its radius in one substep.
+        strain: no spring may stretch or squash by more than max_strain of its rest length in one substep.
+        stiffness: with explicit integration, the fastest spring (its angular frequency
+            sqrt(force * (1 / mass1 + 1 / mass2))) may turn by at most max_phase radians per substep.
+            Explicit springs blow up at 2, implicit and xpbd engines are stable at any step and skip this.
+    The count rises as soon as a limit needs it and drops by one per tick, so it does not flicker
+    while a scene hovers around a limit.
+    Attributes:
+        substeps (int): The count picked for the last tick.
+        limits (dict): How many substeps each limit asked for in the last tick.
+    Methods:
+        choose(engine, dt):
+            Returns the number of substeps to split the next tick of length dt into.
+    """
+
+    def __init__(self, min_substeps=1, max_substeps=64, max_travel=0.5, max_strain=0.05, max_phase=1.0):
+        self.min_substeps = min_substeps
+        self.max_substeps = max_substeps
+        self.max_travel = max_travel
+        self.max_strain = max_strain
+        self.max_phase = max_phase
+        self.substeps = min_substeps
+        self.limits = {}
+        self._frequency = None
+        self._broken = None
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.min_substeps, config.max_substeps, config.max_travel, config.max_strain, config.max_phase)
+
+    def choose(self, engine, dt):
+        nodes, springs = engine.nodes, engine.springs
+        live = engine.topology.live
+        movable = ~nodes.static
+
+        speed = np.hypot(nodes.vel[movable, 0], nodes.vel[movable, 1])
+        travel = speed * dt / (self.max_travel * np.maximum(nodes.radius[movable], 1e-12))
+        self.limits = {"travel": travel.max(initial=0)}
+
+        if live.size:
+            node1, node2 = springs.node1[live], springs.node2[live]
+            delta = nodes.pos[node2] - nodes.pos[node1]
+            distance = np.maximum(np.hypot(delta[:, 0], delta[:, 1]), 1e-12)
+            stretch_speed = np.abs(np.einsum("ij,ij->i", nodes.vel[node2] - nodes.vel[node1], delta)) / distance
+            rest_length = np.maximum(springs.desired_length[live], 1e-12)
+            self.limits["strain"] = (stretch_speed * dt / (self.max_strain * rest_length)).max()
+
+            if engine.explicit_springs:
+                self.limits["stiffness"] = self._max_frequency(engine) * dt / self.max_phase
+
+        required = max(self.limits.values(), default=0)
+        # A scene that blew up (nan or inf speeds) gets every substep there is
+        required = ceil(required) if required <= self.max_substeps else self.max_substeps
+        self.substeps = min(max(required, self.substeps - 1, self.min_substeps), self.max_substeps)
+        return self.substeps
+
+    def _max_frequency(self, engine):
+        # Only changes when springs break, as long as masses and stiffnesses are left alone
+        if self._broken != engine.topology.broken_count:
+            nodes, springs = engine.nodes, engine.springs
+            live = engine.topology.live
+            inverse_mass = np.where(nodes.static, 0.0, 1 / nodes.mass)
+            weight = inverse_mass[springs.node1[live]] + inverse_mass[springs.node2[live]]
+            self._frequency = float(np.sqrt(springs.force[live] * weight).max(initial=0))
+            self._broken = engine.topology.broken_count
+        return self._frequency
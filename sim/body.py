@@ -1,10 +1,11 @@
-from math import cos, radians, sin
+from math import cos, radians, sin, sqrt
 
 import pygame
 
 from sim.constants import GRAVITY, SOFT_BODY_PRESSURE, SPRING_DAMPING, SPRING_FORCE, SPRING_MAX_FORCE
-from sim.node import Node
+from sim.node import Node, accelerate
 from sim.spring import ColorizedDestroyableSpring, Spring, DestroyableSpring
+from sim.state import BodyArrays, Field, VectorField, bind
 
 
 class SoftBody:
@@ -27,9 +28,9 @@ class SoftBody:
         Initializes the soft body with nodes and edges.
     _update_springs(dt):
         Updates the state of all springs over a time step dt.
-    _update_nodes(dt, mouse_pos, mouse_pressed):
-        Updates the state of all nodes over a time step dt, considering mouse interactions.
-    update(dt, mouse_pos, mouse_pressed):
+    _update_nodes(dt, mouse_pos, mouse_pressed, bounds=None):
+        Updates the state of all nodes over a time step dt, considering mouse interactions and the world walls.
+    update(dt, mouse_pos, mouse_pressed, bounds=None):
         Updates the state of the soft body over a time step dt, considering mouse interactions.
     draw(display):
         Draws the soft body on the given display.
@@ -50,15 +51,15 @@ class SoftBody:
         for spring in self.springs:
             spring.update(dt)
 
-    def _update_nodes(self, dt, mouse_pos, mouse_pressed):
+    def _update_nodes(self, dt, mouse_pos, mouse_pressed, bounds=None):
         for node in self.nodes:
             if self.draggable_points:
                 node.mouse_integration(dt, mouse_pos, mouse_pressed)
-            node.update(dt)
+            node.update(dt, bounds)
 
-    def update(self, dt, mouse_pos, mouse_pressed):
+    def update(self, dt, mouse_pos, mouse_pressed, bounds=None):
         self._update_springs(dt)
-        self._update_nodes(dt, mouse_pos, mouse_pressed)
+        self._update_nodes(dt, mouse_pos, mouse_pressed, bounds)
 
     def draw(self, display):
         for spring in self.springs:
@@ -78,7 +79,7 @@ class PressurizedSoftBody(SoftBody):
     Methods:
         _update_pressure(dt):
             Updates the pressure forces acting on the nodes of the soft body.
-        update(dt, mouse_pos, mouse_pressed):
+        update(dt, mouse_pos, mouse_pressed, bounds=None):
             Updates the state of the soft body, including pressure, springs, and nodes.
     Args:
         pos (tuple): The initial position of the soft body.
@@ -91,8 +92,13 @@ class PressurizedSoftBody(SoftBody):
         gravity (pygame.Vector2, optional): The gravity vector affecting the nodes. Defaults to GRAVITY.
         draggable_points (bool, optional): Whether the nodes are draggable. Defaults to False.
         colorized (bool, optional): Whether the springs are colorized. Defaults to True.
+    Pressure and center of mass live in a BodyArrays row, so the engine can solve all
+    pressurized bodies as one batch.
     """
 
+    pressure = Field()
+    center_of_mass = VectorField()
+
     def __init__(
         self,
         pos,
@@ -118,53 +124,67 @@ class PressurizedSoftBody(SoftBody):
         ]
         edges = [(i, (i + 1) % sides, spring_force, desired_length, spring_damping) for i in range(sides)]
         super().__init__(nodes, edges, Spring, draggable_points)
+        bind(self, *BodyArrays.allocate())
         self.pressure = pressure_force
         self.center_of_mass = pos
 
     def _update_pressure(self, dt):
+        # Plain floats from the node rows (see Node), in the order of operations of the pygame.Vector2
+        # arithmetic: dividing by a number multiplies with its reciprocal, normalizing divides
+        nodes = self.nodes
+        count = len(nodes)
+        rows = [(node._store.views, node._index) for node in nodes]
+        points = [(views.pos[2 * index], views.pos[2 * index + 1]) for views, index in rows]
+
         # Calculate area using the shoelace formula
         area = 0
-        center_of_mass = pygame.Vector2(0, 0)
+        center_x = center_y = 0.0
         total_distance = 0
         distances = []
 
-        for i in range(len(self.nodes)):
-            p1 = self.nodes[i].pos
-            p2 = self.nodes[(i + 1) % len(self.nodes)].pos
-            area += p1[0] * p2[1] - p2[0] * p1[1]
-            center_of_mass += p1
-            distance = (p1 - p2).length()
+        for i in range(count):
+            x1, y1 = points[i]
+            x2, y2 = points[(i + 1) % count]
+            area += x1 * y2 - x2 * y1
+            center_x += x1
+            center_y += y1
+            delta_x, delta_y = x1 - x2, y1 - y2
+            distance = sqrt(delta_x * delta_x + delta_y * delta_y)
             distances.append(distance)
             total_distance += distance
 
         area = abs(area) / 2
-        center_of_mass /= len(self.nodes)
-        self.center_of_mass = center_of_mass
+        inverse_count = 1 / count
+        self.center_of_mass = (center_x * inverse_count, center_y * inverse_count)
 
         pressure_per_node = self.pressure / (area + 1e-8)
 
         # Apply pressure to each node
-        for i in range(len(self.nodes)):
-            p1 = self.nodes[i].pos
-            p2 = self.nodes[(i + 1) % len(self.nodes)].pos
+        for i in range(count):
+            x1, y1 = points[i]
+            x2, y2 = points[(i + 1) % count]
 
             # Compute normal vector
-            normal = pygame.Vector2((p2.y - p1.y), -(p2.x - p1.x))
-            if normal.length() == 0:
+            normal_x, normal_y = y2 - y1, -(x2 - x1)
+            length = sqrt(normal_x * normal_x + normal_y * normal_y)
+            if length == 0:
                 continue
 
-            normal.normalize_ip()
+            normal_x, normal_y = normal_x / length, normal_y / length
 
             # Force proportional to distance between nodes
-            force = normal * pressure_per_node * distances[i] / total_distance
+            inverse_total = 1 / total_distance
+            force_x = normal_x * pressure_per_node * distances[i] * inverse_total
+            force_y = normal_y * pressure_per_node * distances[i] * inverse_total
 
-            self.nodes[i].apply_force(force, dt)
-            self.nodes[(i + 1) % len(self.nodes)].apply_force(force, dt)
+            for views, index in (rows[i], rows[(i + 1) % count]):
+                if not views.static[index]:
+                    accelerate(views, index, force_x, force_y, dt)
 
-    def update(self, dt, mouse_pos, mouse_pressed):
+    def update(self, dt, mouse_pos, mouse_pressed, bounds=None):
         self._update_pressure(dt)
         self._update_springs(dt)
-        self._update_nodes(dt, mouse_pos, mouse_pressed)
+        self._update_nodes(dt, mouse_pos, mouse_pressed, bounds)
 
 
 class DestroyablePressurizedSoftBody(PressurizedSoftBody):
@@ -174,12 +194,14 @@ class DestroyablePressurizedSoftBody(PressurizedSoftBody):
         destroyed (bool): Whether the soft body has been destroyed.
         colorized (bool): Whether the springs are colorized.
     Methods:
-        update(dt, mouse_pos, mouse_pressed):
-            Updates the state of the soft body and handles destruction.
+        _update_pressure(dt):
+            Marks the body destroyed once a spring breaks, and only applies pressure while intact.
         draw(display):
             Draws the soft body unless destroyed.
     """
 
+    destroyed = Field()
+
     def __init__(
         self,
         pos,
@@ -213,19 +235,17 @@ class DestroyablePressurizedSoftBody(PressurizedSoftBody):
             spring_type(self.nodes[edge[0]], self.nodes[edge[1]], edge[2], max_force, edge[3], edge[4])
             for edge in [(i, (i + 1) % sides, spring_force, desired_length, spring_damping) for i in range(sides)]
         ]
+        self._store.destroyable[self._index] = True
         self.destroyed = False
 
     def _update_pressure(self, dt):
-        if self.destroyed:
-            return
-        super()._update_pressure(dt)
-
-    def update(self, dt, mouse_pos, mouse_pressed):
         # Check if any spring is broken
         if not self.destroyed and any(spring.broken for spring in self.springs):
             self.destroyed = True
 
-        super().update(dt, mouse_pos, mouse_pressed)
+        if self.destroyed:
+            return
+        super()._update_pressure(dt)
 
     def draw(self, display):
         super().draw(display)
@@ -0,0 +1,543 @@
+import numpy as np
+import pygame
+
+from sim.constants import (
+    COLOR_1,
+    COLOR_2,
+    ELASTICITY,
+    FRICTION,
+    GRAVITY,
+    NODE_DRAGGING_COLOR,
+    NODE_IDLE_COLOR,
+    NODE_RADIUS,
+    NODE_STATIC_COLOR,
+    SPRING_COLOR,
+    SPRING_DAMPING,
+    SPRING_FORCE,
+    SPRING_WIDTH,
+)
+from sim.scene import Scene
+from sim.state import BodyArrays, NodeArrays, SpringArrays
+
+# Per-object columns of the parts added to a SceneBuilder, with the trailing shape of one row
+NODE_PARTS = {
+    "pos": (2,),
+    "vel": (2,),
+    "mass": (),
+    "gravity": (),
+    "radius": (),
+    "elasticity": (),
+    "friction": (),
+    "static": (),
+    "draggable": (),
+    "interactive": (),
+    "colors": (3, 3),
+}
+SPRING_PARTS = {
+    "node1": (),
+    "node2": (),
+    "desired_length": (),
+    "force": (),
+    "damping": (),
+    "max_force": (),
+    "destroyable": (),
+    "gradient": (),
+    "colors": (2, 3),
+    "width": (),
+}
+
+
+def _rgb(color):
+    return tuple(pygame.Color(color))[:3]
+
+
+def _column(value, size, dtype):
+    # A scalar or per-row value as a column of size rows
+    return np.broadcast_to(np.asarray(value, dtype=dtype), (size,) + np.shape(value)[1:])
+
+
+class SceneBuilder:
+    """
+    Builds a Scene straight from arrays, without creating a single Node or Spring object.
+    Every add_* call takes the positions or endpoint indices of many nodes or springs at once,
+    with the same parameters (and defaults) as Node, Spring and the destroyable springs, either
+    as one value for all of them or as one value each. build packs everything into a Scene that
+    the array engines and the batched renderer run on directly.
+    Springs that form paths can be declared as chains, so the renderer draws them as polylines
+    without having to walk the springs of a big mesh first.
+    Attributes:
+        node_count (int): Nodes added so far.
+        spring_count (int): Springs added so far.
+    Methods:
+        add_nodes(pos, ...):
+            Adds nodes at the (k, 2) positions, returning their indices.
+        add_springs(node1, node2, desired_length=None, ...):
+            Adds springs between the nodes, returning their indices.
+        add_chains(springs, lengths):
+            Declares runs of springs that continue one another, to be drawn as polylines.
+        add_body(nodes, springs=(), pressure=None, ...):
+            Groups nodes into a soft body, pressurized if pressure is given.
+        build():
+            Returns the Scene.
+    """
+
+    def __init__(self):
+        self.node_count = 0
+        self.spring_count = 0
+        self._nodes = []
+        self._springs = []
+        self._chains = []
+        self._bodies = []
+
+    def add_nodes(
+        self,
+        pos,
+        mass=1,
+        vel=(0, 0),
+        gravity=GRAVITY,
+        radius=NODE_RADIUS,
+        elasticity=ELASTICITY,
+        friction=FRICTION,
+        static=False,
+        draggable=True,
+        color=NODE_IDLE_COLOR,
+        dragging_color=NODE_DRAGGING_COLOR,
+        static_color=NODE_STATIC_COLOR,
+        interactive=True,
+    ):
+        """
+        Adds len(pos) nodes and returns their indices. interactive is whether they follow the
+        mouse at all, like the free nodes of a simulation (body nodes only do if their body allows it).
+        """
+        pos = np.asarray(pos, dtype=np.float64).reshape(-1, 2)
+        count = len(pos)
+        styles = (color, static_color, dragging_color)
+        colors = np.stack([np.broadcast_to(_rgb(value), (count, 3)) for value in styles], axis=1)
+        self._nodes.append(
+            {
+                "pos": pos,
+                "vel": np.broadcast_to(np.asarray(vel, dtype=np.float64), (count, 2)),
+                "mass": _column(mass, count, np.float64),
+                "gravity": _column(gravity, count, np.float64),
+                "radius": _column(radius, count, np.float64),
+                "elasticity": _column(elasticity, count, np.float64),
+                "friction": _column(friction, count, np.float64),
+                "static": _column(static, count, bool),
+                "draggable": _column(draggable, count, bool),
+                "interactive": _column(interactive, count, bool),
+                "colors": colors.astype(np.uint8),
+            }
+        )
+        indices = np.arange(self.node_count, self.node_count + count)
+        self.node_count += count
+        return indices
+
+    def _positions(self, indices):
+        # Positions of nodes added so far, for rest lengths measured from the layout
+        if len(self._nodes) > 1:
+            self._nodes = [{name: np.concatenate([part[name] for part in self._nodes]) for name in NODE_PARTS}]
+        return self._nodes[0]["pos"][indices]
+
+    def add_springs(
+        self,
+        node1,
+        node2,
+        desired_length=None,
+        force=SPRING_FORCE,
+        damping=SPRING_DAMPING,
+        max_force=None,
+        colorized=False,
+        color=SPRING_COLOR,
+        color1=COLOR_1,
+        color2=COLOR_2,
+        width=SPRING_WIDTH,
+    ):
+        """
+        Adds springs between the nodes with indices node1 and node2, and returns their indices.
+        Without desired_length the springs rest at the current distance between their nodes.
+        With max_force they break like DestroyableSpring; colorized ones are drawn from color1 to
+        color2 by how close they are to breaking, like ColorizedDestroyableSpring.
+        """
+        node1 = np.asarray(node1, dtype=np.intp).reshape(-1)
+        node2 = np.asarray(node2, dtype=np.intp).reshape(-1)
+        count = node1.size
+        if desired_length is None:
+            delta = self._positions(node2) - self._positions(node1)
+            desired_length = np.hypot(delta[:, 0], delta[:, 1])
+        colors = (color1, color2) if colorized else (color, color)
+        self._springs.append(
+            {
+                "node1": node1,
+                "node2": node2,
+                "desired_length": _column(desired_length, count, np.float64),
+                "force": _column(force, count, np.float64),
+                "damping": _column(damping, count, np.float64),
+                "max_force": _column(np.inf if max_force is None else max_force, count, np.float64),
+                "destroyable": _column(max_force is not None, count, bool),
+                "gradient": _column(colorized, count, bool),
+                "colors": np.broadcast_to(np.array([_rgb(value) for value in colors], dtype=np.uint8), (count, 2, 3)),
+                "width": _column(width, count, np.intp),
+            }
+        )
+        indices = np.arange(self.spring_count, self.spring_count + count)
+        self.spring_count += count
+        return indices
+
+    def add_chains(self, springs, lengths):
+        """
+        Declares chains: springs lists them chain after chain, lengths[i] springs in chain i, each
+        spring starting at the node2 of the one before it. Springs in no chain are drawn on their own.
+        """
+        self._chains.append((np.asarray(springs, dtype=np.intp).reshape(-1), np.asarray(lengths, dtype=np.intp)))
+
+    def add_body(self, nodes, springs=(), pressure=None, destroyable=False, draggable_points=False, center=None):
+        """
+        Groups nodes (and the springs between them) into a soft body, returning its index among the
+        pressurized bodies if pressure is given. Pressurized bodies list their nodes around the outline.
+        Nodes follow the mouse only with draggable_points, like the nodes of SoftBody.
+        """
+        nodes = np.asarray(nodes, dtype=np.intp).reshape(-1)
+        springs = np.asarray(springs, dtype=np.intp).reshape(-1)
+        if pressure is not None and center is None:
+            center = self._positions(nodes).mean(axis=0)
+        self._bodies.append((nodes, springs, pressure, destroyable, draggable_points, center))
+        return sum(body[2] is not None for body in self._bodies) - 1 if pressure is not None else None
+
+    def build(self):
+        nodes = {name: _concatenate(self._nodes, name, shape) for name, shape in NODE_PARTS.items()}
+        springs = {name: _concatenate(self._springs, name, shape) for name, shape in SPRING_PARTS.items()}
+
+        # Body nodes follow the mouse only when their body allows it
+        interactive = nodes["interactive"].astype(bool)
+        for body_nodes, _, _, _, draggable_points, _ in self._bodies:
+            if not draggable_points:
+                interactive[body_nodes] = False
+
+        pressurized = [body for body in self._bodies if body[2] is not None]
+        bodies = BodyArrays.from_arrays(
+            len(pressurized),
+            {
+                "pressure": [body[2] for body in pressurized],
+                "center_of_mass": np.array([body[5] for body in pressurized], dtype=np.float64).reshape(-1, 2),
+                "destroyable": [body[3] for body in pressurized],
+            },
+        )
+        body_nodes, body_offsets = _pack([body[0] for body in self._bodies])
+        outline_nodes, outline_offsets = _pack([body[0] for body in pressurized])
+        outline_springs, outline_spring_offsets = _pack([body[1] for body in pressurized])
+
+        return Scene(
+            NodeArrays.from_arrays(self.node_count, nodes),
+            SpringArrays.from_arrays(self.spring_count, springs),
+            bodies,
+            interactive=interactive,
+            node_colors=nodes["colors"].astype(np.uint8, copy=False),
+            spring_colors=springs["colors"].astype(np.uint8, copy=False),
+            spring_gradient=springs["gradient"].astype(bool, copy=False),
+            spring_width=springs["width"].astype(np.intp, copy=False),
+            body_nodes=body_nodes,
+            body_offsets=body_offsets,
+            outline_nodes=outline_nodes,
+            outline_offsets=outline_offsets,
+            outline_springs=outline_springs,
+            outline_spring_offsets=outline_spring_offsets,
+            chains=self._build_chains(springs["node1"], springs["node2"]),
+        )
+
+    def _build_chains(self, node1, node2):
+        # The (order, chain_of, points) layout of spring_chains, from the declared chains
+        declared = [springs for springs, _ in self._chains]
+        lengths = [lengths for _, lengths in self._chains]
+        covered = np.zeros(self.spring_count, dtype=bool)
+        for springs in declared:
+            covered[springs] = True
+        single = np.flatnonzero(~covered)
+        order = np.concatenate(declared + [single]).astype(np.intp)
+        lengths = np.concatenate(lengths + [np.ones(single.size, dtype=np.intp)]).astype(np.intp)
+        chain_of = np.repeat(np.arange(lengths.size), lengths)
+
+        # Each chain has the node1 of every spring, then the node2 of its last one
+        points = np.empty(order.size + lengths.size, dtype=np.intp)
+        points[np.arange(order.size) + chain_of] = node1[order]
+        points[np.cumsum(lengths) + np.arange(lengths.size)] = node2[order[np.cumsum(lengths) - 1]]
+        return order, chain_of, points
+
+
+def _concatenate(parts, name, shape):
+    if not parts:
+        return np.empty((0,) + shape)
+    return np.concatenate([part[name] for part in parts])
+
+
+def _pack(groups):
+    offsets = np.zeros(len(groups) + 1, dtype=np.intp)
+    np.cumsum([len(group) for group in groups], out=offsets[1:])
+    values = np.concatenate(groups).astype(np.intp) if groups else np.empty(0, dtype=np.intp)
+    return values, offsets
+
+
+def cloth(
+    builder,
+    rows,
+    cols,
+    origin,
+    spacing,
+    pinned="top",
+    mass=1,
+    stiffness=SPRING_FORCE,
+    damping=SPRING_DAMPING,
+    max_force=None,
+    colorized=True,
+    **node_options,
+):
+    """
+    A rectangular grid of rows x cols nodes with its top left node at origin, spacing (x, y) apart,
+    joined to their right and lower neighbours. pinned is "top" to hang it from its top row,
+    "corners" for the two top corners only, or None. Springs are added cell by cell, each node's
+    right spring before its lower one. Returns the node indices as a (rows, cols) array, and the springs.
+    """
+    spacing_x, spacing_y = spacing if np.ndim(spacing) else (spacing, spacing)
+    row, col = np.divmod(np.arange(rows * cols), cols)
+    pos = np.stack((origin[0] + col * spacing_x, origin[1] + row * spacing_y), axis=1)
+    static = np.zeros(rows * cols, dtype=bool)
+    if pinned == "top":
+        static[:cols] = True
+    elif pinned == "corners":
+        static[[0, cols - 1]] = True
+    nodes = builder.add_nodes(pos, mass=mass, static=static, **node_options).reshape(rows, cols)
+
+    springs = _grid_springs(builder, nodes, spacing_x, spacing_y, stiffness, damping, max_force, colorized)
+    return nodes, springs
+
+
+def _grid_springs(builder, nodes, length_x, length_y, force, damping, max_force, colorized):
+    # Right and lower neighbour of every node, interleaved cell by cell like the loops of cloth.py
+    rows, cols = nodes.shape
+    slots = np.zeros((rows, cols, 2), dtype=bool)
+    slots[:, :-1, 0] = True
+    slots[:-1, :, 1] = True
+    neighbour = np.zeros((rows, cols, 2), dtype=np.intp)
+    neighbour[:, :-1, 0] = nodes[:, 1:]
+    neighbour[:-1, :, 1] = nodes[1:, :]
+    first = np.broadcast_to(nodes[:, :, None], slots.shape)[slots]
+    length = np.where(np.arange(2) == 0, length_x, length_y)
+    springs = builder.add_springs(
+        first,
+        neighbour[slots],
+        np.broadcast_to(length, slots.shape)[slots],
+        force,
+        damping,
+        max_force,
+        colorized,
+    )
+
+    # Rows and columns are chains, which the renderer draws as polylines
+    index = np.full(slots.shape, -1, dtype=np.intp)
+    index[slots] = springs
+    builder.add_chains(
+        np.concatenate((index[:, :-1, 0].reshape(-1), index[:-1, :, 1].T.reshape(-1))),
+        np.r_[np.full(rows if cols > 1 else 0, cols - 1), np.full(cols if rows > 1 else 0, rows - 1)],
+    )
+    return springs
+
+
+def truss(
+    builder,
+    start,
+    end,
+    segments,
+    height,
+    mass=1,
+    stiffness=SPRING_FORCE,
+    damping=SPRING_DAMPING,
+    max_force=None,
+    colorized=True,
+    **node_options,
+):
+    """
+    A bridge between start and end: a lower chord of segments + 1 nodes (the two ends static), an
+    upper chord of segments nodes height above the middles of the lower segments (its ends static),
+    and diagonals zigzagging between the two. Returns the lower and upper node indices.
+    """
+    start, end = np.asarray(start, dtype=np.float64), np.asarray(end, dtype=np.float64)
+    step = (end - start) / segments
+    lower_pos = start + np.arange(segments + 1)[:, None] * step
+    upper_pos = start + (np.arange(segments)[:, None] + 0.5) * step - (0, height)
+    lower = builder.add_nodes(
+        lower_pos,
+        mass=mass,
+        static=np.isin(np.arange(segments + 1), (0, segments)),
+        **node_options,
+    )
+    upper = builder.add_nodes(
+        upper_pos,
+        mass=mass,
+        static=np.isin(np.arange(segments), (0, segments - 1)),
+        **node_options,
+    )
+
+    options = dict(force=stiffness, damping=damping, max_force=max_force, colorized=colorized)
+    separation = float(np.hypot(*step))
+    chords = builder.add_springs(np.r_[lower[:-1], upper[:-1]], np.r_[lower[1:], upper[1:]], separation, **options)
+    builder.add_chains(chords, [segments, segments - 1])
+    diagonal = float(np.hypot(separation / 2, height))
+    pairs = np.stack((np.stack((lower[:-1], upper)), np.stack((lower[1:], upper))), axis=1)  # (2 ends, 2 sides, k)
+    builder.add_springs(pairs[0].T.reshape(-1), pairs[1].T.reshape(-1), diagonal, **options)
+    return lower, upper
+
+
+def braced_tower(
+    builder,
+    base,
+    floors,
+    columns,
+    spacing,
+    mass=1,
+    stiffness=SPRING_FORCE,
+    damping=SPRING_DAMPING,
+    strength=None,
+    strength_step=0,
+    colorized=True,
+):
+    """
+    A tower of floors x columns nodes standing on its static bottom floor, centered on base (the
+    middle of its bottom floor), with horizontal beams, vertical columns and both diagonals of every
+    bay. With strength, its springs break at strength on the top floor, strength_step more on every
+    floor below. Springs are added node by node like the loops of building.py.
+    Returns the node indices as a (floors, columns) array, bottom floor first.
+    """
+    spacing_x, spacing_y = spacing if np.ndim(spacing) else (spacing, spacing)
+    floor, column = np.divmod(np.arange(floors * columns), columns)
+    pos = np.stack((base[0] - (columns / 2 - column) * spacing_x, base[1] - floor * spacing_y), axis=1)
+    static = floor == 0
+    nodes = builder.add_nodes(pos, mass=mass, static=static, draggable=~static).reshape(floors, columns)
+
+    # Per node: beam to the left, column below, and the diagonals to the lower left and lower right
+    slots = np.zeros((floors, columns, 4), dtype=bool)
+    other = np.zeros((floors, columns, 4), dtype=np.intp)
+    slots[:, 1:, 0], other[:, 1:, 0] = True, nodes[:, :-1]
+    slots[1:, :, 1], other[1:, :, 1] = True, nodes[:-1, :]
+    slots[1:, 1:, 2], other[1:, 1:, 2] = True, nodes[:-1, :-1]
+    slots[1:, :-1, 3], other[1:, :-1, 3] = True, nodes[:-1, 1:]
+    own = np.broadcast_to(nodes[:, :, None], slots.shape)
+    # Beams run from the left node, the rest from the node above
+    node1 = np.where(np.arange(4) == 0, other, own)[slots]
+    node2 = np.where(np.arange(4) == 0, own, other)[slots]
+    diagonal = float(np.hypot(spacing_x, spacing_y))
+    length = np.broadcast_to(np.array([spacing_x, spacing_y, diagonal, diagonal]), slots.shape)[slots]
+    max_force = None
+    if strength is not None:
+        floor_of = np.broadcast_to(np.arange(floors)[:, None, None], slots.shape)[slots]
+        max_force = strength + strength_step * (floors - 1 - floor_of)
+    springs = builder.add_springs(node1, node2, length, stiffness, damping, max_force, colorized)
+
+    index = np.full(slots.shape, -1, dtype=np.intp)
+    index[slots] = springs
+    # Floors are chains from left to right, columns chains from the top down
+    if columns > 1:
+        builder.add_chains(index[:, 1:, 0].reshape(-1), np.full(floors, columns - 1))
+    if floors > 1:
+        builder.add_chains(index[:0:-1, :, 1].T.reshape(-1), np.full(columns, floors - 1))
+    return nodes
+
+
+def ring(
+    builder,
+    center,
+    radius,
+    sides,
+    pressure=None,
+    stiffness=SPRING_FORCE,
+    damping=SPRING_DAMPING,
+    rest_length=None,
+    max_force=None,
+    colorized=False,
+    draggable_points=False,
+    **node_options,
+):
+    """
+    A closed polygon of sides nodes around center, as a soft body. With pressure it is inflated
+    like PressurizedSoftBody (and pops when a spring breaks if max_force is given). Without
+    rest_length its springs rest at the polygon's side length. Returns the node and spring indices.
+    """
+    angle = np.radians(np.arange(sides) / sides * 360)
+    pos = np.asarray(center, dtype=np.float64) + radius * np.stack((np.cos(angle), np.sin(angle)), axis=1)
+    nodes = builder.add_nodes(pos, **node_options)
+    springs = builder.add_springs(nodes, np.roll(nodes, -1), rest_length, stiffness, damping, max_force, colorized)
+    builder.add_chains(springs, [sides])
+    builder.add_body(nodes, springs, pressure, max_force is not None, draggable_points, center)
+    return nodes, springs
+
+
+def _inside(points, polygon):
+    # Even-odd rule, one polygon edge at a time over all points
+    inside = np.zeros(len(points), dtype=bool)
+    x, y = points[:, 0], points[:, 1]
+    for (x1, y1), (x2, y2) in zip(polygon, np.roll(polygon, -1, axis=0)):
+        crosses = (y1 > y) != (y2 > y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            inside ^= crosses & (x < x1 + (y - y1) * (x2 - x1) / (y2 - y1))
+    return inside
+
+
+def polygon_mesh(
+    builder,
+    polygon,
+    spacing,
+    stiffness=SPRING_FORCE,
+    damping=SPRING_DAMPING,
+    max_force=None,
+    colorized=False,
+    body=True,
+    **node_options,
+):
+    """
+    Fills an arbitrary (simple, possibly concave) polygon with a triangulated mesh: the points of a
+    triangular lattice spacing apart that fall inside it, joined to their lattice neighbours by
+    springs whose middles are inside too, so no spring bridges a notch. The mesh is one soft body
+    unless body is False. Returns the node and spring indices.
+    """
+    polygon = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+    lower, upper = polygon.min(axis=0), polygon.max(axis=0)
+    row_height = spacing * np.sqrt(3) / 2
+    rows = int((upper[1] - lower[1]) // row_height) + 1
+    cols = int((upper[0] - lower[0]) // spacing) + 2
+    row, col = np.divmod(np.arange(rows * cols), cols)
+    lattice = np.stack((lower[0] + (col + (row % 2) / 2) * spacing, lower[1] + row * row_height), axis=1)
+    inside = _inside(lattice, polygon)
+
+    index = np.full(rows * cols, -1, dtype=np.intp)
+    index[inside] = builder.add_nodes(lattice[inside], **node_options)
+    index = index.reshape(rows, cols)
+
+    # Lattice neighbours: right, and the two below (which columns depends on whether the row is shifted)
+    first, second = [], []
+    shift = (np.arange(rows - 1) % 2)[:, None]
+    below_left = np.arange(cols)[None, :] - 1 + shift
+    below_right = below_left + 1
+    first.append(index[:, :-1].reshape(-1))
+    second.append(index[:, 1:].reshape(-1))
+    for below in (below_left, below_right):
+        valid = (below >= 0) & (below < cols)
+        first.append(np.broadcast_to(index[:-1], valid.shape)[valid])
+        second.append(index[1:][np.nonzero(valid)[0], below[valid]])
+    first, second = np.concatenate(first), np.concatenate(second)
+    linked = (first >= 0) & (second >= 0)
+    first, second = first[linked], second[linked]
+    middle = (lattice[_flat(index, first)] + lattice[_flat(index, second)]) / 2
+    spans = _inside(middle, polygon)
+    first, second = first[spans], second[spans]
+
+    springs = builder.add_springs(first, second, spacing, stiffness, damping, max_force, colorized)
+    nodes = index[index >= 0]
+    if body:
+        builder.add_body(nodes, springs)
+    return nodes, springs
+
+
+def _flat(index, nodes):
+    # Lattice cell of every node index
+    cells = np.full(index.max(initial=-1) + 1, -1, dtype=np.intp)
+    flat = index.reshape(-1)
+    cells[flat[flat >= 0]] = np.flatnonzero(flat >= 0)
+    return cells[nodes]
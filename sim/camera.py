@@ -0,0 +1,76 @@
+import numpy as np
+
+
+class Camera:
+    """
+    Pans and zooms the window over a world larger than it.
+    The window shows the world from offset, its top left corner, at zoom window pixels per world
+    unit. Until it is moved the camera shows the top left corner of the world at zoom 1, where
+    world and window coordinates are the same.
+    Attributes:
+        screen_size (tuple): Width and height of the window in pixels.
+        offset (np.ndarray): The world point at the top left corner of the window.
+        zoom (float): Window pixels per world unit.
+    Methods:
+        to_screen(points):
+            Returns the window coordinates of an array of world points.
+        to_world(point):
+            Returns the world coordinates of a window point.
+        view():
+            Returns the visible world rectangle as (left, top, right, bottom).
+        pan(dx, dy):
+            Moves the view by a number of window pixels.
+        zoom_at(point, factor):
+            Zooms in by factor, keeping the world point under the window point in place.
+        reset():
+            Goes back to the initial view.
+    """
+
+    def __init__(self, screen_size, bounds, center=None, zoom=1.0, min_zoom=0.05, max_zoom=20.0):
+        self.screen_size = (float(screen_size[0]), float(screen_size[1]))
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self._initial = (center, zoom)
+        self.bounds = bounds
+        self.reset()
+
+    @classmethod
+    def from_config(cls, config, bounds):
+        return cls(
+            (config.width, config.height), bounds, config.camera_center, config.camera_zoom, config.min_zoom, config.max_zoom
+        )
+
+    def reset(self):
+        center, zoom = self._initial
+        self.zoom = min(max(zoom, self.min_zoom), self.max_zoom)
+        if center is None:
+            self.offset = np.array([self.bounds.left, self.bounds.top], dtype=np.float64)
+        else:
+            self.offset = np.asarray(center, dtype=np.float64) - np.array(self.screen_size) / (2 * self.zoom)
+
+    @property
+    def identity(self):
+        """Whether world and window coordinates are the same"""
+        return self.zoom == 1 and not self.offset.any()
+
+    def to_screen(self, points):
+        if self.identity:
+            return points
+        return (points - self.offset) * self.zoom
+
+    def to_world(self, point):
+        if self.identity:
+            return point
+        return tuple((np.asarray(point, dtype=np.float64) / self.zoom + self.offset).tolist())
+
+    def view(self):
+        left, top = self.offset.tolist()
+        return left, top, left + self.screen_size[0] / self.zoom, top + self.screen_size[1] / self.zoom
+
+    def pan(self, dx, dy):
+        self.offset -= np.array([dx, dy], dtype=np.float64) / self.zoom
+
+    def zoom_at(self, point, factor):
+        anchor = np.asarray(self.to_world(point), dtype=np.float64)
+        self.zoom = min(max(self.zoom * factor, self.min_zoom), self.max_zoom)
+        self.offset = anchor - np.asarray(point, dtype=np.float64) / self.zoom
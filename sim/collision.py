@@ -0,0 +1,226 @@
+import numpy as np
+
+from sim.state import scatter_add
+
+# Offsets to the neighbouring cells that still need checking once (0, 0) is handled,
+# so that every pair of neighbouring cells is only visited once
+HALF_NEIGHBOURHOOD = ((1, -1), (1, 0), (1, 1), (0, 1))
+
+
+def _expand(starts, counts):
+    # Flattens the ranges [start, start + count) into (owner, index) arrays
+    owner = np.repeat(np.arange(counts.size), counts)
+    offsets = np.arange(owner.size) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owner, np.repeat(starts, counts) + offsets
+
+
+class SpatialHash:
+    """
+    A uniform grid broad-phase over node positions, rebuilt once per substep.
+    Cells are keyed densely over the bounding box of the nodes, so lookups are exact sorted
+    searches rather than hashed buckets, and candidate pairs come out in near-linear time.
+    Attributes:
+        cell_size (float or None): The width of each grid cell. None picks the largest node diameter,
+            which is the smallest size for which neighbouring cells are enough to find every contact.
+        stats (dict): Counters from the last build and queries (occupied cells and pairs tested).
+    Methods:
+        build(positions, radii):
+            Sorts the nodes into grid cells.
+        node_pairs():
+            Returns candidate (i, j) node pairs from the same or neighbouring cells.
+        edge_pairs(starts, ends):
+            Returns candidate (node, edge) pairs for the segments between the given node indices.
+        nodes_in_box(low, high):
+            Returns the nodes of every cell overlapping the box between the low and high corners.
+    """
+
+    def __init__(self, cell_size=None):
+        self.cell_size = cell_size
+        self.stats = {}
+
+    def build(self, positions, radii):
+        self.positions = positions
+        self.radii = radii
+        self.size = self.cell_size or (2 * radii.max() if radii.size else 1.0)
+
+        cells = np.floor(positions / self.size).astype(np.int64)
+        self.origin = cells.min(axis=0) if cells.size else np.zeros(2, dtype=np.int64)
+        cells -= self.origin
+        self.cells = cells
+        self.extent = cells.max(axis=0) + 1 if cells.size else np.ones(2, dtype=np.int64)
+        # One empty padding row keeps neighbours above and below the grid from aliasing other columns
+        self.height = self.extent[1] + 1
+
+        self.keys = cells[:, 0] * self.height + cells[:, 1]
+        self.order = np.argsort(self.keys, kind="stable")
+        self.sorted_keys = self.keys[self.order]
+
+        self.stats = {
+            "nodes": len(positions),
+            "cell_size": float(self.size),
+            "occupied_cells": int(np.count_nonzero(np.diff(self.sorted_keys)) + 1) if cells.size else 0,
+            "node_pairs_tested": 0,
+            "edge_pairs_tested": 0,
+        }
+
+    def _lookup(self, keys):
+        # Returns (query, node) for every node sitting in the cell of each query key
+        starts = np.searchsorted(self.sorted_keys, keys, "left")
+        ends = np.searchsorted(self.sorted_keys, keys, "right")
+        query, index = _expand(starts, ends - starts)
+        return query, self.order[index]
+
+    def node_pairs(self):
+        first, second = self._lookup(self.keys)
+        same_cell = first < second
+        pairs_i = [first[same_cell]]
+        pairs_j = [second[same_cell]]
+
+        for dx, dy in HALF_NEIGHBOURHOOD:
+            query, other = self._lookup(self.keys + dx * self.height + dy)
+            pairs_i.append(query)
+            pairs_j.append(other)
+
+        pairs_i = np.concatenate(pairs_i)
+        pairs_j = np.concatenate(pairs_j)
+        self.stats["node_pairs_tested"] = pairs_i.size
+        return pairs_i, pairs_j
+
+    def nodes_in_box(self, low, high):
+        # A superset of the nodes inside the box, callers test the candidates exactly
+        low = np.maximum(np.floor(np.asarray(low) / self.size).astype(np.int64) - self.origin, 0)
+        high = np.minimum(np.floor(np.asarray(high) / self.size).astype(np.int64) - self.origin, self.extent - 1)
+        if np.any(high < low):
+            return np.empty(0, dtype=np.intp)
+        cell_x, cell_y = np.meshgrid(np.arange(low[0], high[0] + 1), np.arange(low[1], high[1] + 1), indexing="ij")
+        return self._lookup((cell_x * self.height + cell_y).ravel())[1]
+
+    def edge_pairs(self, starts, ends):
+        # Every segment is inserted into all the cells its bounding box (grown by the largest radius) covers
+        margin = self.radii.max() if self.radii.size else 0
+        a = self.positions[starts]
+        b = self.positions[ends]
+        low = np.floor((np.minimum(a, b) - margin) / self.size).astype(np.int64) - self.origin
+        high = np.floor((np.maximum(a, b) + margin) / self.size).astype(np.int64) - self.origin
+        # Cells outside the grid hold no nodes, so clip to it
+        low = np.maximum(low, 0)
+        high = np.minimum(high, self.extent - 1)
+        span = np.maximum(high - low + 1, 0)
+
+        edge, offset = _expand(np.zeros(len(starts), dtype=np.int64), span[:, 0] * span[:, 1])
+        cell_x = low[edge, 0] + offset // span[edge, 1]
+        cell_y = low[edge, 1] + offset % span[edge, 1]
+        edge_keys = cell_x * self.height + cell_y
+
+        order = np.argsort(edge_keys, kind="stable")
+        sorted_keys = edge_keys[order]
+        first = np.searchsorted(sorted_keys, self.keys, "left")
+        last = np.searchsorted(sorted_keys, self.keys, "right")
+        nodes, index = _expand(first, last - first)
+        edges = edge[order[index]]
+
+        # A node never collides with the springs it is attached to
+        detached = (nodes != starts[edges]) & (nodes != ends[edges])
+        nodes, edges = nodes[detached], edges[detached]
+        self.stats["edge_pairs_tested"] = nodes.size
+        return nodes, edges
+
+
+class CollisionSolver:
+    """
+    Node/node and node/spring collisions, found through a SpatialHash and resolved with
+    mass-weighted position corrections plus an elastic velocity impulse along the contact normal.
+    Attributes:
+        grid (SpatialHash): The broad-phase grid, rebuilt on every call to resolve.
+        node_collisions (bool): Whether nodes collide with each other.
+        edge_collisions (bool): Whether nodes collide with springs they are not attached to.
+        stats (dict): The grid statistics plus the number of contacts found in the last substep.
+    Methods:
+        resolve(nodes, springs, live=None):
+            Finds and resolves all contacts between the given node and spring arrays, only
+            considering the springs listed in live when given.
+    """
+
+    def __init__(self, cell_size=None, node_collisions=True, edge_collisions=True):
+        self.grid = SpatialHash(cell_size)
+        self.node_collisions = node_collisions
+        self.edge_collisions = edge_collisions
+
+    @property
+    def stats(self):
+        return self.grid.stats
+
+    def resolve(self, nodes, springs, live=None):
+        if nodes.size == 0:
+            return
+
+        self.grid.build(nodes.pos, nodes.radius)
+        inverse_mass = np.where(nodes.static, 0.0, 1 / nodes.mass)
+
+        if self.node_collisions:
+            self._resolve_nodes(nodes, inverse_mass)
+        if self.edge_collisions and springs.size:
+            self._resolve_edges(nodes, springs, inverse_mass, live)
+
+    def _resolve_nodes(self, nodes, inverse_mass):
+        first, second = self.grid.node_pairs()
+
+        delta = nodes.pos[second] - nodes.pos[first]
+        distance = np.hypot(delta[:, 0], delta[:, 1])
+        reach = nodes.radius[first] + nodes.radius[second]
+        weight = inverse_mass[first] + inverse_mass[second]
+        touching = (distance < reach) & (distance > 0) & (weight > 0)
+
+        first, second = first[touching], second[touching]
+        normal = delta[touching] / distance[touching, None]
+        depth = reach[touching] - distance[touching]
+        weight = weight[touching]
+        self.grid.stats["node_contacts"] = first.size
+
+        elasticity = (nodes.elasticity[first] + nodes.elasticity[second]) / 2
+        ones = np.ones(first.size)
+        contacts = [(second, ones), (first, -ones)]
+        self._apply(nodes, inverse_mass, contacts, normal, depth, weight, elasticity)
+
+    def _resolve_edges(self, nodes, springs, inverse_mass, live=None):
+        live = np.flatnonzero(~springs.broken) if live is None else live[~springs.broken[live]]
+        starts = springs.node1[live]
+        ends = springs.node2[live]
+        point, edge = self.grid.edge_pairs(starts, ends)
+        start, end = starts[edge], ends[edge]
+
+        # Closest point on each segment
+        a = nodes.pos[start]
+        segment = nodes.pos[end] - a
+        length2 = np.einsum("ij,ij->i", segment, segment)
+        t = np.clip(np.einsum("ij,ij->i", nodes.pos[point] - a, segment) / np.maximum(length2, 1e-12), 0, 1)
+        delta = nodes.pos[point] - (a + segment * t[:, None])
+        distance = np.hypot(delta[:, 0], delta[:, 1])
+
+        reach = nodes.radius[point]
+        weight = inverse_mass[point] + (1 - t) ** 2 * inverse_mass[start] + t**2 * inverse_mass[end]
+        touching = (distance < reach) & (distance > 0) & (weight > 0)
+
+        point, start, end, t = point[touching], start[touching], end[touching], t[touching]
+        normal = delta[touching] / distance[touching, None]
+        depth = reach[touching] - distance[touching]
+        weight = weight[touching]
+        self.grid.stats["edge_contacts"] = point.size
+
+        contacts = [(point, np.ones(point.size)), (start, t - 1), (end, -t)]
+        self._apply(nodes, inverse_mass, contacts, normal, depth, weight, nodes.elasticity[point])
+
+    def _apply(self, nodes, inverse_mass, contacts, normal, depth, weight, elasticity):
+        # contacts holds (node indices, share) per contact end, positive shares move along the normal
+        if normal.size == 0:
+            return
+
+        relative_velocity = sum(nodes.vel[index] * share[:, None] for index, share in contacts)
+        normal_velocity = np.einsum("ij,ij->i", relative_velocity, normal)
+        impulse = np.where(normal_velocity < 0, -(1 + elasticity) * normal_velocity, 0) / weight
+        correction = depth / weight
+
+        for index, share in contacts:
+            scale = inverse_mass[index] * share
+            nodes.pos += scatter_add(index, normal * (correction * scale)[:, None], nodes.size)
+            nodes.vel += scatter_add(index, normal * (impulse * scale)[:, None], nodes.size)
@@ -0,0 +1,102 @@
+import numpy as np
+
+
+def color_edges(size, first, second):
+    """
+    Colors the edges (first[i], second[i]) of a graph with `size` vertices so that no two edges
+    of the same color share a vertex, and returns the edge indices of every color.
+    Each color is a maximal matching, grown in rounds where every edge that has the lowest index
+    at both of its vertices joins, so at most 2 * (max degree) - 1 colors are used.
+    """
+    edge_count = first.size
+    colors = np.full(edge_count, -1, dtype=np.intp)
+    remaining = np.arange(edge_count)
+    color = 0
+    while remaining.size:
+        taken = np.zeros(size, dtype=bool)
+        candidates = remaining
+        while candidates.size:
+            lowest = np.full(size, edge_count, dtype=np.intp)
+            np.minimum.at(lowest, first[candidates], candidates)
+            np.minimum.at(lowest, second[candidates], candidates)
+            chosen = candidates[(lowest[first[candidates]] == candidates) & (lowest[second[candidates]] == candidates)]
+            colors[chosen] = color
+            taken[first[chosen]] = True
+            taken[second[chosen]] = True
+            candidates = candidates[(colors[candidates] < 0) & ~taken[first[candidates]] & ~taken[second[candidates]]]
+        remaining = remaining[colors[remaining] < 0]
+        color += 1
+
+    order = np.argsort(colors, kind="stable")
+    return np.split(order, np.cumsum(np.bincount(colors, minlength=color))[:-1])
+
+
+class SpringColoring:
+    """
+    A cached edge coloring of the unbroken springs of an engine.
+    No two springs in a batch share a node, so every batch can be applied at once, by array
+    backends through plain fancy indexing or by a thread pool split into chunks, without
+    atomics or lost updates. The coloring is computed lazily. Removing edges never makes a coloring
+    invalid, so when springs break (as tracked by the engine's SpringTopology) they are only dropped
+    from their batches; the coloring is recomputed when broken springs come back (a restored or
+    replayed state) or after invalidate. Adding springs rebuilds the engine, and with it the coloring.
+    Attributes:
+        batches (list): Spring indices of every color, recomputed when it is out of date.
+        colorings (int): How many times the coloring has been computed.
+    Methods:
+        invalidate():
+            Forces the coloring to be recomputed on next use.
+        for_each(function, executor=None, workers=1):
+            Calls function(springs) batch after batch, splitting each batch over an executor's threads.
+        stats():
+            Returns the batch count and the batch sizes.
+    """
+
+    def __init__(self, node_count, springs, topology):
+        self.node_count = node_count
+        self.springs = springs
+        self.topology = topology
+        self.colorings = 0
+        self._batches = None
+        self._broken = None
+
+    def invalidate(self):
+        self._batches = None
+
+    @property
+    def batches(self):
+        springs = self.springs
+        broken = self.topology.broken_count
+        if self._batches is None or broken < self._broken:
+            live = self.topology.live
+            live = live[~springs.broken[live]]
+            self._batches = [live[batch] for batch in color_edges(self.node_count, springs.node1[live], springs.node2[live])]
+            self.colorings += 1
+        elif broken != self._broken:
+            # One pass over the cached batches drops the springs that broke since
+            intact = ~springs.broken
+            self._batches = [kept for kept in (batch[intact[batch]] for batch in self._batches) if kept.size]
+        self._broken = broken
+        return self._batches
+
+    def for_each(self, function, executor=None, workers=1):
+        """
+        Calls function with the spring indices of every batch in turn. With an executor, every batch
+        is split into `workers` chunks that run concurrently (chunks of one batch never share a node),
+        and the next batch only starts once all of them are done.
+        """
+        for batch in self.batches:
+            if executor is None or workers <= 1:
+                function(batch)
+            else:
+                list(executor.map(function, np.array_split(batch, workers)))
+
+    def stats(self):
+        sizes = [batch.size for batch in self.batches]
+        return {
+            "batches": len(sizes),
+            "sizes": sizes,
+            "largest": max(sizes, default=0),
+            "smallest": min(sizes, default=0),
+            "mean": float(np.mean(sizes)) if sizes else 0.0,
+        }
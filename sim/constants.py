@@ -66,5 +66,9 @@ SPRING_COLOR = (47, 127, 224)
 COLOR_1 = (34, 191, 45)
 COLOR_2 = (235, 64, 52)
 
+# Color and line width of static obstacles
+OBSTACLE_COLOR = (90, 90, 90)
+OBSTACLE_WIDTH = 3
+
 # Debug
 DEBUG_FONT = 24
@@ -0,0 +1,172 @@
+import numpy as np
+
+# Most springs (or free nodes) in one culling group
+GROUP_SIZE = 32
+
+
+def concatenated_ranges(starts, lengths):
+    """Returns the ranges starts[i] : starts[i] + lengths[i] laid out one after another"""
+    if lengths.size == 0:
+        return np.empty(0, dtype=np.intp)
+    ends = np.cumsum(lengths)
+    steps = np.ones(ends[-1], dtype=np.intp)
+    steps[0] = starts[0]
+    steps[ends[:-1]] = starts[1:] - (starts[:-1] + lengths[:-1] - 1)
+    return np.cumsum(steps)
+
+
+def _rank(successor, states):
+    # Pointer jumping over the given states: the last state each one leads to, and how many steps away it is
+    jump = successor[states]
+    distance = (jump >= 0).astype(np.intp)
+    last = np.where(jump >= 0, jump, states)
+    position = np.full(successor.size, -1, dtype=np.intp)
+    position[states] = np.arange(states.size)
+    for _ in range(int(np.log2(max(states.size, 1))) + 2):
+        active = np.flatnonzero(jump >= 0)
+        if active.size == 0:
+            break
+        ahead = position[jump[active]]
+        distance[active] += distance[ahead]
+        last[active] = last[ahead]
+        jump[active] = jump[ahead]
+    return last, distance, jump >= 0
+
+
+def spring_chains(springs):
+    """
+    Splits the springs into chains, paths of springs where each one starts at the node the previous
+    one ended at. Returns the springs in chain order, the chain each one belongs to and the node
+    sequence of all chains laid out one after another (each chain has one more node than springs).
+    The spring ends at every node are paired up two by two, which links each spring to at most one
+    other at either end; the resulting paths (and cycles, cut open) are then ranked by pointer
+    jumping, so scenes loaded without declared chains take a few dozen array passes, not a walk.
+    """
+    size = springs.size
+    if size == 0:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty, empty
+    ends = np.concatenate((springs.node1, springs.node2)).astype(np.intp)
+    count = ends.size
+    state = np.arange(count)
+    other = (state + size) % count
+
+    # Pair up the spring ends at every node, two by two
+    halves = np.argsort(ends, kind="stable")
+    new_node = np.r_[True, ends[halves][1:] != ends[halves][:-1]]
+    rank = state - np.maximum.accumulate(np.where(new_node, state, 0))
+    first = np.flatnonzero((rank % 2 == 0) & (state + 1 < count))
+    first = first[~new_node[first + 1]]
+    a, b = halves[first], halves[first + 1]
+    linked = a % size != b % size
+    partner = np.full(count, -1, dtype=np.intp)
+    partner[a[linked]] = b[linked]
+    partner[b[linked]] = a[linked]
+
+    # Entering a spring through one end leads into the spring paired with its other end
+    successor = partner[other]
+    last, distance, cyclic = _rank(successor, state)
+
+    chosen = ~cyclic & (last < last[other])
+    if cyclic.any():
+        # Cut every cycle open before its smallest state, in the direction holding the smaller of the two
+        cycle = np.flatnonzero(cyclic)
+        smallest = cycle.copy()
+        jump = successor[cycle]
+        position = np.full(count, -1, dtype=np.intp)
+        position[cycle] = np.arange(cycle.size)
+        for _ in range(int(np.log2(cycle.size)) + 2):
+            ahead = position[jump]
+            smallest = np.minimum(smallest, smallest[ahead])
+            jump = jump[ahead]
+        least = np.full(count, -1, dtype=np.intp)
+        least[cycle] = smallest
+        kept = cycle[least[cycle] < least[other[cycle]]]
+        successor = successor.copy()
+        successor[kept[successor[kept] == least[kept]]] = -1
+        last[kept], distance[kept], _ = _rank(successor, kept)
+        chosen[kept] = True
+
+    # Chains one after another, each from its first spring to its last
+    states = np.flatnonzero(chosen)
+    states = states[np.lexsort((-distance[states], last[states]))]
+    starts = np.r_[True, last[states][1:] != last[states][:-1]]
+    chain_of = np.cumsum(starts) - 1
+    points = np.empty(size + chain_of[-1] + 1, dtype=np.intp)
+    points[np.arange(size) + chain_of] = ends[states]
+    final = np.r_[np.flatnonzero(starts)[1:], size] - 1
+    points[final + chain_of[final] + 1] = ends[other[states[final]]]
+    return states % size, chain_of, points
+
+
+class BoundsIndex:
+    """
+    Bounding boxes of groups of points, to cull whole groups against the visible region at once.
+    Which points make up which group is laid out once when the index is built and kept; update
+    refreshes every box from the current positions with a single gather and two reductions.
+    Attributes:
+        members (np.ndarray): The point indices of every group, packed one group after another.
+        offsets (np.ndarray): Where each group starts in members, with its total size at the end.
+        lower, upper (np.ndarray): The corners of every group's box, as of the last update.
+    Methods:
+        update(positions, pad=0):
+            Recomputes the boxes, grown by pad on every side.
+        visible(view):
+            Returns which boxes overlap the (left, top, right, bottom) rectangle.
+    """
+
+    def __init__(self, members, offsets):
+        self.members = members
+        self.offsets = offsets
+        self.lower = self.upper = np.empty((0, 2))
+
+    def __len__(self):
+        return self.offsets.size - 1
+
+    def update(self, positions, pad=0):
+        if len(self) == 0:
+            return
+        points = positions[self.members]
+        # Groups are never empty, so every start is a distinct reduction segment
+        self.lower = np.minimum.reduceat(points, self.offsets[:-1], axis=0) - pad
+        self.upper = np.maximum.reduceat(points, self.offsets[:-1], axis=0) + pad
+
+    def visible(self, view):
+        left, top, right, bottom = view
+        lower, upper = self.lower, self.upper
+        return (upper[:, 0] >= left) & (lower[:, 0] <= right) & (upper[:, 1] >= top) & (lower[:, 1] <= bottom)
+
+
+def spring_groups(chain_of, chain_points, size=GROUP_SIZE):
+    """
+    Cuts springs in chain order (see spring_chains) into groups of up to size consecutive springs
+    of the same chain. Returns the group of every spring and a BoundsIndex over the nodes of
+    every group.
+    """
+    count = chain_of.size
+    if count == 0:
+        return np.empty(0, dtype=np.intp), BoundsIndex(np.empty(0, dtype=np.intp), np.zeros(1, dtype=np.intp))
+    chain_start = np.flatnonzero(np.r_[True, chain_of[1:] != chain_of[:-1]])
+    chain_lengths = np.diff(np.r_[chain_start, count])
+    within = np.arange(count) - np.repeat(chain_start, chain_lengths)
+    starts = np.flatnonzero(within % size == 0)
+    group_of = np.cumsum(within % size == 0) - 1
+
+    # A chain of k springs has k + 1 points, so a group's points start chain_of positions later
+    lengths = np.diff(np.r_[starts, count]) + 1
+    members = chain_points[concatenated_ranges(starts + chain_of[starts], lengths)]
+    return group_of, BoundsIndex(members, np.r_[0, np.cumsum(lengths)])
+
+
+def node_groups(body_nodes, body_offsets, node_count, size=GROUP_SIZE):
+    """
+    Groups nodes for culling: one group per soft body, and the nodes of no body in runs of up to
+    size in array order. Returns the BoundsIndex, whose members are node indices.
+    """
+    in_body = np.zeros(node_count, dtype=bool)
+    in_body[body_nodes] = True
+    free = np.flatnonzero(~in_body)
+    body_sizes = np.diff(body_offsets)
+    sizes = np.r_[body_sizes[body_sizes > 0], np.full(free.size // size, size), free.size % size]
+    sizes = sizes[sizes > 0].astype(np.intp)
+    return BoundsIndex(np.r_[body_nodes, free].astype(np.intp), np.r_[0, np.cumsum(sizes)])
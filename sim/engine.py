@@ -0,0 +1,451 @@
+import hashlib
+import warnings
+from math import exp
+
+import numpy as np
+
+from sim.constants import AIR_FRICTION
+from sim.kernels import HAS_NUMBA, DampingFactorCache, spring_forces
+from sim.pressure import PressureSolver
+from sim.profiling import DISABLED
+from sim.collision import CollisionSolver
+from sim.coloring import SpringColoring
+from sim.implicit import ImplicitSpringSolver
+from sim.picking import MousePicker
+from sim.islands import Islands
+from sim.scene import Scene
+from sim.snapshots import apply_snapshot, capture_snapshot, snapshot_dtype
+from sim.static import collide_obstacles
+from sim.state import scatter_add
+from sim.topology import SpringTopology
+from sim.world import WorldBounds, collide_walls
+from sim.xpbd import XpbdSolver
+
+
+class Engine:
+    """
+    Base class for simulation engines.
+    Runs on the arrays of a Scene: either one loaded from a file, or one gathered from the
+    simulation lists (see Scene.from_objects), in which case the Node and Spring objects become
+    thin views onto rows of those arrays.
+    Attributes:
+        scene (Scene): The arrays the engine runs on, with their drawing styles and body layout.
+        initial (Scene): A copy of the state the engine started from, which reset restores.
+        nodes (NodeArrays): The gathered node state.
+        springs (SpringArrays): The gathered spring state, with endpoint indices into nodes.
+        node_objects (list): The Node objects, in array order.
+        spring_objects (list): The Spring objects, in array order.
+        interactive (np.ndarray): Whether each node takes part in mouse dragging.
+        bounds (WorldBounds): The walls nodes bounce off, from config.world_bounds.
+        obstacles (SegmentBVH or None): The static obstacle segments of the scene, built into a hierarchy once.
+        explicit_springs (bool): Whether spring forces are integrated explicitly, which bounds the stable substep.
+        collider (CollisionSolver or None): Node/node and node/spring collisions, when enabled in the config.
+        coloring (SpringColoring): Batches of springs that share no nodes, computed on first use.
+        topology (SpringTopology): The intact springs, and the queue of break events.
+        ticks (int): How many ticks have ended.
+        profiler (Profiler): Times the phases of every substep, disabled unless a Simulation hands one over.
+    Methods:
+        step(dt, mouse_pos, mouse_pressed):
+            Advances the simulation by a single substep.
+        end_tick():
+            Compacts springs that broke during the tick out of the live set.
+        reset():
+            Copies the initial state back into the arrays.
+        snapshot(out=None):
+            Copies the mutable state into a compact snapshot record.
+        restore(snapshot):
+            Copies a snapshot back into the arrays, in place.
+        state_hash():
+            Returns a digest of the mutable state, equal between engines only for bit-identical states.
+    """
+
+    def __init__(self, nodes, springs, bodies, config, scene=None, geometry=None):
+        self.config = config
+        self.free_nodes = list(nodes)
+        self.free_springs = list(springs)
+        self.bodies = list(bodies)
+
+        if scene is None:
+            scene = Scene.from_objects(self.free_nodes, self.free_springs, self.bodies, geometry)
+        elif geometry is not None:
+            scene.set_geometry(geometry)
+        self.scene = scene
+        self.initial = scene.copy()
+        self.node_objects = scene.node_objects
+        self.spring_objects = scene.spring_objects
+        self.nodes = scene.nodes
+        self.springs = scene.springs
+        self.interactive = scene.interactive
+        self.bounds = WorldBounds.from_config(config)
+        self.obstacles = scene.obstacles()
+
+        self.collider = CollisionSolver(config.collision_cell_size) if config.collisions else None
+        self.topology = SpringTopology(self.springs)
+        self.coloring = SpringColoring(self.nodes.size, self.springs, self.topology)
+        self.ticks = 0
+        self.profiler = DISABLED
+        self.explicit_springs = True
+
+    def step(self, dt, mouse_pos, mouse_pressed):
+        raise NotImplementedError
+
+    def end_tick(self):
+        self.topology.compact(self.ticks)
+        self.ticks += 1
+
+    def reset(self):
+        self.scene.restore(self.initial)
+        self.ticks = 0
+        self._state_replaced()
+
+    def snapshot(self, out=None):
+        if out is None:
+            out = np.zeros((), snapshot_dtype(self.scene))
+        return capture_snapshot(self.scene, self.ticks, out)
+
+    def restore(self, snapshot):
+        self.ticks = apply_snapshot(self.scene, snapshot)
+        self._state_replaced()
+
+    def state_hash(self):
+        return hashlib.blake2b(self.snapshot().tobytes(), digest_size=16).hexdigest()
+
+    def _state_replaced(self):
+        # Everything derived from the broken flags is rebuilt, and queued events belong to the replaced state
+        self.topology.reset()
+        self.topology.events.clear()
+        self.coloring.invalidate()
+
+    def _record_breaks(self, indices, forces):
+        self.topology.record(self.ticks, indices, forces)
+
+    def _collide_world(self, free, pos, vel, dt):
+        # Walls first, so obstacles get the last word on nodes wedged between the two
+        collide_walls(self.nodes, free, pos, vel, self.bounds, dt)
+        if self.obstacles is not None:
+            collide_obstacles(self.nodes, free, pos, vel, self.obstacles, dt)
+
+    def _resolve_collisions(self):
+        if self.collider is not None:
+            with self.profiler.phase("collisions"):
+                self.collider.resolve(self.nodes, self.springs, self.topology.live)
+
+
+class PythonEngine(Engine):
+    """
+    The reference engine: updates every body, spring and node object one at a time.
+    Free springs that broke stop being updated from the next tick on.
+    Nodes collide with the walls as they update, and with obstacles over the node arrays after each
+    body and after the free nodes.
+    Needs the objects, so it cannot run scenes loaded from a file.
+    """
+
+    def __init__(self, nodes, springs, bodies, config, scene=None, geometry=None):
+        super().__init__(nodes, springs, bodies, config, scene, geometry)
+        if self.nodes.size and not self.node_objects:
+            raise ValueError("The python engine needs Node and Spring objects, use an array engine for loaded scenes")
+        self.all_free_springs = list(self.free_springs)
+        self.body_node_indices = np.split(self.scene.body_nodes, self.scene.body_offsets[1:-1])
+        self.free_node_indices = np.array([node._index for node in self.free_nodes], dtype=np.intp)
+
+    def _state_replaced(self):
+        super()._state_replaced()
+        self.free_springs = [spring for spring in self.all_free_springs if not self.springs.broken[spring._index]]
+
+    def end_tick(self):
+        broken = self.topology.broken_count
+        super().end_tick()
+        if self.topology.broken_count != broken:
+            self.free_springs = [spring for spring in self.free_springs if not self.springs.broken[spring._index]]
+
+    def step(self, dt, mouse_pos, mouse_pressed):
+        profile = self.profiler.phase
+        with profile("bodies"):
+            for body, indices in zip(self.bodies, self.body_node_indices):
+                body.update(dt, mouse_pos, mouse_pressed, self.bounds)
+                self._collide_obstacles(indices, dt)
+        with profile("springs"):
+            for spring in self.free_springs:
+                spring.update(dt)
+        with profile("nodes"):
+            for node in self.free_nodes:
+                node.mouse_integration(dt, mouse_pos, mouse_pressed)
+                node.update(dt, self.bounds)
+            self._collide_obstacles(self.free_node_indices, dt)
+        self._resolve_collisions()
+
+    def _collide_obstacles(self, indices, dt):
+        # Static nodes are skipped like in Node.update
+        if self.obstacles is None:
+            return
+        nodes = self.nodes
+        free = indices[~nodes.static[indices]]
+        pos, vel = nodes.pos[free], nodes.vel[free]
+        collide_obstacles(nodes, free, pos, vel, self.obstacles, dt)
+        nodes.pos[free] = pos
+        nodes.vel[free] = vel
+
+
+class NumpyEngine(Engine):
+    """
+    Vectorized engine: pressure, spring forces, mouse dragging, gravity, air friction, integration
+    and wall and obstacle collisions run as batched NumPy operations over the gathered arrays.
+    Mouse dragging goes through a MousePicker, which also drags lasso selections and whole bodies.
+    Springs are evaluated simultaneously from the same node state, rather than one after another,
+    unless config.compiled_kernels is set, in which case one loop (see sim.kernels.spring_forces)
+    evaluates and applies them in order like the per-object engine. That loop is compiled when
+    numba is installed and runs as plain Python otherwise, so the physics never depends on numba.
+    With config.sleeping, islands of nodes that have come to rest are skipped until disturbed.
+    With config.integrator set to "implicit", spring forces are applied through a backward Euler
+    step (see ImplicitSpringSolver), which keeps stiff springs stable at far fewer substeps.
+    With config.spring_batches set to "colored", springs are applied one color batch at a time,
+    each batch seeing the velocities left by the previous ones, which is closer to the in-order
+    per-object engine while staying vectorized.
+    """
+
+    def __init__(self, nodes, springs, bodies, config, scene=None, geometry=None):
+        super().__init__(nodes, springs, bodies, config, scene, geometry)
+        self.pressure = PressureSolver(self.scene)
+        self.damping_factors = DampingFactorCache()
+        self.picker = MousePicker(self)
+        self.compiled = config.compiled_kernels and config.integrator == "explicit"
+        self.compiled &= config.spring_batches == "jacobi"
+        if self.compiled and not HAS_NUMBA:
+            warnings.warn("numba is not installed, the in-order spring kernel runs as plain Python", stacklevel=2)
+        if config.spring_batches not in ("jacobi", "colored"):
+            raise ValueError(f"Unknown spring batching {config.spring_batches!r}, expected jacobi or colored")
+        self.implicit = None
+        self.explicit_springs = config.integrator == "explicit"
+        if config.integrator == "implicit":
+            self.implicit = ImplicitSpringSolver(config.implicit_iterations, config.implicit_tolerance)
+        elif config.integrator != "explicit":
+            raise ValueError(f"Unknown integrator {config.integrator!r}, expected explicit or implicit")
+        self.islands = None
+        self._create_islands()
+
+    def _create_islands(self):
+        config = self.config
+        if config.sleeping:
+            self.islands = Islands(
+                self.nodes, self.springs, config.sleep_velocity, config.sleep_acceleration, config.sleep_delay
+            )
+
+    def reset(self):
+        super().reset()
+        self.picker.release()
+        self.picker.clear_selection()
+
+    def _state_replaced(self):
+        super()._state_replaced()
+        self._create_islands()
+
+    def step(self, dt, mouse_pos, mouse_pressed):
+        profile = self.profiler.phase
+        awake = None
+        if self.islands is not None:
+            with profile("sleeping"):
+                awake = self.islands.begin_step(self.nodes, self.springs, self.topology.broken_count)
+        with profile("pressure"):
+            self._update_pressure(dt, awake)
+        with profile("springs"):
+            self._update_springs(dt, awake)
+        with profile("mouse"):
+            self._mouse_integration(dt, mouse_pos, mouse_pressed)
+        with profile("nodes"):
+            self._integrate(dt, awake)
+        self._resolve_collisions()
+        if self.islands is not None:
+            with profile("sleeping"):
+                self.islands.end_step(self.nodes, dt)
+
+    def _update_pressure(self, dt, awake=None):
+        self.pressure.update(self.nodes, dt, awake)
+
+    def _record_breaks(self, indices, forces):
+        # Bodies pop as soon as one of their springs breaks
+        super()._record_breaks(indices, forces)
+        self.pressure.springs_broken(indices)
+
+    def _update_springs(self, dt, awake=None):
+        nodes, springs = self.nodes, self.springs
+        if springs.size == 0:
+            return
+
+        # Springs broken earlier in this tick are still in the live set, so the flags are checked too
+        live = self.topology.live
+        damping_factor = self.damping_factors.get(springs, dt)
+        if self.compiled:
+            active = live if awake is None else live[awake[springs.node1[live]]]
+            snapped = spring_forces(
+                active,
+                nodes.pos,
+                nodes.vel,
+                np.where(nodes.static, 0.0, 1 / nodes.mass),
+                nodes.static,
+                springs.node1,
+                springs.node2,
+                springs.force,
+                springs.desired_length,
+                damping_factor,
+                springs.max_force,
+                springs.broken,
+                springs.total_force,
+                springs.last_direction,
+                dt,
+            )
+            if snapped:
+                snapped = active[springs.broken[active] & ~self.topology.recorded[active]]
+                force = springs.total_force[snapped]
+                self._record_breaks(snapped, np.hypot(force[:, 0], force[:, 1]))
+            return
+
+        node1, node2 = springs.node1[live], springs.node2[live]
+        active = ~springs.broken[live] & ~(nodes.static[node1] & nodes.static[node2])
+        if awake is not None:
+            # Both ends of a spring are always in the same island
+            active &= awake[node1]
+        active = live[active]
+
+        if self.config.spring_batches == "colored":
+            # No two springs of a batch share a node, so their impulses can be added in place
+            movable = ~nodes.static
+
+            def apply_batch(batch):
+                node1, node2, total_force = self._spring_forces(batch, damping_factor)[1:4]
+                impulse = total_force * dt
+                first, second = movable[node1], movable[node2]
+                nodes.vel[node1[first]] -= impulse[first] / nodes.mass[node1[first], None]
+                nodes.vel[node2[second]] += impulse[second] / nodes.mass[node2[second], None]
+
+            # Static pairs and sleeping islands are skipped like in the single batch below
+            included = np.zeros(springs.size, dtype=bool)
+            included[active] = True
+            self.coloring.for_each(lambda batch: apply_batch(batch[included[batch]]))
+            return
+
+        active, node1, node2, total_force, direction, distance = self._spring_forces(active, damping_factor)
+        if self.implicit is not None:
+            self.implicit.apply(nodes, springs, active, direction, distance, total_force, dt, ~nodes.static)
+            return
+
+        impulse = total_force * dt
+        size = nodes.size
+        delta_vel = scatter_add(node2, impulse, size) - scatter_add(node1, impulse, size)
+        movable = ~nodes.static
+        nodes.vel[movable] += delta_vel[movable] / nodes.mass[movable, None]
+
+    def _spring_forces(self, active, damping_factor):
+        """
+        Evaluates the given springs from the current node state and breaks the ones over their limit.
+        Returns the springs that did not break with their endpoints, total forces, directions and lengths.
+        """
+        nodes, springs = self.nodes, self.springs
+        node1 = springs.node1[active]
+        node2 = springs.node2[active]
+
+        # Direction of each spring, falling back to the last one for zero-length springs
+        delta = nodes.pos[node2] - nodes.pos[node1]
+        distance = np.hypot(delta[:, 0], delta[:, 1])
+        moving = distance != 0
+        direction = springs.last_direction[active]
+        direction[moving] = delta[moving] / distance[moving, None]
+        springs.last_direction[active] = direction
+
+        force = springs.force[active, None] * (direction * springs.desired_length[active, None] - delta)
+
+        # Damping removes part of the relative velocity along the spring
+        relative_velocity = np.einsum("ij,ij->i", nodes.vel[node2] - nodes.vel[node1], direction)
+        relative_velocity_delta = relative_velocity * (damping_factor[active] - 1)
+        damping_force = direction * (relative_velocity_delta / 2)[:, None]
+        damping_force[nodes.static[node1] | nodes.static[node2]] *= 2
+
+        total_force = damping_force + force
+        springs.total_force[active] = total_force
+
+        # Destroyable springs break instead of applying a force above their limit
+        snapped = np.hypot(total_force[:, 0], total_force[:, 1]) >= springs.max_force[active]
+        if snapped.any():
+            force = total_force[snapped]
+            self._record_breaks(active[snapped], np.hypot(force[:, 0], force[:, 1]))
+            intact = ~snapped
+            node1, node2, total_force = node1[intact], node2[intact], total_force[intact]
+            active, direction, distance = active[intact], direction[intact], distance[intact]
+
+        return active, node1, node2, total_force, direction, distance
+
+    def _mouse_integration(self, dt, mouse_pos, mouse_pressed):
+        self.picker.update(dt, mouse_pos, mouse_pressed)
+
+    def _integrate(self, dt, awake=None):
+        nodes = self.nodes
+        free = np.flatnonzero(~nodes.static if awake is None else ~nodes.static & awake)
+        pos = nodes.pos[free]
+        vel = nodes.vel[free]
+
+        vel[:, 1] += nodes.gravity[free] * dt
+        vel *= exp(-AIR_FRICTION * dt)
+        pos += vel * dt
+        self._collide_world(free, pos, vel, dt)
+
+        nodes.pos[free] = pos
+        nodes.vel[free] = vel
+
+
+class XpbdEngine(NumpyEngine):
+    """
+    Position based engine: nodes are moved by gravity, air friction and dragging, then their
+    predicted positions are projected onto the spring and pressure constraints (see XpbdSolver),
+    and velocities are derived from how far the nodes actually moved.
+    Distance constraints do not need extra substeps to stay stiff, so cloth barely stretches.
+    Nodes never go to sleep here, whatever config.sleeping says.
+    """
+
+    def __init__(self, nodes, springs, bodies, config, scene=None, geometry=None):
+        super().__init__(nodes, springs, bodies, config, scene, geometry)
+        self.solver = XpbdSolver(self.nodes, self.springs, self.pressure, self.coloring, config.xpbd_iterations)
+        self.explicit_springs = False
+
+    def _create_islands(self):
+        # Every node is projected on every substep, so there are no islands to put to sleep or report
+        self.islands = None
+
+    def step(self, dt, mouse_pos, mouse_pressed):
+        profile = self.profiler.phase
+        nodes = self.nodes
+        with profile("mouse"):
+            self._mouse_integration(dt, mouse_pos, mouse_pressed)
+        with profile("nodes"):
+            previous = nodes.pos.copy()
+            self._integrate(dt)
+        with profile("constraints"):
+            self._record_breaks(*self.solver.solve(nodes, self.springs, dt))
+
+        with profile("nodes"):
+            # Constraints may push nodes back into the walls and obstacles
+            free = np.flatnonzero(~nodes.static)
+            pos = nodes.pos[free]
+            vel = (pos - previous[free]) / dt
+            self._collide_world(free, pos, vel, dt)
+            nodes.pos[free] = pos
+            nodes.vel[free] = vel
+
+        with profile("damping"):
+            self.solver.damp(nodes, self.springs, dt)
+        self._resolve_collisions()
+
+
+ENGINES = {
+    "python": PythonEngine,
+    "numpy": NumpyEngine,
+    "xpbd": XpbdEngine,
+}
+
+
+def create_engine(config, nodes=(), springs=(), bodies=(), scene=None, geometry=None):
+    """
+    Creates the engine selected by config.engine, on the given objects or on a loaded Scene,
+    with the static obstacles of geometry (a StaticGeometry) if given.
+    """
+    if config.engine not in ENGINES:
+        raise ValueError(f"Unknown engine {config.engine!r}, expected one of {', '.join(ENGINES)}")
+    return ENGINES[config.engine](nodes, springs, bodies, config, scene, geometry)
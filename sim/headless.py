@@ -0,0 +1,124 @@
+import random
+from typing import List, Optional
+
+from sim.adaptive import AdaptiveSubsteps
+from sim.engine import create_engine
+from sim.scene import Scene
+from sim.sim import SimulationConfig
+from sim.static import StaticGeometry
+
+# Headless runs have no cursor, so nothing is ever dragged
+NO_MOUSE_POS = (0, 0)
+NO_MOUSE_PRESSED = (False, False, False)
+
+
+class HeadlessSimulation:
+    """
+    Runs a scene without a window, event polling, font or frame clock.
+    Every tick advances the scene by a fixed dt, split into config.substeps substeps (or as
+    many as the adaptive stepper picks, with config.adaptive_substeps), as fast as the engine
+    allows. Accepts the same nodes, springs and bodies lists that the demo build() functions
+    produce, or a Scene, and static obstacles as geometry.
+    Attributes:
+        config (SimulationConfig): Substeps and engine selection (display settings are ignored).
+        dt (float): The fixed, normalized time step of each tick (1 is one frame at the target fps).
+        ticks (int): How many ticks have been simulated so far.
+        substeps (int): How many substeps the last tick was split into.
+        rng (random.Random): The random generator callbacks should draw from, seeded with config.seed.
+        engine (Engine): The engine holding the node and spring arrays.
+    Methods:
+        step(callback=None):
+            Simulates a single tick.
+        run(ticks, callback=None):
+            Simulates a number of ticks and returns the final node positions and velocities.
+        stream(ticks, every=1, callback=None):
+            Simulates a number of ticks, yielding (tick, positions, velocities) along the way.
+        reset():
+            Puts the engine back into its initial state.
+        snapshot():
+            Returns a snapshot of the mutable state, see Engine.snapshot.
+        restore(snapshot):
+            Puts the engine back into the state of a snapshot.
+    """
+
+    def __init__(
+        self,
+        config: Optional[SimulationConfig] = None,
+        nodes: Optional[List] = None,
+        springs: Optional[List] = None,
+        bodies: Optional[List] = None,
+        dt=1,
+        scene: Optional[Scene] = None,
+        geometry: Optional[StaticGeometry] = None,
+    ):
+        self.config = config or SimulationConfig()
+        self.nodes = nodes or []
+        self.springs = springs or []
+        self.bodies = bodies or []
+        self.dt = dt
+        self.ticks = 0
+        self.rng = random.Random(self.config.seed)
+        self.adaptive = AdaptiveSubsteps.from_config(self.config) if self.config.adaptive_substeps else None
+        self.substeps = self.config.substeps
+        self.engine = create_engine(self.config, self.nodes, self.springs, self.bodies, scene, geometry)
+
+    @classmethod
+    def from_scene(cls, values, config: Optional[SimulationConfig] = None, dt=1, geometry=None):
+        """Create a headless simulation from the (nodes, springs[, bodies]) a build() function returns, or a Scene"""
+        if isinstance(values, Scene):
+            return cls(config, dt=dt, scene=values, geometry=geometry)
+        values = list(values) + [None] * (3 - len(values))
+        return cls(config, nodes=values[0], springs=values[1], bodies=values[2], dt=dt, geometry=geometry)
+
+    def get_engine(self):
+        """Return the engine, like Simulation.get_engine"""
+        return self.engine
+
+    def step(self, callback=None):
+        """Simulate a single tick, calling callback(self) first like Simulation.simulate does"""
+        if callback is not None:
+            callback(self)
+
+        substeps = self.config.substeps
+        if self.adaptive is not None:
+            substeps = self.adaptive.choose(self.engine, self.dt)
+        substep_dt = self.dt / substeps
+        for _ in range(substeps):
+            self.engine.step(substep_dt, NO_MOUSE_POS, NO_MOUSE_PRESSED)
+        self.engine.end_tick()
+        self.substeps = substeps
+
+        self.ticks += 1
+
+    def reset(self):
+        """Copy the initial state back into the engine's arrays"""
+        self.engine.reset()
+        self.ticks = 0
+        self.rng.seed(self.config.seed)
+
+    def snapshot(self):
+        """Return a snapshot of the mutable state, which restore() puts back in place"""
+        return self.engine.snapshot()
+
+    def restore(self, snapshot):
+        """Restore a snapshot, including the tick it was taken on"""
+        self.engine.restore(snapshot)
+        self.ticks = self.engine.ticks
+
+    def state(self):
+        """Return copies of the current node positions and velocities"""
+        return self.engine.nodes.pos.copy(), self.engine.nodes.vel.copy()
+
+    def run(self, ticks, callback=None):
+        """Simulate a number of ticks and return the final node positions and velocities"""
+        for _ in range(ticks):
+            self.step(callback)
+        return self.state()
+
+    def stream(self, ticks, every=1, callback=None):
+        """Simulate a number of ticks, yielding (tick, positions, velocities) every few ticks"""
+        for _ in range(ticks):
+            self.step(callback)
+            if self.ticks % every == 0:
+                positions, velocities = self.state()
+                yield self.ticks, positions, velocities
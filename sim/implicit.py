@@ -0,0 +1,88 @@
+import numpy as np
+
+from sim.state import scatter_add
+
+
+class ImplicitSpringSolver:
+    """
+    Applies spring forces with a backward Euler step instead of an explicit impulse.
+    The velocity change dv of every free node solves the linearized system
+        (M - dt^2 K) dv = dt * f + dt^2 * K v
+    where f are the spring forces of this substep (elastic and damping), M the node masses and
+    K the stiffness matrix of the elastic part. The system is solved with Jacobi preconditioned
+    conjugate gradient without ever building K: every product is a pass over the springs.
+    The transverse part of K is dropped for compressed springs, which keeps the system
+    positive definite, so stiff springs stay stable at a handful of substeps.
+    Attributes:
+        max_iterations (int): Most conjugate gradient iterations per substep.
+        tolerance (float): Relative residual at which the solve stops early.
+        iterations (int): How many iterations the last solve took.
+    Methods:
+        apply(nodes, springs, active, direction, distance, total_force, dt, movable):
+            Solves for and applies the velocity change of one substep.
+    """
+
+    def __init__(self, max_iterations=50, tolerance=1e-6):
+        self.max_iterations = max_iterations
+        self.tolerance = tolerance
+        self.iterations = 0
+
+    def apply(self, nodes, springs, active, direction, distance, total_force, dt, movable):
+        """
+        Applies the forces of the active springs (total_force, along with their current direction
+        and length) to the velocities of the movable nodes through one backward Euler step.
+        """
+        size = nodes.size
+        node1, node2 = springs.node1[active], springs.node2[active]
+        stiffness = springs.force[active]
+
+        # Per spring stiffness along the spring and across it (the geometric term, 0 when compressed)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            transverse = np.where(distance > 0, 1 - springs.desired_length[active] / distance, 0)
+        transverse = stiffness * np.maximum(transverse, 0)
+        axial = stiffness - transverse
+
+        def hessian(relative):
+            # -K applied to the relative motion of each spring's endpoints
+            along = np.einsum("ij,ij->i", relative, direction)
+            return transverse[:, None] * relative + (axial * along)[:, None] * direction
+
+        # Every spring pushes its second node one way and its first node the other
+        ends = np.concatenate((node2, node1))
+
+        def scatter(per_spring):
+            return scatter_add(ends, np.concatenate((per_spring, -per_spring)), size)
+
+        mass = nodes.mass[:, None]
+        free = movable[:, None]
+        scale = dt * dt
+
+        def operator(vector):
+            vector = vector * free
+            result = mass * vector + scale * scatter(hessian(vector[node2] - vector[node1]))
+            return result * free
+
+        rhs = dt * scatter(total_force) - scale * scatter(hessian(nodes.vel[node2] - nodes.vel[node1]))
+        rhs *= free
+
+        # Diagonal of the system as the preconditioner
+        diagonal = transverse[:, None] + axial[:, None] * direction**2
+        preconditioner = 1 / (mass + scale * scatter_add(ends, np.concatenate((diagonal, diagonal)), size))
+
+        delta_vel = np.zeros((size, 2))
+        residual = rhs
+        search = residual * preconditioner
+        rz = np.vdot(residual, search)
+        threshold = self.tolerance**2 * np.vdot(rhs, rhs)
+        self.iterations = 0
+        while self.iterations < self.max_iterations and np.vdot(residual, residual) > threshold:
+            product = operator(search)
+            alpha = rz / np.vdot(search, product)
+            delta_vel += alpha * search
+            residual = residual - alpha * product
+            preconditioned = residual * preconditioner
+            rz, rz_old = np.vdot(residual, preconditioned), rz
+            search = preconditioned + rz / rz_old * search
+            self.iterations += 1
+
+        nodes.vel[movable] += delta_vel[movable]
@@ -0,0 +1,106 @@
+import numpy as np
+
+
+def connected_components(size, first, second):
+    """
+    Labels the connected components of a graph with `size` vertices and edges (first[i], second[i]).
+    Returns a label per vertex, numbered from 0 without gaps.
+    Works by hooking roots onto smaller roots and pointer jumping, so it only loops O(log n) times.
+    """
+    labels = np.arange(size)
+    while True:
+        # Pointer jumping until every vertex points at its root
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+
+        root1, root2 = labels[first], labels[second]
+        split = root1 != root2
+        if not split.any():
+            break
+        low = np.minimum(root1[split], root2[split])
+        high = np.maximum(root1[split], root2[split])
+        np.minimum.at(labels, high, low)
+
+    return np.unique(labels, return_inverse=True)[1]
+
+
+class Islands:
+    """
+    Puts groups of nodes to sleep once they come to rest.
+    Islands are the connected components of the spring graph. An island falls asleep after
+    every node in it has stayed below the velocity and acceleration (net force / mass)
+    thresholds for `delay` substeps in a row, after which the engine skips its springs,
+    pressure and integration entirely. A sleeping island wakes up when any of its nodes is
+    dragged, pushed or moved from outside the engine (for example a collision with an awake
+    neighbour, or a callback moving a static node).
+    Attributes:
+        labels (np.ndarray): The island of every node.
+        asleep (np.ndarray): Whether each island is asleep.
+        awake_nodes (int): How many non-static nodes were simulated in the last substep.
+    Methods:
+        begin_step(nodes, springs, broken_count):
+            Wakes islands disturbed since the last substep, returns the mask of awake nodes.
+        end_step(nodes, dt):
+            Wakes disturbed islands and puts calm ones to sleep.
+    """
+
+    def __init__(self, nodes, springs, velocity=0.05, acceleration=0.05, delay=60):
+        self.velocity = velocity
+        self.acceleration = acceleration
+        self.delay = delay
+        self._label(nodes, springs)
+        self.last_pos = nodes.pos.copy()
+        self.last_vel = nodes.vel.copy()
+        self.awake = np.ones(nodes.size, dtype=bool)
+        self.awake_nodes = int(np.count_nonzero(~nodes.static))
+
+    def _label(self, nodes, springs):
+        live = ~springs.broken
+        self.broken = springs.size - int(np.count_nonzero(live))
+        self.labels = connected_components(nodes.size, springs.node1[live], springs.node2[live])
+        self.count = int(self.labels.max()) + 1 if nodes.size else 0
+        self.asleep = np.zeros(self.count, dtype=bool)
+        self.calm = np.zeros(self.count, dtype=np.intp)
+
+    def _wake(self, disturbed):
+        islands = np.unique(self.labels[disturbed])
+        self.asleep[islands] = False
+        self.calm[islands] = 0
+
+    def begin_step(self, nodes, springs, broken_count):
+        # Broken springs can split islands apart
+        if broken_count != self.broken:
+            self._label(nodes, springs)
+
+        moved = np.any(nodes.pos != self.last_pos, axis=1)
+        if moved.any():
+            self._wake(moved)
+
+        self.awake = ~self.asleep[self.labels]
+        self.last_vel[:] = nodes.vel
+        return self.awake
+
+    def end_step(self, nodes, dt):
+        sleeping = ~self.awake
+        disturbed = sleeping & (nodes.dragging | np.any(nodes.vel != 0, axis=1))
+        if disturbed.any():
+            self._wake(disturbed)
+
+        # An island is calm when none of its nodes moves or accelerates noticeably
+        speed = np.hypot(nodes.vel[:, 0], nodes.vel[:, 1])
+        change = nodes.vel - self.last_vel
+        acceleration = np.hypot(change[:, 0], change[:, 1]) / dt
+        restless = ~nodes.static & ((speed >= self.velocity) | (acceleration >= self.acceleration)) | nodes.dragging
+        calm = np.bincount(self.labels, restless, self.count) == 0
+        self.calm = np.where(calm & ~self.asleep, self.calm + 1, 0)
+
+        settled = self.calm >= self.delay
+        if settled.any():
+            self.asleep |= settled
+            nodes.vel[settled[self.labels]] = 0
+
+        self.awake_nodes = int(np.count_nonzero(self.awake & ~nodes.static))
+        self.last_pos[:] = nodes.pos
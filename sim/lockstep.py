@@ -0,0 +1,64 @@
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import numpy as np
+
+from sim.headless import HeadlessSimulation
+from sim.scene import Scene
+
+
+@dataclass
+class LockstepResult:
+    """The tick by tick comparison of runs stepped in lockstep against the first one."""
+
+    ticks: int = 0
+    first_mismatch: Optional[int] = None  # first tick after which a state hash differed from the first run's
+    max_deviation: float = 0.0  # largest node position difference from the first run
+    deviations: List[float] = field(default_factory=list)  # largest position difference after every tick
+    hashes: List[List[str]] = field(default_factory=list)  # state hash of every run after every tick
+
+    @property
+    def identical(self):
+        return self.first_mismatch is None
+
+
+def lockstep(builder, configs, ticks, callback=None, dt=1, stop_on_mismatch=False):
+    """
+    Build one headless run per config with builder() and step them side by side, comparing the
+    state hash and node positions of every run to the first one after each tick.
+    Runs are bit-identical only if their configs share a seed and callbacks draw from sim.rng,
+    e.g. to check that a change to an engine did not change its results, or how far the numpy
+    engine drifts from the reference one:
+
+        result = lockstep(building.build, [SimulationConfig(engine="python", seed=1),
+                                           SimulationConfig(engine="numpy", seed=1)], 600, building.earthquake)
+        print(result.first_mismatch, result.max_deviation)
+
+    builder returns the (nodes, springs[, bodies]) of a build() function, or a Scene. It is called
+    once per run, since objects cannot be shared between engines; a Scene is copied instead.
+    """
+    sims = []
+    for config in configs:
+        values = builder()
+        if isinstance(values, Scene):
+            values = values.copy()
+        sims.append(HeadlessSimulation.from_scene(values, config, dt))
+
+    reference = sims[0].engine.nodes
+    result = LockstepResult()
+    for _ in range(ticks):
+        for sim in sims:
+            sim.step(callback)
+        result.ticks += 1
+
+        hashes = [sim.engine.state_hash() for sim in sims]
+        result.hashes.append(hashes)
+        deviation = max((float(np.abs(sim.engine.nodes.pos - reference.pos).max(initial=0)) for sim in sims[1:]), default=0.0)
+        result.deviations.append(deviation)
+        result.max_deviation = max(result.max_deviation, deviation)
+
+        if result.first_mismatch is None and len(set(hashes)) > 1:
+            result.first_mismatch = result.ticks
+            if stop_on_mismatch:
+                break
+    return result
@@ -0,0 +1,142 @@
+from collections import namedtuple
+
+import pygame
+
+# Drawing parameters shared by many nodes and springs, the numeric ones live in the engine arrays
+NodeMaterial = namedtuple("NodeMaterial", ["color", "static_color", "dragging_color"])
+SpringMaterial = namedtuple("SpringMaterial", ["color", "color1", "color2", "width"])
+
+
+def _hashable(value):
+    # Colors may be given as pygame.Color objects or lists, which cannot be dictionary keys
+    if value is None or isinstance(value, (str, int, float, tuple)):
+        return value
+    return tuple(value)
+
+
+class MaterialTable:
+    """
+    Interns parameter rows shared by many objects, so every object only keeps the index of its row.
+    A cloth of thousands of springs with the same colors and width holds one row between them;
+    changing a parameter of one object interns the row with that field replaced.
+    Rows are reference counted: a row no object uses any more (after a recolor, or once its objects
+    are gone) is forgotten and its index handed to the next new row, so changing colors every frame
+    does not grow the table.
+    Attributes:
+        rows (list): The rows by index; the rows of free indices are stale until reused.
+        counts (list): How many objects use each row.
+    Methods:
+        intern(row):
+            Returns the index of the row, adding it if it is new, and counts one more user of it.
+        release(index):
+            Counts one user less of the row at index, freeing the index when none are left.
+        replace(index, **changes):
+            Moves one user of the row at index to that row with some fields changed, and returns its index.
+    """
+
+    def __init__(self):
+        self.rows = []
+        self.counts = []
+        self.ids = {}
+        self.free = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        return self.rows[index]
+
+    def intern(self, row):
+        row = type(row)(*map(_hashable, row))
+        index = self.ids.get(row)
+        if index is None:
+            if self.free:
+                index = self.free.pop()
+                self.rows[index] = row
+                self.counts[index] = 0
+            else:
+                index = len(self.rows)
+                self.rows.append(row)
+                self.counts.append(0)
+            self.ids[row] = index
+        self.counts[index] += 1
+        return index
+
+    def release(self, index):
+        self.counts[index] -= 1
+        if self.counts[index] == 0:
+            del self.ids[self.rows[index]]
+            self.free.append(index)
+
+    def replace(self, index, **changes):
+        # The new row is interned first, so an unchanged row is never freed on the way
+        new_index = self.intern(self.rows[index]._replace(**changes))
+        self.release(index)
+        return new_index
+
+
+class MaterialColor(pygame.Color):
+    """
+    A pygame.Color read from a color field of an object's material that writes any change back to
+    the object, so `spring.color1.r = 0` recolors the spring like it did when springs owned their colors.
+    """
+
+    __slots__ = ("_owner",)
+
+    def __new__(cls, value, obj=None, name=None):
+        return super().__new__(cls, value)
+
+    def __init__(self, value, obj=None, name=None):
+        super().__init__(value)
+        self._owner = (obj, name)
+
+    def _write_back(self):
+        obj, name = self._owner
+        if obj is not None:
+            setattr(obj, name, pygame.Color(self))
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if not name.startswith("_"):
+            self._write_back()
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self._write_back()
+
+
+class MaterialField:
+    """
+    Descriptor exposing one field of an object's material row as an attribute, optionally wrapped
+    on read as wrap(value, obj, name) (see MaterialColor).
+    A wrapped value is built on the first read and kept in the object's "_<name>" slot until the
+    field is set again, so reading it every frame does not allocate.
+    """
+
+    def __init__(self, table, wrap=None):
+        self.table = table
+        self.wrap = wrap
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.cache = "_" + name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        if self.wrap is None:
+            return getattr(self.table.rows[obj._material], self.name)
+        wrapped = getattr(obj, self.cache, None)
+        if wrapped is None:
+            wrapped = self.wrap(getattr(self.table.rows[obj._material], self.name), obj, self.name)
+            setattr(obj, self.cache, wrapped)
+        return wrapped
+
+    def __set__(self, obj, value):
+        obj._material = self.table.replace(obj._material, **{self.name: value})
+        if self.wrap is not None:
+            setattr(obj, self.cache, None)
+
+
+NODE_MATERIALS = MaterialTable()
+SPRING_MATERIALS = MaterialTable()
@@ -1,5 +1,7 @@
+from functools import lru_cache
 from math import exp
 
+import numpy as np
 import pygame
 
 from sim.constants import (
@@ -8,13 +10,33 @@ from sim.constants import (
     ELASTICITY,
     FRICTION,
     GRAVITY,
-    HEIGHT,
     NODE_DRAGGING_COLOR,
     NODE_IDLE_COLOR,
     NODE_RADIUS,
     NODE_STATIC_COLOR,
-    WIDTH,
 )
+from sim.materials import NODE_MATERIALS, MaterialField, NodeMaterial
+from sim.state import Field, NodeArrays, VectorField, bind
+from sim.world import WorldBounds
+
+# The walls of Node.update when it is not given any, the screen sized world of sim.constants
+SCREEN_BOUNDS = WorldBounds.from_config(None)
+# The axis and normal direction of the left, right, top and bottom walls
+WALLS = ((0, 1), (0, -1), (1, 1), (1, -1))
+
+
+@lru_cache(maxsize=256)
+def _wall_friction(friction, dt):
+    # exp(-friction * dt) as NumPy computes it in collide_walls, since math.exp can differ in the last bit
+    return np.exp(-friction * dt).item()
+
+
+def accelerate(views, index, fx, fy, dt):
+    """Adds what a force does to a node's velocity over dt, on its row of a store's views"""
+    # pygame.Vector2 divides by multiplying with the reciprocal, and so does this
+    vel, inverse_mass, x = views.vel, 1 / views.mass[index], 2 * index
+    vel[x] = vel[x] + fx * dt * inverse_mass
+    vel[x + 1] = vel[x + 1] + fy * dt * inverse_mass
 
 
 class Node:
@@ -48,18 +70,44 @@ class Node:
         Whether the node is static (default is False).
     Methods
     -------
-    update(dt: float) -> None:
-        Updates the node's position and velocity based on the elapsed time.
-    find_collisions() -> list:
-        Finds and returns a list of collisions with the boundaries.
+    update(dt: float, bounds=None) -> None:
+        Updates the node's position and velocity based on the elapsed time, then collides it with the walls.
+    find_collisions(dt: float, bounds=None) -> None:
+        Pushes the node back inside the world bounds (the screen when not given).
     mouse_integration(dt: float, mouse_pos: tuple, mouse_down: tuple) -> None:
         Integrates mouse interactions with the node.
     apply_force(force: pygame.Vector2, dt: float) -> None:
         Applies a force to the node.
     draw(display) -> None:
         Draws the node on the given display.
+
+    Array-backed attributes (pos, vel, mass, gravity, radius, elasticity, friction,
+    draggable, static and dragging) live in a NodeArrays row, so once a simulation engine
+    gathers its nodes the Node becomes a thin view onto the shared arrays. The colors live in
+    a shared NodeMaterial row. __slots__ leaves every Node with its row, its material and the
+    Vec2Views of pos and vel, which are made once (see sim.state.bind).
+    update collides the node with the walls right away (see sim.world.collide_walls), so nodes
+    stepped outside an engine stay inside the world; engines pass in the bounds of their world.
+    update, mouse_integration, apply_force and the Spring updates read and write their rows as
+    plain floats through the store's memoryviews, since they run for every object on every substep.
     """
 
+    __slots__ = ("_store", "_index", "_material", "_pos", "_vel")
+
+    pos = VectorField()
+    vel = VectorField()
+    mass = Field()
+    gravity = Field()
+    radius = Field()
+    elasticity = Field()
+    friction = Field()
+    draggable = Field()
+    static = Field()
+    dragging = Field()
+    color = MaterialField(NODE_MATERIALS)
+    static_color = MaterialField(NODE_MATERIALS)
+    dragging_color = MaterialField(NODE_MATERIALS)
+
     def __init__(
         self,
         pos,
@@ -75,6 +123,9 @@ class Node:
         draggable=True,
         static=False,
     ):
+        bind(self, *NodeArrays.allocate())
+        self._material = NODE_MATERIALS.intern(NodeMaterial(color, static_color, dragging_color))
+
         self.pos = pygame.Vector2(pos)
         self.mass = mass
         self.vel = pygame.Vector2(vel)
@@ -82,57 +133,62 @@ class Node:
         self.radius = radius
         self.elasticity = elasticity
         self.friction = friction
-        self.color = color
-        self.dragging_color = dragging_color
         self.draggable = draggable
         self.static = static
-        self.static_color = static_color
         self.dragging = False
 
-    def update(self, dt: float) -> None:
-        if self.static:
-            return
-
-        self.vel.y += self.gravity * dt
-        self.vel *= exp(-AIR_FRICTION * dt)
-        self.pos += self.vel * dt
-
-        collisions = self.find_collisions()
-
-        for collision in collisions:
-            if collision[0] < 0.0:
-                continue
-
-            self.pos += collision[1] * collision[0]
-
-            normal_velocity = collision[1] * self.vel.dot(collision[1])
-            tangential_velocity = self.vel - normal_velocity
+    def __del__(self):
+        NODE_MATERIALS.release(self._material)
 
-            self.vel = normal_velocity * -self.elasticity + tangential_velocity * exp(-self.friction * dt)
+    def update(self, dt: float, bounds=None) -> None:
+        views, index = self._store.views, self._index
+        if views.static[index]:
+            return
 
-    def find_collisions(self):
-        # returns in the form depth, normal (need to look in detail later)
-        collisions = []
-        if self.pos.x - self.radius < 0:
-            collisions.append([-(self.pos.x - self.radius), pygame.Vector2(1, 0)])
-        if self.pos.x + self.radius > WIDTH:
-            collisions.append([(self.pos.x + self.radius) - WIDTH, pygame.Vector2(-1, 0)])
-        if self.pos.y - self.radius < 0:
-            collisions.append([-(self.pos.y - self.radius), pygame.Vector2(0, 1)])
-        if self.pos.y + self.radius > HEIGHT:
-            collisions.append([(self.pos.y + self.radius) - HEIGHT, pygame.Vector2(0, -1)])
+        pos, vel, x = views.pos, views.vel, 2 * index
+        air_friction = exp(-AIR_FRICTION * dt)
+        vx = vel[x] * air_friction
+        vy = (vel[x + 1] + views.gravity[index] * dt) * air_friction
+        vel[x] = vx
+        vel[x + 1] = vy
+        pos[x] = pos[x] + vx * dt
+        pos[x + 1] = pos[x + 1] + vy * dt
+
+        self.find_collisions(dt, bounds)
+
+    def find_collisions(self, dt: float, bounds=None) -> None:
+        # sim.world.collide_walls on this node's row alone, in plain floats
+        bounds = SCREEN_BOUNDS if bounds is None else bounds
+        views, index = self._store.views, self._index
+        pos, x = views.pos, 2 * index
+        px, py, radius = pos[x], pos[x + 1], views.radius[index]
+        depths = (
+            radius - (px - bounds.left),
+            px + radius - bounds.right,
+            radius - (py - bounds.top),
+            py + radius - bounds.bottom,
+        )
+        if max(depths) <= 0:
+            return
 
-        return collisions
+        vel = views.vel
+        for depth, (axis, sign) in zip(depths, WALLS):
+            if depth > 0:
+                pos[x + axis] += sign * depth
+                vel[x + axis] *= -views.elasticity[index]
+                vel[x + 1 - axis] *= _wall_friction(views.friction[index], dt)
 
     def mouse_integration(self, dt, mouse_pos, mouse_down):
-        if not self.draggable:
+        views, index = self._store.views, self._index
+        if not views.draggable[index]:
             return
 
-        if not mouse_down[0] and self.dragging:
-            self.dragging = False
+        dragging = views.dragging[index]
+        if not mouse_down[0] and dragging:
+            views.dragging[index] = dragging = False
 
         if (
-            self.dragging
+            dragging
             or mouse_down[0]
             and (mouse_pos[0] - self.pos[0]) ** 2 + (mouse_pos[1] - self.pos[1]) ** 2 <= self.radius**2
         ):
@@ -145,9 +201,12 @@ class Node:
             self.dragging = True
 
     def apply_force(self, force: pygame.Vector2, dt: float) -> None:
-        if self.static:
-            return
-        self.vel += force * dt / self.mass
+        self._apply_force(force[0], force[1], dt)
+
+    def _apply_force(self, fx, fy, dt):
+        views, index = self._store.views, self._index
+        if not views.static[index]:
+            accelerate(views, index, fx, fy, dt)
 
     def draw(self, display):
         if self.dragging:
@@ -0,0 +1,137 @@
+import numpy as np
+
+from sim.collision import SpatialHash
+from sim.constants import DRAG_STRENGTH
+
+
+class MousePicker:
+    """
+    Mouse dragging for the array engines, done once per press instead of testing every node every substep.
+    When a button goes down the nodes are sorted into a SpatialHash and only the cells around the
+    cursor are searched for nodes it is over. The picked node ids are kept in a small array and
+    the drag force is applied to them alone until the button is released; while the mouse is up,
+    an update does no work at all.
+    The left button drags the node under the cursor, or the whole lasso selection when pressed on
+    one of its nodes. The right button drags the whole soft body under the cursor. Group drags keep
+    the offsets the nodes had from the cursor when they were picked.
+    Attributes:
+        dragged (np.ndarray): Indices of the nodes being dragged.
+        selection (np.ndarray): Indices of the nodes selected with the lasso.
+    Methods:
+        update(dt, mouse_pos, mouse_pressed):
+            Picks nodes when a button goes down, drags them while it is held and drops them on release.
+        release():
+            Drops the dragged nodes.
+        nodes_at(point):
+            Returns the nodes the point is over.
+        select_lasso(points):
+            Selects the draggable nodes inside the polygon traced by the points.
+        clear_selection():
+            Empties the lasso selection.
+    """
+
+    def __init__(self, engine):
+        self.nodes = engine.nodes
+        self.grabbable = engine.interactive & engine.nodes.draggable
+        scene = engine.scene
+        self.body_of = np.full(engine.nodes.size, -1, dtype=np.intp)
+        self.body_of[scene.body_nodes] = np.repeat(np.arange(scene.body_offsets.size - 1), np.diff(scene.body_offsets))
+        self.body_nodes = np.split(scene.body_nodes, scene.body_offsets[1:-1])
+
+        self.index = SpatialHash()
+        self.dragged = np.empty(0, dtype=np.intp)
+        self.offsets = np.empty((0, 2))
+        self.selection = np.empty(0, dtype=np.intp)
+        self.held = False
+
+    def update(self, dt, mouse_pos, mouse_pressed):
+        left = mouse_pressed[0]
+        right = len(mouse_pressed) > 2 and mouse_pressed[2]
+        if not (left or right):
+            if self.held:
+                self.release()
+            return
+
+        if not self.held:
+            self.held = True
+            self._pick(mouse_pos, whole_body=not left)
+        if self.dragged.size:
+            self._drag(dt, mouse_pos)
+
+    def release(self):
+        self.nodes.dragging[self.dragged] = False
+        self.dragged = self.dragged[:0]
+        self.held = False
+
+    def nodes_at(self, point):
+        nodes = self.nodes
+        if nodes.size == 0:
+            return np.empty(0, dtype=np.intp)
+        self.index.build(nodes.pos, nodes.radius)
+
+        reach = nodes.radius.max()
+        point = np.asarray(point, dtype=np.float64)
+        candidates = self.index.nodes_in_box(point - reach, point + reach)
+        offset = nodes.pos[candidates] - point
+        return candidates[np.einsum("ij,ij->i", offset, offset) <= nodes.radius[candidates] ** 2]
+
+    def _pick(self, mouse_pos, whole_body):
+        nodes = self.nodes
+        hit = self.nodes_at(mouse_pos)
+        offsets = True
+        if whole_body:
+            # The body of the closest grabbable node under the cursor, so bodies without
+            # draggable_points stay put like their nodes do
+            hit = hit[(self.body_of[hit] >= 0) & self.grabbable[hit]]
+            if hit.size:
+                closest = hit[np.argmin(np.hypot(*(nodes.pos[hit] - mouse_pos).T))]
+                members = self.body_nodes[self.body_of[closest]]
+                hit = members[self.grabbable[members]]
+        else:
+            hit = hit[self.grabbable[hit]]
+            if self.selection.size and np.isin(hit, self.selection).any():
+                hit = self.selection
+            else:
+                # Single nodes are pulled onto the cursor itself, like Node.mouse_integration,
+                # and clicking anywhere but the selection drops it
+                offsets = False
+                self.clear_selection()
+
+        self.dragged = hit
+        self.offsets = nodes.pos[hit] - mouse_pos if offsets else np.zeros((hit.size, 2))
+        nodes.dragging[hit] = True
+
+    def _drag(self, dt, mouse_pos):
+        # Static nodes snap to their target, others are pulled towards it
+        nodes = self.nodes
+        dragged = self.dragged
+        target = self.offsets + np.asarray(mouse_pos, dtype=np.float64)
+        static = nodes.static[dragged]
+        nodes.pos[dragged[static]] = target[static]
+        pulled = dragged[~static]
+        nodes.vel[pulled] = (target[~static] - nodes.pos[pulled]) * DRAG_STRENGTH * dt
+
+    def select_lasso(self, points):
+        nodes = self.nodes
+        polygon = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(polygon) < 3 or nodes.size == 0:
+            self.selection = np.empty(0, dtype=np.intp)
+            return self.selection
+
+        self.index.build(nodes.pos, nodes.radius)
+        candidates = self.index.nodes_in_box(polygon.min(axis=0), polygon.max(axis=0))
+        candidates = candidates[self.grabbable[candidates]]
+
+        # Even-odd rule: count the polygon edges crossed by a ray going right from every node
+        x, y = nodes.pos[candidates, 0, None], nodes.pos[candidates, 1, None]
+        a, b = polygon, np.roll(polygon, -1, axis=0)
+        straddles = (a[:, 1] > y) != (b[:, 1] > y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            crossing_x = a[:, 0] + (y - a[:, 1]) * (b[:, 0] - a[:, 0]) / (b[:, 1] - a[:, 1])
+        inside = np.count_nonzero(straddles & (x < crossing_x), axis=1) % 2 == 1
+
+        self.selection = np.sort(candidates[inside])
+        return self.selection
+
+    def clear_selection(self):
+        self.selection = np.empty(0, dtype=np.intp)
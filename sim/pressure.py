@@ -0,0 +1,96 @@
+import numpy as np
+
+from sim.state import scatter_add
+
+
+class PressureSolver:
+    """
+    Solves the internal pressure of every pressurized soft body in one batch.
+    The outlines of all bodies are packed into one ring-index buffer (each entry pointing at a
+    node and at the next node around its body), so shoelace areas, edge lengths, normals and
+    pressure forces are computed with array operations over all bodies at once.
+    Destroyed bodies, and bodies whose nodes are asleep, are masked out of the batch.
+    Attributes:
+        bodies (BodyArrays): The gathered pressure, center of mass and destruction state.
+        ring (np.ndarray): Node index of every outline entry, body after body.
+        ring_next (np.ndarray): Node index of the next entry around the same body.
+        ring_previous (np.ndarray): Node index of the previous entry around the same body.
+        ring_body (np.ndarray): Body index of every outline entry.
+    Methods:
+        mark_destroyed(springs):
+            Marks destroyable bodies with a broken spring as destroyed.
+        springs_broken(indices):
+            Marks the destroyable bodies owning the given, just broken, springs as destroyed.
+        update(nodes, dt, awake=None):
+            Applies one substep of pressure forces to the node arrays, skipping nodes that are not awake.
+    """
+
+    def __init__(self, scene):
+        self.bodies = scene.bodies
+        offsets = scene.outline_offsets
+        counts = np.diff(offsets)
+
+        # Every outline entry is followed by the next one, except the last of each body wraps to its first
+        self.ring = scene.outline_nodes
+        self.ring_body = np.repeat(np.arange(counts.size), counts)
+        entries = np.arange(self.ring.size)
+        first, last = offsets[:-1][counts > 0], offsets[1:][counts > 0] - 1
+        following, preceding = entries + 1, entries - 1
+        following[last] = first
+        preceding[first] = last
+        self.ring_next = self.ring[following]
+        self.ring_previous = self.ring[preceding]
+        self.counts = counts.astype(np.float64)
+
+        # Springs belonging to bodies that pop when any of them breaks
+        spring_body = np.repeat(np.arange(counts.size), np.diff(scene.outline_spring_offsets))
+        destroyable = self.bodies.destroyable[spring_body]
+        self.body_springs = scene.outline_springs[destroyable]
+        self.body_springs_owner = spring_body[destroyable]
+        self.spring_owner = np.full(scene.springs.size, -1, dtype=np.intp)
+        self.spring_owner[self.body_springs] = self.body_springs_owner
+
+    def mark_destroyed(self, springs):
+        bodies = self.bodies
+        if self.body_springs.size:
+            broken = np.bincount(self.body_springs_owner, springs.broken[self.body_springs], bodies.size) > 0
+            bodies.destroyed |= bodies.destroyable & broken
+
+    def springs_broken(self, indices):
+        indices = np.asarray(indices, dtype=np.intp)
+        indices = indices[indices < self.spring_owner.size]
+        owner = self.spring_owner[indices]
+        self.bodies.destroyed[owner[owner >= 0]] = True
+
+    def update(self, nodes, dt, awake=None):
+        bodies = self.bodies
+        if bodies.size == 0:
+            return
+
+        live = ~bodies.destroyed[self.ring_body]
+        if awake is not None:
+            live &= awake[self.ring]
+        ring, ring_next, owner = self.ring[live], self.ring_next[live], self.ring_body[live]
+        p1 = nodes.pos[ring]
+        p2 = nodes.pos[ring_next]
+
+        # Shoelace area, center of mass and perimeter of every body
+        cross = p1[:, 0] * p2[:, 1] - p2[:, 0] * p1[:, 1]
+        area = np.abs(np.bincount(owner, cross, bodies.size)) / 2
+        # Only bodies with their whole outline in the update (intact and awake) get a new center of mass
+        complete = (np.bincount(owner, minlength=bodies.size) == self.counts) & (self.counts > 0)
+        bodies.center_of_mass[complete] = scatter_add(owner, p1, bodies.size)[complete] / self.counts[complete, None]
+        edge = p1 - p2
+        total_distance = np.bincount(owner, np.hypot(edge[:, 0], edge[:, 1]), bodies.size)
+
+        # The outward normal of each edge is as long as the edge, so scaling it by
+        # pressure / area / perimeter spreads the pressure in proportion to edge length
+        normal = np.stack((p2[:, 1] - p1[:, 1], p1[:, 0] - p2[:, 0]), axis=1)
+        scale = np.divide(
+            bodies.pressure / (area + 1e-8), total_distance, out=np.zeros(bodies.size), where=total_distance > 0
+        )
+        force = normal * scale[owner, None]
+
+        impulse = scatter_add(ring, force, nodes.size) + scatter_add(ring_next, force, nodes.size)
+        movable = ~nodes.static
+        nodes.vel[movable] += impulse[movable] * dt / nodes.mass[movable, None]
@@ -0,0 +1,230 @@
+import cProfile
+import io
+import json
+import pstats
+import threading
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+
+import numpy as np
+
+# Samples kept per phase for the histograms and percentiles
+HISTORY = 1024
+
+
+class PhaseTimings:
+    """
+    A ring buffer of the most recent durations (in milliseconds) of one phase.
+    Attributes:
+        count (int): How many samples were ever added.
+        total (float): The sum of every sample ever added.
+    Methods:
+        add(duration):
+            Adds one sample.
+        samples():
+            Returns the samples still in the buffer.
+        percentiles(q):
+            Returns the given percentiles of the buffered samples.
+        histogram(bins=10):
+            Returns the counts and bin edges of the buffered samples.
+    """
+
+    def __init__(self, history=HISTORY):
+        self.buffer = np.zeros(history)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, duration):
+        self.buffer[self.count % self.buffer.size] = duration
+        self.count += 1
+        self.total += duration
+
+    def samples(self):
+        return self.buffer[: min(self.count, self.buffer.size)]
+
+    @property
+    def last(self):
+        return float(self.buffer[(self.count - 1) % self.buffer.size]) if self.count else 0.0
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentiles(self, q=(50, 90, 99)):
+        samples = self.samples()
+        return np.percentile(samples, q) if samples.size else np.zeros(len(q))
+
+    def histogram(self, bins=10):
+        return np.histogram(self.samples(), bins)
+
+
+class Profiler:
+    """
+    Named phase timing, Chrome trace export and a cProfile switch for the simulation.
+    Engines and the renderer wrap their work in `with profiler.phase("springs"):` blocks. While the
+    profiler is disabled a phase is a shared no-op context manager, so instrumented code costs
+    next to nothing. Phases may nest; every phase keeps its own histogram of recent durations.
+    A physics thread may time phases while the render loop reads them: new phases and values are
+    added under a lock, and readers iterate the copies phase_items and value_items take under it.
+    cProfile only sees the thread that enabled it (before Python 3.12), so worker threads wrap
+    their work in `with profiler.cprofile_worker():` to add it to the running session.
+    Attributes:
+        enabled (bool): Whether phases are timed.
+        tracing (bool): Whether every timed phase is also kept as a Chrome trace event.
+        phases (dict): PhaseTimings by phase name, in the order the phases were first seen.
+        values (dict): PhaseTimings of other per-tick measurements by name, like the substep count.
+    Methods:
+        phase(name):
+            Context manager timing one run of a phase.
+        record(name, value):
+            Adds one sample of a measurement that is not a duration.
+        phase_items(), value_items():
+            Return (name, PhaseTimings) pairs of the phases or values timed so far, safe to iterate.
+        report():
+            Returns a table of the mean and percentiles of every phase.
+        toggle_cprofile():
+            Starts or stops cProfile, returning the top functions of every profiled thread when it stops.
+        cprofile_worker():
+            Context manager profiling a block of another thread while cProfile is on.
+        export_chrome_trace(path):
+            Writes the recorded trace events as a Chrome trace (chrome://tracing, Perfetto).
+    """
+
+    def __init__(self, enabled=True, tracing=False, history=HISTORY, max_events=1_000_000):
+        self.enabled = enabled
+        self.tracing = tracing
+        self.history = history
+        self.max_events = max_events
+        self.phases = {}
+        self.values = {}
+        self.events = []
+        self.origin = perf_counter()
+        self.cprofile = None
+        self.worker_cprofiles = {}
+        self.lock = threading.Lock()
+        self._cprofile_lock = threading.Lock()
+        self._disabled = nullcontext()
+
+    def phase(self, name):
+        if not self.enabled:
+            return self._disabled
+        return self._timed(name)
+
+    @contextmanager
+    def _timed(self, name):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            end = perf_counter()
+            self.add(name, start, end)
+
+    def add(self, name, start, end):
+        """Records a phase that ran from start to end (perf_counter seconds)"""
+        timings = self.phases.get(name)
+        if timings is None:
+            with self.lock:
+                timings = self.phases.setdefault(name, PhaseTimings(self.history))
+        timings.add((end - start) * 1000)
+
+        if self.tracing and len(self.events) < self.max_events:
+            self.events.append((name, start, end, threading.get_ident()))
+
+    def record(self, name, value):
+        values = self.values.get(name)
+        if values is None:
+            with self.lock:
+                values = self.values.setdefault(name, PhaseTimings(self.history))
+        values.add(value)
+
+    def phase_items(self):
+        with self.lock:
+            return list(self.phases.items())
+
+    def value_items(self):
+        with self.lock:
+            return list(self.values.items())
+
+    def get(self, name):
+        return self.phases.get(name) or PhaseTimings(1)
+
+    def report(self, q=(50, 90, 99)):
+        header = f"{'phase':<20} {'count':>8} {'mean ms':>9}" + "".join(f" {f'p{p} ms':>9}" for p in q)
+        lines = [header]
+        for name, timings in self.phase_items():
+            values = "".join(f" {value:>9.3f}" for value in timings.percentiles(q))
+            lines.append(f"{name:<20} {timings.count:>8} {timings.mean:>9.3f}{values}")
+
+        values = self.value_items()
+        if values:
+            lines.append("")
+            lines.append(f"{'value':<20} {'count':>8} {'mean':>9}" + "".join(f" {f'p{p}':>9}" for p in q))
+            for name, samples in values:
+                values = "".join(f" {value:>9.3f}" for value in samples.percentiles(q))
+                lines.append(f"{name:<20} {samples.count:>8} {samples.mean:>9.3f}{values}")
+        return "\n".join(lines)
+
+    def toggle_cprofile(self, limit=25):
+        if self.cprofile is None:
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+            return None
+
+        self.cprofile.disable()
+        output = io.StringIO()
+        with self._cprofile_lock:
+            stats = pstats.Stats(self.cprofile, stream=output)
+            for profile in self.worker_cprofiles.values():
+                stats.add(profile)
+            self.cprofile = None
+            self.worker_cprofiles = {}
+        stats.sort_stats("cumulative").print_stats(limit)
+        return output.getvalue()
+
+    def cprofile_worker(self):
+        if self.cprofile is None:
+            return self._disabled
+        return self._cprofile_worker()
+
+    @contextmanager
+    def _cprofile_worker(self):
+        # Held for the whole block, so the session is never collected while a worker is profiling
+        with self._cprofile_lock:
+            if self.cprofile is None:
+                yield
+                return
+            profile = self.worker_cprofiles.get(threading.get_ident())
+            if profile is None:
+                profile = self.worker_cprofiles[threading.get_ident()] = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Python 3.12+ runs one profiler at a time, and the session's already sees every thread
+                yield
+                return
+            try:
+                yield
+            finally:
+                profile.disable()
+
+    def export_chrome_trace(self, path):
+        threads = {}
+        events = []
+        for name, start, end, thread in self.events:
+            tid = threads.setdefault(thread, len(threads))
+            events.append(
+                {
+                    "name": name,
+                    "ph": "X",
+                    "ts": (start - self.origin) * 1e6,
+                    "dur": (end - start) * 1e6,
+                    "pid": 0,
+                    "tid": tid,
+                }
+            )
+        with open(path, "w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+
+# Shared by engines and renderers that were not handed a profiler
+DISABLED = Profiler(enabled=False)
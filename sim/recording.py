@@ -0,0 +1,261 @@
+import os
+import struct
+import warnings
+
+import numpy as np
+import pygame
+
+from sim.constants import HEIGHT, WIDTH
+
+MAGIC = b"SBTRAJ\x00\x01"
+# magic, encoding, node count, spring count, frame count, position origin (x, y), position scale, velocity scale
+HEADER = struct.Struct("<8sIIIQdddd")
+HEADER_SIZE = 64
+
+FLOAT32 = 0
+QUANTIZED = 1
+ENCODINGS = {"float32": FLOAT32, "quantized": QUANTIZED}
+
+
+def frame_dtype(encoding, node_count, spring_count):
+    """The fixed-width record type of one frame"""
+    if encoding == QUANTIZED:
+        # 16 bit fixed point positions and velocities, half precision spring forces
+        vector, force = "<i2", "<f2"
+    else:
+        vector, force = "<f4", "<f4"
+    return np.dtype(
+        [
+            ("pos", vector, (node_count, 2)),
+            ("vel", vector, (node_count, 2)),
+            ("force", force, (spring_count, 2)),
+            ("broken", "u1", (spring_count,)),
+        ]
+    )
+
+
+class TrajectoryRecorder:
+    """
+    Writes per-tick node positions and velocities plus spring forces and broken flags to a
+    compact binary file. Every frame has the same width, so a TrajectoryReplay can jump to any
+    tick without decoding the ones before it. Frames are buffered and written a chunk at a time,
+    along with the header, so a recording that was never closed still replays every full chunk;
+    close() (or leaving a with block) writes the frames of the last, partial chunk.
+    The recorder can be passed straight to Simulation.simulate or HeadlessSimulation.run as the
+    callback, recording the state at the start of every tick.
+    Quantized positions outside the bounds and velocities beyond 32767 * vel_scale are clipped,
+    with a warning the first time it happens.
+    Attributes:
+        path (str): The file being written.
+        encoding (str): "float32" for full precision frames, or "quantized" for 16 bit fixed point
+            positions (within bounds) and velocities (steps of vel_scale), about half the size.
+        chunk_frames (int): How many frames are buffered before they are written out.
+        frames (int): How many frames have been recorded so far.
+    Methods:
+        record(engine):
+            Appends the current state of an engine's arrays.
+        flush():
+            Writes out the buffered frames and the header with the frame count so far.
+        close():
+            Writes out the remaining frames and closes the file.
+    """
+
+    def __init__(
+        self, path, encoding="float32", chunk_frames=64, bounds=((0, 0), (WIDTH, HEIGHT)), vel_scale=1 / 1024
+    ):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown encoding {encoding!r}, expected one of {', '.join(ENCODINGS)}")
+
+        self.path = path
+        self.encoding = encoding
+        self.chunk_frames = chunk_frames
+        self.origin = np.array(bounds[0], dtype=np.float64)
+        self.pos_scale = max(bounds[1][0] - bounds[0][0], bounds[1][1] - bounds[0][1]) / 65535
+        self.vel_scale = vel_scale
+        self.frames = 0
+        self.node_count = self.spring_count = 0
+        self.clipped = set()
+
+        # The counts are only known from the first frame, until then the header holds an empty recording
+        self.file = open(path, "wb")
+        self.buffer = None
+        self.buffered = 0
+        self._write_header()
+
+    def __call__(self, sim):
+        self.record(sim.get_engine())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _write_header(self):
+        header = HEADER.pack(
+            MAGIC,
+            ENCODINGS[self.encoding],
+            self.node_count,
+            self.spring_count,
+            self.frames,
+            self.origin[0],
+            self.origin[1],
+            self.pos_scale,
+            self.vel_scale,
+        )
+        end = self.file.tell()
+        self.file.seek(0)
+        self.file.write(header.ljust(HEADER_SIZE, b"\x00"))
+        self.file.seek(max(end, HEADER_SIZE))
+
+    def _quantize(self, values, name, hint):
+        quantized = np.rint(values)
+        if name not in self.clipped and (quantized.min(initial=0) < -32768 or quantized.max(initial=0) > 32767):
+            self.clipped.add(name)
+            warnings.warn(f"Some {name} of {self.path} were clipped to fit 16 bits, {hint}", stacklevel=3)
+        return np.clip(quantized, -32768, 32767)
+
+    def record(self, engine):
+        nodes, springs = engine.nodes, engine.springs
+        if self.buffer is None:
+            self.node_count, self.spring_count = nodes.size, springs.size
+            self.buffer = np.zeros(
+                self.chunk_frames, frame_dtype(ENCODINGS[self.encoding], self.node_count, self.spring_count)
+            )
+
+        frame = self.buffer[self.buffered]
+        if self.encoding == "quantized":
+            frame["pos"] = self._quantize(
+                (nodes.pos - self.origin) / self.pos_scale - 32768, "positions", "pass bounds enclosing every node"
+            )
+            frame["vel"] = self._quantize(
+                nodes.vel / self.vel_scale, "velocities", f"pass a vel_scale above {self.vel_scale:g}"
+            )
+        else:
+            frame["pos"] = nodes.pos
+            frame["vel"] = nodes.vel
+        frame["force"] = springs.total_force
+        frame["broken"] = springs.broken
+
+        self.buffered += 1
+        self.frames += 1
+        if self.buffered == self.chunk_frames:
+            self.flush()
+
+    def flush(self):
+        if self.buffered:
+            self.file.write(self.buffer[: self.buffered].tobytes())
+            self.buffered = 0
+            self._write_header()
+        self.file.flush()
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.flush()
+        self.file.close()
+
+
+class TrajectoryReplay:
+    """
+    Reads a file written by TrajectoryRecorder through a memory map, so any tick can be
+    decoded on its own without reading the whole file. The frame count comes from the file size,
+    since the header only has it up to date once the recorder flushed: recordings cut short
+    (or still being written) replay every whole frame they hold, with a warning.
+    Files too short to hold a header, or not starting with the recording magic, raise ValueError.
+    Methods:
+        positions(tick), velocities(tick), spring_forces(tick), broken(tick):
+            Decode one part of a single frame.
+        apply(tick, engine):
+            Writes a frame back into an engine's arrays, e.g. to draw it with Simulation.draw.
+        play(simulation, start=0):
+            Plays the recording back in a Simulation's window at its frame rate.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            header = file.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE:
+            raise ValueError(f"{path} is too short to be a trajectory recording ({len(header)} bytes)")
+        magic, self.encoding, self.node_count, self.spring_count, frames, origin_x, origin_y, pos_scale, vel_scale = (
+            HEADER.unpack_from(header)
+        )
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a trajectory recording")
+        if self.encoding not in ENCODINGS.values():
+            raise ValueError(f"{path} has an unknown encoding {self.encoding}")
+
+        self.origin = np.array((origin_x, origin_y))
+        self.pos_scale = pos_scale
+        self.vel_scale = vel_scale
+        dtype = frame_dtype(self.encoding, self.node_count, self.spring_count)
+        # Frames of an empty scene take no bytes, only the header can count them
+        stored = (os.path.getsize(path) - HEADER_SIZE) // dtype.itemsize if dtype.itemsize else frames
+        if stored != frames:
+            warnings.warn(f"{path} holds {stored} frames but its header says {frames}, it was not closed properly")
+        if stored == 0 or dtype.itemsize == 0:
+            # An empty file region cannot be memory mapped
+            self.frames = np.zeros(stored, dtype)
+        else:
+            self.frames = np.memmap(path, dtype=dtype, mode="r", offset=HEADER_SIZE, shape=(stored,))
+
+    def __len__(self):
+        return len(self.frames)
+
+    def positions(self, tick):
+        pos = self.frames[tick]["pos"]
+        if self.encoding == QUANTIZED:
+            return (pos.astype(np.float64) + 32768) * self.pos_scale + self.origin
+        return pos.astype(np.float64)
+
+    def velocities(self, tick):
+        vel = self.frames[tick]["vel"].astype(np.float64)
+        if self.encoding == QUANTIZED:
+            vel *= self.vel_scale
+        return vel
+
+    def spring_forces(self, tick):
+        return self.frames[tick]["force"].astype(np.float64)
+
+    def broken(self, tick):
+        return self.frames[tick]["broken"].astype(bool)
+
+    def apply(self, tick, engine):
+        if engine.nodes.size != self.node_count or engine.springs.size != self.spring_count:
+            raise ValueError("The recording was made from a different scene")
+        engine.nodes.pos[:] = self.positions(tick)
+        engine.nodes.vel[:] = self.velocities(tick)
+        engine.springs.total_force[:] = self.spring_forces(tick)
+        engine.springs.broken[:] = self.broken(tick)
+        engine.topology.reset()
+        engine.coloring.invalidate()
+
+    def play(self, simulation, start=0):
+        """
+        Plays the recording in the simulation's window, which must hold the same scene it was recorded from.
+        Space pauses, the left and right arrow keys scrub one second back or forward, escape stops.
+        """
+        engine = simulation.get_engine()
+        tick = start
+        paused = False
+        running = True
+        while running:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT or event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                    running = False
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
+                    paused = not paused
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_LEFT:
+                    tick -= simulation.config.fps
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_RIGHT:
+                    tick += simulation.config.fps
+
+            tick = min(max(tick, 0), len(self) - 1)
+            self.apply(tick, engine)
+            simulation.display.fill(simulation.config.background_color)
+            simulation.draw()
+            pygame.display.flip()
+            simulation.clock.tick(simulation.config.fps)
+
+            if not paused:
+                tick += 1
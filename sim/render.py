@@ -0,0 +1,203 @@
+from collections import namedtuple
+from time import perf_counter
+
+import numpy as np
+import pygame
+
+from sim.culling import concatenated_ranges, node_groups, spring_groups
+from sim.world import WorldBounds
+
+# Number of colors in the force gradient lookup table of colorized springs
+GRADIENT_STEPS = 32
+
+# The spring and node arrays the Renderer reads besides positions, which PhysicsThread publishes along with them
+FrameState = namedtuple("FrameState", ["total_force", "broken", "dragging", "static"])
+
+
+def frame_state(engine):
+    """The FrameState of the engine's own arrays"""
+    springs, nodes = engine.springs, engine.nodes
+    return FrameState(springs.total_force, springs.broken, nodes.dragging, nodes.static)
+
+
+def gradient_table(color1, color2, steps=GRADIENT_STEPS):
+    """Precomputes the colors between color1 and color2 that colorized springs are bucketed into"""
+    color1, color2 = pygame.Color(color1), pygame.Color(color2)
+    return [
+        (
+            int(color1.r + (color2.r - color1.r) * t),
+            int(color1.g + (color2.g - color1.g) * t),
+            int(color1.b + (color2.b - color1.b) * t),
+        )
+        for t in np.linspace(0, 1, steps)
+    ]
+
+
+class Renderer:
+    """
+    Draws all springs and nodes of an engine in batches.
+    Springs are bucketed by color (colorized springs through a precomputed force gradient table)
+    and every run of same-colored springs along a chain is drawn with one pygame.draw.lines call.
+    Nodes are blitted from pre-rendered circle sprites in a single Surface.blits call.
+    Given a Camera, positions, spring widths and sprites are scaled to its view. While the view
+    does not cover the whole world, springs are culled in groups of consecutive chain springs and
+    nodes per soft body (free nodes in runs), each group by its bounding box, so only the groups
+    overlapping the visible region are converted and drawn.
+    Attributes:
+        spring_time (float): Milliseconds spent drawing springs in the last frame.
+        node_time (float): Milliseconds spent drawing nodes in the last frame.
+        drawn_springs (int): Springs drawn in the last frame.
+        drawn_nodes (int): Nodes drawn in the last frame.
+        culling (bool): Whether to cull groups out of view, on by default.
+    Methods:
+        draw(display, positions=None, camera=None, state=None):
+            Draws the springs and nodes of the engine in view, at the given node positions and
+            FrameState if provided.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.spring_time = 0
+        self.node_time = 0
+        self.drawn_springs = 0
+        self.drawn_nodes = 0
+
+        # Every spring style (solid color or gradient, and width) gets a range of the color table
+        scene = engine.scene
+        self.colors, self.widths = [], []
+        styles = np.concatenate(
+            (scene.spring_gradient[:, None], scene.spring_colors.reshape(-1, 6), scene.spring_width[:, None]), axis=1
+        ).astype(np.intp)
+        styles, style_of = np.unique(styles, axis=0, return_inverse=True)
+        offsets = []
+        for gradient, r1, g1, b1, r2, g2, b2, width in styles.tolist():
+            offsets.append(len(self.colors))
+            table = gradient_table((r1, g1, b1), (r2, g2, b2)) if gradient else [(r1, g1, b1)]
+            self.colors.extend(table)
+            self.widths.extend([width] * len(table))
+        self.color_offset = np.array(offsets, dtype=np.intp)[style_of.reshape(-1)]
+        self.gradient = scene.spring_gradient.copy()
+        self.order, self.chain_of, self.chain_points = scene.chains()
+
+        # Culling groups, laid out once: their boxes are only refreshed while part of the world is out of view
+        self.group_of, self.spring_bounds = spring_groups(self.chain_of, self.chain_points)
+        self.node_bounds = node_groups(scene.body_nodes, scene.body_offsets, engine.nodes.size)
+        self.margin = max(self.widths, default=0) + 2 * float(engine.nodes.radius.max(initial=0))
+
+        # Sprite indices of each node when idle, static and dragged
+        keys = np.concatenate(
+            (scene.node_colors.reshape(-1, 3), np.repeat(np.rint(engine.nodes.radius), 3)[:, None]), axis=1
+        ).astype(np.intp)
+        keys, sprite_of = np.unique(keys, axis=0, return_inverse=True)
+        self.sprite_keys = [((r, g, b), radius) for r, g, b, radius in keys.tolist()]
+        self.node_sprites = sprite_of.reshape(-1, 3)
+        self.sprites = None
+        self.zoom = 1.0
+        self.culling = True
+
+    def _render_sprites(self, zoom):
+        self.sprites = []
+        for color, radius in self.sprite_keys:
+            radius = max(round(radius * zoom), 1)
+            sprite = pygame.Surface((radius * 2, radius * 2))
+            background = (0, 0, 0) if color[:3] != (0, 0, 0) else (255, 255, 255)
+            sprite.fill(background)
+            sprite.set_colorkey(background)
+            pygame.draw.circle(sprite, color, (radius, radius), radius)
+            if pygame.display.get_surface() is not None:
+                sprite = sprite.convert()
+            self.sprites.append(sprite)
+        self.zoom = zoom
+
+    def draw(self, display, positions=None, camera=None, state=None):
+        if positions is None:
+            positions = self.engine.nodes.pos
+        if state is None:
+            state = frame_state(self.engine)
+
+        start = perf_counter()
+        view = self._cull_view(positions, camera)
+        self._draw_springs(display, positions, state, camera, view)
+        middle = perf_counter()
+        self._draw_nodes(display, positions, state, camera, view)
+        end = perf_counter()
+
+        self.spring_time = (middle - start) * 1000
+        self.node_time = (end - middle) * 1000
+        profiler = self.engine.profiler
+        if profiler.enabled:
+            profiler.add("draw springs", start, middle)
+            profiler.add("draw nodes", middle, end)
+
+    def _cull_view(self, positions, camera):
+        """Refreshes the group boxes and returns the view to cull against, or None if the whole world is in view"""
+        if camera is None or not self.culling or WorldBounds(*camera.view()).contains(self.engine.bounds):
+            return None
+        # Lines and sprites scale with the zoom, but are never thinner than a pixel
+        pad = self.margin + 1 / camera.zoom
+        self.spring_bounds.update(positions, pad)
+        self.node_bounds.update(positions, pad)
+        return camera.view()
+
+    def _draw_springs(self, display, positions, state, camera, view):
+        springs = self.engine.springs
+        self.drawn_springs = 0
+        if springs.size == 0:
+            return
+
+        # Color of every spring, colorized ones by how close they are to breaking
+        strain = np.hypot(state.total_force[:, 0], state.total_force[:, 1]) / springs.max_force
+        bucket = np.minimum((strain * GRADIENT_STEPS).astype(np.intp), GRADIENT_STEPS - 1)
+        color = self.color_offset + np.where(self.gradient, bucket, 0)
+        color[state.broken] = -1
+
+        # Runs of the same color along a chain are drawn as one polyline, cut at culling groups while culling
+        color = color[self.order]
+        chain = self.chain_of if view is None else self.group_of
+        starts = np.flatnonzero(np.r_[True, (color[1:] != color[:-1]) | (chain[1:] != chain[:-1])])
+        ends = np.r_[starts[1:], color.size]
+        keep = color[starts] >= 0
+        if view is not None:
+            keep &= self.spring_bounds.visible(view)[self.group_of[starts]]
+        starts, ends = starts[keep], ends[keep]
+
+        # Points of the kept runs only, one more than the run's springs
+        lengths = ends - starts + 1
+        points = positions[self.chain_points[concatenated_ranges(starts + self.chain_of[starts], lengths)]]
+        if camera is not None:
+            points = camera.to_screen(points)
+        points = points.tolist()
+        self.drawn_springs = int((ends - starts).sum())
+
+        draw_lines = pygame.draw.lines
+        colors, widths = self.colors, self.widths
+        zoom = 1.0 if camera is None else camera.zoom
+        if zoom != 1:
+            widths = [max(round(width * zoom), 1) for width in widths]
+        cursor = 0
+        for run_color, length in zip(color[starts].tolist(), lengths.tolist()):
+            draw_lines(display, colors[run_color], False, points[cursor : cursor + length], widths[run_color])
+            cursor += length
+
+    def _draw_nodes(self, display, positions, state, camera, view):
+        nodes = self.engine.nodes
+        self.drawn_nodes = 0
+        if nodes.size == 0:
+            return
+        zoom = 1.0 if camera is None else camera.zoom
+        if self.sprites is None or zoom != self.zoom:
+            self._render_sprites(zoom)
+
+        if view is None:
+            shown = slice(None)
+        else:
+            bounds = self.node_bounds
+            shown = bounds.members[np.repeat(bounds.visible(view), np.diff(bounds.offsets))]
+
+        look = np.where(state.dragging[shown], 2, np.where(state.static[shown], 1, 0))
+        sprite = self.node_sprites[shown][np.arange(look.size), look].tolist()
+        centers = positions[shown] if camera is None else camera.to_screen(positions[shown])
+        corners = np.rint(centers - nodes.radius[shown, None] * zoom).astype(np.intp).tolist()
+        self.drawn_nodes = len(corners)
+        sprites = self.sprites
+        display.blits([(sprites[index], corner) for index, corner in zip(sprite, corners)], False)
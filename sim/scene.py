@@ -0,0 +1,267 @@
+import numpy as np
+import pygame
+
+from sim.body import PressurizedSoftBody
+from sim.culling import spring_chains
+from sim.materials import NODE_MATERIALS, SPRING_MATERIALS
+from sim.state import BodyArrays, NodeArrays, SpringArrays, gather
+from sim.static import SegmentBVH, StaticGeometry
+
+# Bumped whenever the layout of saved scene files changes
+SCENE_VERSION = 1
+
+# The state stores of a scene, saved as "<store>.<field>" entries
+STORES = {"nodes": NodeArrays, "springs": SpringArrays, "bodies": BodyArrays}
+
+# Per-object data that is not simulation state: drawing styles and which nodes and springs make up each body
+LAYOUT = (
+    "interactive",
+    "node_colors",
+    "spring_colors",
+    "spring_gradient",
+    "spring_width",
+    "body_nodes",
+    "body_offsets",
+    "outline_nodes",
+    "outline_offsets",
+    "outline_springs",
+    "outline_spring_offsets",
+    "segments",
+)
+
+# Spring chains the batched renderer draws, saved with the scene so loading never has to walk the springs
+CHAINS = ("chain_order", "chain_of", "chain_points")
+
+
+def _color(color):
+    return tuple(pygame.Color(color))[:3]
+
+
+def _pack(groups):
+    # Concatenates index lists into one array, with offsets[i]:offsets[i + 1] spanning group i
+    sizes = [len(group) for group in groups]
+    offsets = np.zeros(len(groups) + 1, dtype=np.intp)
+    np.cumsum(sizes, out=offsets[1:])
+    values = np.fromiter((value for group in groups for value in group), dtype=np.intp, count=int(offsets[-1]))
+    return values, offsets
+
+
+def _segments(geometry):
+    if geometry is None:
+        return np.empty((0, 2, 2))
+    if isinstance(geometry, StaticGeometry):
+        return geometry.segments
+    return np.asarray(geometry, dtype=np.float64).reshape(-1, 2, 2)
+
+
+class Scene:
+    """
+    A scene as packed arrays: the node, spring and pressurized body state of a simulation, plus how
+    its nodes and springs are drawn and which of them make up every soft body.
+    Engines are built from a Scene, so a scene loaded from a file goes straight into the simulation
+    without constructing a single Node or Spring. The array engines never need the objects; the
+    per-object engine and per-object drawing do, so they only work on scenes made from objects.
+    Attributes:
+        nodes (NodeArrays): The node state.
+        springs (SpringArrays): The spring state, with endpoint indices into nodes.
+        bodies (BodyArrays): The state of the pressurized soft bodies.
+        interactive (np.ndarray): Whether each node takes part in mouse dragging.
+        node_colors (np.ndarray): (n, 3, 3) RGB of every node when idle, static and dragged.
+        spring_colors (np.ndarray): (m, 2, 3) RGB of every spring, the gradient ends for colorized springs.
+        spring_gradient (np.ndarray): Whether each spring is colored by how close it is to breaking.
+        spring_width (np.ndarray): The line width of every spring.
+        body_nodes, body_offsets (np.ndarray): The nodes of every soft body, packed one body after another.
+        outline_nodes, outline_offsets (np.ndarray): The outline of every pressurized body, in bodies order.
+        outline_springs, outline_spring_offsets (np.ndarray): The springs of every pressurized body.
+        segments (np.ndarray): (k, 2, 2) endpoints of the static obstacle segments nodes collide with.
+        node_objects (list): The Node objects viewing the node arrays, empty for loaded scenes.
+        spring_objects (list): The Spring objects viewing the spring arrays, empty for loaded scenes.
+    Methods:
+        from_objects(nodes, springs, bodies, geometry=None):
+            Gathers nodes, springs and soft bodies into a scene, with the segments of a StaticGeometry.
+        load(path):
+            Reads a scene written by save.
+        save(path, compressed=False):
+            Writes the scene as a NumPy .npz archive.
+        copy():
+            Returns a scene with its own copy of the state arrays.
+        restore(snapshot):
+            Copies the state of another scene with the same layout back into this one.
+        chains():
+            Returns the spring chains the batched renderer draws.
+        set_geometry(geometry):
+            Replaces the static obstacle segments.
+        obstacles():
+            Returns the SegmentBVH over the obstacle segments, or None if there are none.
+    """
+
+    def __init__(self, nodes, springs, bodies, node_objects=(), spring_objects=(), **layout):
+        self.nodes = nodes
+        self.springs = springs
+        self.bodies = bodies
+        self.node_objects = list(node_objects)
+        self.spring_objects = list(spring_objects)
+
+        self.interactive = layout.get("interactive", np.ones(nodes.size, dtype=bool))
+        self.node_colors = layout.get("node_colors", np.zeros((nodes.size, 3, 3), dtype=np.uint8))
+        self.spring_colors = layout.get("spring_colors", np.zeros((springs.size, 2, 3), dtype=np.uint8))
+        self.spring_gradient = layout.get("spring_gradient", np.zeros(springs.size, dtype=bool))
+        self.spring_width = layout.get("spring_width", np.ones(springs.size, dtype=np.intp))
+        empty = np.empty(0, dtype=np.intp)
+        self.body_nodes = layout.get("body_nodes", empty)
+        self.body_offsets = layout.get("body_offsets", np.zeros(1, dtype=np.intp))
+        self.outline_nodes = layout.get("outline_nodes", empty)
+        self.outline_offsets = layout.get("outline_offsets", np.zeros(bodies.size + 1, dtype=np.intp))
+        self.outline_springs = layout.get("outline_springs", empty)
+        self.outline_spring_offsets = layout.get("outline_spring_offsets", np.zeros(bodies.size + 1, dtype=np.intp))
+        self.segments = layout.get("segments", np.empty((0, 2, 2)))
+        self._chains = layout.get("chains")
+        self._obstacles = layout.get("obstacles")
+
+    @classmethod
+    def from_objects(cls, nodes, springs, bodies, geometry=None):
+        """
+        Gathers every node and spring reachable from the lists (including the ones owned by soft
+        bodies) into shared arrays, so the Node, Spring and body objects become views onto them.
+        geometry is a StaticGeometry, or an array of segments.
+        """
+        nodes, springs, bodies = list(nodes), list(springs), list(bodies)
+        node_objects = []
+        spring_objects = []
+        interactive = []
+        node_indices = {}
+
+        def add_node(node, is_interactive):
+            if id(node) in node_indices:
+                interactive[node_indices[id(node)]] |= is_interactive
+                return
+            node_indices[id(node)] = len(node_objects)
+            node_objects.append(node)
+            interactive.append(is_interactive)
+
+        # Free nodes always follow the mouse, body nodes only when the body allows it
+        for node in nodes:
+            add_node(node, True)
+        for body in bodies:
+            for node in body.nodes:
+                add_node(node, body.draggable_points)
+
+        for spring in springs + [spring for body in bodies for spring in body.springs]:
+            add_node(spring.point1, False)
+            add_node(spring.point2, False)
+            spring_objects.append(spring)
+
+        node_arrays = gather(node_objects, NodeArrays)
+        spring_arrays = gather(spring_objects, SpringArrays)
+        spring_arrays.node1[:] = [spring.point1._index for spring in spring_objects]
+        spring_arrays.node2[:] = [spring.point2._index for spring in spring_objects]
+
+        pressurized = [body for body in bodies if isinstance(body, PressurizedSoftBody)]
+        body_arrays = gather(pressurized, BodyArrays)
+
+        # Styles are looked up per material and then spread over the objects using it
+        node_materials = np.fromiter((node._material for node in node_objects), np.intp, len(node_objects))
+        node_styles = np.array(
+            [[_color(color) for color in material] for material in NODE_MATERIALS.rows], dtype=np.uint8
+        ).reshape(-1, 3, 3)
+        spring_materials = np.fromiter((spring._material for spring in spring_objects), np.intp, len(spring_objects))
+        gradient_styles = np.array([material.color1 is not None for material in SPRING_MATERIALS.rows], dtype=bool)
+        spring_styles = np.array(
+            [
+                (_color(material.color1), _color(material.color2)) if gradient else (_color(material.color),) * 2
+                for material, gradient in zip(SPRING_MATERIALS.rows, gradient_styles)
+            ],
+            dtype=np.uint8,
+        ).reshape(-1, 2, 3)
+        width_styles = np.array([material.width for material in SPRING_MATERIALS.rows], dtype=np.intp)
+
+        body_nodes, body_offsets = _pack([[node._index for node in body.nodes] for body in bodies])
+        outline_nodes, outline_offsets = _pack([[node._index for node in body.nodes] for body in pressurized])
+        outline_springs, outline_spring_offsets = _pack(
+            [[spring._index for spring in body.springs] for body in pressurized]
+        )
+
+        return cls(
+            node_arrays,
+            spring_arrays,
+            body_arrays,
+            node_objects,
+            spring_objects,
+            interactive=np.array(interactive, dtype=bool),
+            node_colors=node_styles[node_materials],
+            spring_colors=spring_styles[spring_materials],
+            spring_gradient=gradient_styles[spring_materials],
+            spring_width=width_styles[spring_materials],
+            body_nodes=body_nodes,
+            body_offsets=body_offsets,
+            outline_nodes=outline_nodes,
+            outline_offsets=outline_offsets,
+            outline_springs=outline_springs,
+            outline_spring_offsets=outline_spring_offsets,
+            segments=_segments(geometry),
+            obstacles=geometry.bvh() if isinstance(geometry, StaticGeometry) else None,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as archive:
+            version = int(archive["version"])
+            if version != SCENE_VERSION:
+                raise ValueError(f"Unsupported scene version {version}, expected {SCENE_VERSION}")
+
+            stores = {}
+            for store, store_type in STORES.items():
+                size = int(archive[f"{store}.size"])
+                fields = {name: archive[f"{store}.{name}"] for name in store_type.FIELDS if f"{store}.{name}" in archive}
+                stores[store] = store_type.from_arrays(size, fields)
+
+            layout = {name: archive[name] for name in LAYOUT if name in archive}
+            if all(name in archive for name in CHAINS):
+                layout["chains"] = tuple(archive[name] for name in CHAINS)
+
+        return cls(stores["nodes"], stores["springs"], stores["bodies"], **layout)
+
+    def save(self, path, compressed=False):
+        """Writes the scene as an .npz archive, uncompressed by default so it loads as fast as possible"""
+        entries = {"version": np.array(SCENE_VERSION)}
+        for store in STORES:
+            arrays = getattr(self, store)
+            entries[f"{store}.size"] = np.array(arrays.size)
+            for name in arrays.FIELDS:
+                entries[f"{store}.{name}"] = getattr(arrays, name)
+        for name in LAYOUT:
+            entries[name] = getattr(self, name)
+        entries.update(zip(CHAINS, self.chains()))
+
+        (np.savez_compressed if compressed else np.savez)(path, **entries)
+
+    def chains(self):
+        if self._chains is None:
+            self._chains = spring_chains(self.springs)
+        return self._chains
+
+    def set_geometry(self, geometry):
+        self.segments = _segments(geometry)
+        self._obstacles = geometry.bvh() if isinstance(geometry, StaticGeometry) else None
+
+    def obstacles(self):
+        # Built once, and shared with copies of the scene
+        if self._obstacles is None and len(self.segments):
+            self._obstacles = SegmentBVH(self.segments)
+        return self._obstacles
+
+    def copy(self):
+        layout = {name: getattr(self, name) for name in LAYOUT}
+        return Scene(
+            self.nodes.copy(),
+            self.springs.copy(),
+            self.bodies.copy(),
+            chains=self._chains,
+            obstacles=self._obstacles,
+            **layout,
+        )
+
+    def restore(self, snapshot):
+        self.nodes.copy_from(snapshot.nodes)
+        self.springs.copy_from(snapshot.springs)
+        self.bodies.copy_from(snapshot.bodies)
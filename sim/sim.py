@@ -1,9 +1,25 @@
+import logging
+import random
 from dataclasses import dataclass
 from time import perf_counter
 from typing import List, Optional, Tuple
 
 import pygame
 
+from sim.adaptive import AdaptiveSubsteps
+from sim.camera import Camera
+from sim.constants import OBSTACLE_COLOR, OBSTACLE_WIDTH
+from sim.engine import create_engine
+from sim.profiling import Profiler
+from sim.render import Renderer
+from sim.scene import Scene
+from sim.snapshots import SnapshotHistory
+from sim.static import StaticGeometry
+from sim.threaded import PhysicsThread
+from sim.world import WorldBounds
+
+logger = logging.getLogger(__name__)
+
 
 @dataclass
 class SimulationConfig:
@@ -13,17 +29,66 @@ class SimulationConfig:
     height: int = 600
     fps: int = 60
     substeps: int = 8
+    adaptive_substeps: bool = False  # pick the substeps of every tick from node speeds, strain rates and stiffness
+    min_substeps: int = 1  # fewest substeps the adaptive stepper may pick
+    max_substeps: int = 64  # most substeps the adaptive stepper may pick
+    max_travel: float = 0.5  # fraction of its radius a node may move per substep
+    max_strain: float = 0.05  # fraction of its rest length a spring may stretch per substep
+    max_phase: float = 1.0  # most radians the stiffest explicit spring may oscillate through per substep
     background_color: Tuple[int, int, int] = (255, 255, 255)
     debug_font_size: int = 18
     reset_key: int = pygame.K_SPACE
     low_fps_threshold: int = 30
     low_fps_color: Tuple[int, int, int] = (255, 0, 0)
     normal_fps_color: Tuple[int, int, int] = (0, 0, 0)
+    engine: str = "numpy"  # "numpy" for the vectorized engine, "xpbd" for constraints, "python" for the reference engine
+    collisions: bool = False  # node/node and node/spring collisions through a spatial hash grid
+    collision_cell_size: Optional[float] = None  # grid cell size, None uses the largest node diameter
+    compiled_kernels: bool = False  # apply springs in order through sim.kernels.spring_forces, compiled if numba is installed
+    batched_rendering: bool = True  # draw through the batched Renderer instead of per-object draw calls
+    threaded_physics: bool = False  # run physics at a fixed rate on a worker thread, drawing interpolated snapshots
+    physics_rate: Optional[int] = None  # physics ticks per second in threaded mode, None uses fps
+    sleeping: bool = False  # skip islands of connected nodes that have come to rest (numpy engine)
+    sleep_velocity: float = 0.05  # nodes slower than this count as resting
+    sleep_acceleration: float = 0.05  # nodes whose velocity changes slower than this count as resting
+    sleep_delay: int = 60  # substeps an island has to rest before it falls asleep
+    integrator: str = "explicit"  # "implicit" solves spring forces with backward Euler (numpy engine)
+    implicit_iterations: int = 50  # most conjugate gradient iterations per substep with the implicit integrator
+    implicit_tolerance: float = 1e-6  # relative residual that ends the conjugate gradient solve early
+    xpbd_iterations: int = 1  # constraint passes per substep with the xpbd engine
+    spring_batches: str = "jacobi"  # "colored" applies springs one node-disjoint color batch at a time (numpy engine)
+    profiling: bool = False  # time every phase of the engine and renderer (always on in debug mode)
+    profile_key: int = pygame.K_p  # starts and stops cProfile, logging the hottest functions when stopped
+    trace_path: Optional[str] = None  # write the timed phases to this Chrome trace JSON file on exit
+    history_size: int = 0  # snapshots kept for rewinding, 0 disables the history
+    history_interval: int = 10  # ticks between snapshots
+    rewind_key: int = pygame.K_BACKSPACE  # restores the latest snapshot, going further back on every press
+    deterministic: bool = False  # every tick advances one frame, however long frames take to draw
+    seed: Optional[int] = None  # seed of sim.rng, the random generator callbacks should draw from
+    hash_path: Optional[str] = None  # write "tick hash" lines with the state hash after every tick to this file
+    world_bounds: Optional[Tuple[float, float, float, float]] = None  # (left, top, right, bottom) walls, None is WIDTH x HEIGHT
+    camera_center: Optional[Tuple[float, float]] = None  # world point in the middle of the window, None shows the top left
+    camera_zoom: float = 1.0  # window pixels per world unit
+    min_zoom: float = 0.05
+    max_zoom: float = 20.0
+    zoom_step: float = 1.1  # zoom factor of one mouse wheel notch
+    pan_speed: float = 10  # window pixels the arrow keys pan per frame, the middle mouse button drags the view
+    camera_reset_key: int = pygame.K_HOME  # goes back to the initial view
+    culling: bool = True  # only draw springs and nodes in view, once part of the world is out of it
 
 
 class Simulation:
     """
     Physics simulation system with performance monitoring and debug capabilities.
+    Runs either the given nodes, springs and bodies, or a Scene loaded from a file. Without a
+    reset function, resetting copies the state the engine started from back into its arrays.
+    With config.history_size set, a snapshot is taken every config.history_interval ticks and the
+    rewind key steps back through them.
+    For reproducible runs set config.deterministic and config.seed, and have callbacks draw their
+    random numbers from sim.rng; config.hash_path logs a state hash per tick to diff runs with.
+    The world (config.world_bounds) may be larger than the window: the mouse wheel zooms, the
+    middle mouse button and arrow keys pan, and the mouse acts on the world point under it.
+    Static obstacles (a StaticGeometry) are given as geometry, or come with a loaded Scene.
     """
 
     def __init__(
@@ -36,6 +101,8 @@ class Simulation:
         reset_key=pygame.K_SPACE,
         reset_func=None,
         debug=False,
+        scene: Optional[Scene] = None,
+        geometry: Optional[StaticGeometry] = None,
     ):
         self.display = display
         self.config = config or SimulationConfig()
@@ -44,6 +111,19 @@ class Simulation:
         self.nodes = nodes or []
         self.springs = springs or []
         self.bodies = bodies or []
+        self.scene = scene
+        self.geometry = geometry
+        self.engine = None
+        self.renderer = None
+        self._engine_signature = None
+        self.lasso = None  # cursor trail while a lasso selection is being drawn
+        self.history = SnapshotHistory(self.config.history_size, self.config.history_interval)
+        self.rng = random.Random(self.config.seed)
+        self.hash_file = None
+        self.adaptive = AdaptiveSubsteps.from_config(self.config) if self.config.adaptive_substeps else None
+        self.substeps = self.config.substeps  # substeps of the last tick
+        self.camera = Camera.from_config(self.config, WorldBounds.from_config(self.config))
+        self._pan_from = None  # cursor position while the middle mouse button drags the view
 
         # Performance tracking
         self.clock = pygame.time.Clock()
@@ -53,9 +133,13 @@ class Simulation:
 
         # Reset functionality
         self.reset_key = reset_key
-        self.reset_func = reset_func or (lambda: None)
+        self.reset_func = reset_func
 
         # Debug metrics
+        self.profiler = Profiler(
+            enabled=debug or self.config.profiling or self.config.trace_path is not None,
+            tracing=self.config.trace_path is not None,
+        )
         self.draw_time = 0
         self.avg_draw_time = 0
         self.simulate_time = 0
@@ -67,47 +151,173 @@ class Simulation:
 
     def update(self, dt, mouse_pos, mouse_pressed):
         """Update simulation state"""
-        if self.debug:
-            start_time = perf_counter()
-
-        substep_dt = dt / self.config.substeps
-        for _ in range(self.config.substeps):
-            for body in self.bodies:
-                body.update(substep_dt, mouse_pos, mouse_pressed)
-            for spring in self.springs:
-                spring.update(substep_dt)
-            for node in self.nodes:
-                node.mouse_integration(substep_dt, mouse_pos, mouse_pressed)
-                node.update(substep_dt)
-
-        if self.debug:
-            end_time = perf_counter()
-            self.simulate_time = (end_time - start_time) * 1000
-
-    def draw(self, display=None):
-        """Draw simulation state"""
-        if self.debug:
-            start = perf_counter()
+        start_time = perf_counter()
+
+        engine = self.get_engine()
+        substeps = self.adaptive.choose(engine, dt) if self.adaptive is not None else self.config.substeps
+        substep_dt = dt / substeps
+        for _ in range(substeps):
+            engine.step(substep_dt, mouse_pos, mouse_pressed)
+        engine.end_tick()
+        self.substeps = substeps
+        if self.config.hash_path is not None:
+            self._log_hash(engine)
+
+        end_time = perf_counter()
+        self.simulate_time = (end_time - start_time) * 1000
+        if self.profiler.enabled:
+            self.profiler.add("update", start_time, end_time)
+            self.profiler.record("substeps", substeps)
+
+    def _log_hash(self, engine):
+        if self.hash_file is None:
+            self.hash_file = open(self.config.hash_path, "w")
+        self.hash_file.write(f"{engine.ticks} {engine.state_hash()}\n")
+
+    def get_engine(self):
+        """Return the engine, rebuilding it if the component lists have changed size"""
+        signature = (len(self.nodes), len(self.springs), len(self.bodies))
+        if self.engine is None or signature != self._engine_signature:
+            self.rebuild()
+        return self.engine
+
+    def rebuild(self):
+        """Gather the current nodes, springs and bodies (or the scene) into a fresh engine"""
+        self.engine = create_engine(self.config, self.nodes, self.springs, self.bodies, self.scene, self.geometry)
+        self.engine.profiler = self.profiler
+        # Loaded scenes have no objects to draw one by one
+        batched = self.config.batched_rendering or self.scene is not None
+        self.renderer = Renderer(self.engine) if batched else None
+        if self.renderer is not None:
+            self.renderer.culling = self.config.culling
+        self._engine_signature = (len(self.nodes), len(self.springs), len(self.bodies))
+        self.history.clear()
+
+    def snapshot(self):
+        """Return a snapshot of the mutable simulation state, see Engine.snapshot"""
+        return self.get_engine().snapshot()
+
+    def restore(self, snapshot):
+        """Restore a snapshot taken with snapshot() in place"""
+        self.get_engine().restore(snapshot)
+
+    def record_history(self):
+        """Take a snapshot for rewinding, every config.history_interval ticks"""
+        if self.config.history_size:
+            self.history(self)
+
+    def rewind(self):
+        """Restore the latest snapshot of the history, returning whether there was one"""
+        if len(self.history) == 0:
+            return False
+        self.history.rewind(self.get_engine())
+        return True
+
+    def draw(self, display=None, positions=None, state=None):
+        """Draw simulation state, optionally at the given node positions and FrameState (batched rendering only)"""
+        start = perf_counter()
 
         useable_display = display if display else self.display
-        for body in self.bodies:
-            body.draw(useable_display)
-        for spring in self.springs:
-            spring.draw(useable_display)
-        for node in self.nodes:
-            node.draw(useable_display)
-
+        self.get_engine()
+        if self.renderer is None and (positions is not None or not self.camera.identity):
+            # Objects draw themselves from the live arrays in world coordinates, only the batched
+            # renderer follows the camera or draws the snapshots the physics thread publishes
+            self.renderer = Renderer(self.engine)
+            self.renderer.culling = self.config.culling
+        self._draw_obstacles(useable_display)
+        if self.renderer is not None:
+            self.renderer.draw(useable_display, positions, self.camera, state)
+        else:
+            profile = self.profiler.phase
+            with profile("draw bodies"):
+                for body in self.bodies:
+                    body.draw(useable_display)
+            with profile("draw springs"):
+                for spring in self.springs:
+                    spring.draw(useable_display)
+            with profile("draw nodes"):
+                for node in self.nodes:
+                    node.draw(useable_display)
+
+        self._draw_selection(useable_display, positions)
+
+        end = perf_counter()
+        self.draw_time = (end - start) * 1000
+        if self.profiler.enabled:
+            self.profiler.add("draw", start, end)
         if self.debug:
-            end = perf_counter()
-            self.draw_time = (end - start) * 1000
             self._debug_draw(useable_display)
 
+    def _draw_obstacles(self, display):
+        """Draw the static obstacle segments in view"""
+        obstacles = self.engine.obstacles
+        if obstacles is None:
+            return
+        left, top, right, bottom = self.camera.view()
+        segments = obstacles.segments[obstacles.in_box((left, top), (right, bottom))]
+        width = max(round(OBSTACLE_WIDTH * self.camera.zoom), 1)
+        for start, end in self.camera.to_screen(segments.reshape(-1, 2)).reshape(-1, 2, 2).tolist():
+            pygame.draw.line(display, OBSTACLE_COLOR, start, end, width)
+
+    def _draw_selection(self, display, positions=None):
+        """Draw the lasso being traced and ring the selected nodes"""
+        if self.lasso is not None and len(self.lasso) > 1:
+            pygame.draw.lines(display, (0, 0, 0), True, self.lasso, 1)
+
+        picker = getattr(self.engine, "picker", None)
+        if picker is None or picker.selection.size == 0:
+            return
+        nodes = self.engine.nodes
+        positions = nodes.pos if positions is None else positions
+        centers = self.camera.to_screen(positions[picker.selection]).tolist()
+        for center, radius in zip(centers, (nodes.radius[picker.selection] * self.camera.zoom).tolist()):
+            pygame.draw.circle(display, (0, 0, 0), center, radius + 3, 1)
+
+    def _mouse_input(self):
+        """
+        Return the mouse state to hand to the engine, with the cursor in world coordinates.
+        Dragging with shift held traces a lasso instead, which selects the nodes inside it on release.
+        """
+        screen_pos = pygame.mouse.get_pos()
+        mouse_pressed = pygame.mouse.get_pressed()
+        self._camera_input(screen_pos, mouse_pressed)
+        mouse_pos = self.camera.to_world(screen_pos)
+        picker = getattr(self.get_engine(), "picker", None)
+        if picker is None:
+            return mouse_pos, mouse_pressed
+
+        if self.lasso is None and mouse_pressed[0] and not picker.held and pygame.key.get_mods() & pygame.KMOD_SHIFT:
+            self.lasso = []
+        if self.lasso is not None:
+            if mouse_pressed[0]:
+                self.lasso.append(screen_pos)
+                return mouse_pos, (False,) + tuple(mouse_pressed[1:])
+            picker.select_lasso([self.camera.to_world(point) for point in self.lasso])
+            self.lasso = None
+        return mouse_pos, mouse_pressed
+
+    def _camera_input(self, screen_pos, mouse_pressed):
+        """Pan the camera while the middle mouse button drags or the arrow keys are held"""
+        if len(mouse_pressed) > 1 and mouse_pressed[1]:
+            if self._pan_from is not None:
+                self.camera.pan(screen_pos[0] - self._pan_from[0], screen_pos[1] - self._pan_from[1])
+            self._pan_from = screen_pos
+        else:
+            self._pan_from = None
+
+        keys = pygame.key.get_pressed()
+        speed = self.config.pan_speed
+        dx = (keys[pygame.K_LEFT] - keys[pygame.K_RIGHT]) * speed
+        dy = (keys[pygame.K_UP] - keys[pygame.K_DOWN]) * speed
+        if dx or dy:
+            self.camera.pan(dx, dy)
+
     def _debug_draw(self, display):
         """Draw debug information"""
         fps = self.clock.get_fps()
         fps_color = (255, 0, 0) if fps < 30 else (0, 0, 0)
         fps_text = self.font.render(f"FPS: {fps:.1f}", False, fps_color)
-        simulation_text = self.font.render(f"TPS: {self.config.substeps * fps / self.dt:.1f}", False, (0, 0, 0))
+        simulation_text = self.font.render(f"TPS: {self.substeps * fps / self.dt:.1f}", False, (0, 0, 0))
         simulate_time_text = self.font.render(f"Sim time: {self.simulate_time:.2f} ms", True, (0, 0, 0))
         draw_time_text = self.font.render(f"Draw time: {self.draw_time:.2f} ms", True, (0, 0, 0))
 
@@ -116,11 +326,56 @@ class Simulation:
         display.blit(simulate_time_text, (0, 30))
         display.blit(draw_time_text, (0, 45))
 
+        if self.renderer is not None:
+            renderer = self.renderer
+            breakdown = (
+                f"Springs: {renderer.spring_time:.2f} ms ({renderer.drawn_springs} drawn), "
+                f"Nodes: {renderer.node_time:.2f} ms ({renderer.drawn_nodes} drawn)"
+            )
+            display.blit(self.font.render(breakdown, True, (0, 0, 0)), (0, 60))
+
+        islands = getattr(self.engine, "islands", None)
+        if islands is not None:
+            awake_text = self.font.render(f"Awake nodes: {islands.awake_nodes}/{self.engine.nodes.size}", True, (0, 0, 0))
+            display.blit(awake_text, (0, 75))
+
+        if self.engine.coloring.colorings:
+            stats = self.engine.coloring.stats()
+            coloring_text = f"Spring batches: {stats['batches']} (largest {stats['largest']}, smallest {stats['smallest']})"
+            display.blit(self.font.render(coloring_text, True, (0, 0, 0)), (0, 90))
+
+        if self.adaptive is not None:
+            # Compared to always running the fixed config.substeps
+            samples = self.profiler.values.get("substeps")
+            mean = samples.mean if samples is not None else self.substeps
+            saved = 1 - mean / self.config.substeps
+            substeps_text = f"Substeps: {self.substeps} (mean {mean:.1f}, fixed {self.config.substeps}: {saved:.0%} saved)"
+            display.blit(self.font.render(substeps_text, True, (0, 0, 0)), (0, 105))
+
+        if self.profiler.cprofile is not None:
+            cprofile_text = self.font.render("cProfile running, press the profile key to stop", True, (255, 0, 0))
+            display.blit(cprofile_text, (display.get_width() - cprofile_text.get_width(), 0))
+
+        # Mean and 95th percentile of every phase timed so far
+        for row, (name, timings) in enumerate(self.profiler.phase_items()):
+            p95 = timings.percentiles((95,))[0]
+            phase_text = self.font.render(f"{name}: {timings.mean:.2f} ms (p95 {p95:.2f})", True, (0, 0, 0))
+            display.blit(phase_text, (0, 125 + row * 15))
+
+    def _update_averages(self):
+        """Fold the last tick's timings into the running averages"""
         self.avg_simulate_time = (self.avg_simulate_time * self.ticks + self.simulate_time) / (self.ticks + 1)
         self.avg_draw_time = (self.avg_draw_time * self.ticks + self.draw_time) / (self.ticks + 1)
 
     def reset(self):
         """Reset the simulation state"""
+        self.rng.seed(self.config.seed)
+        if self.reset_func is None:
+            if self.engine is not None:
+                self.engine.reset()
+                self.history.clear()
+            return
+
         values = self.reset_func()
 
         if values is None:
@@ -141,39 +396,109 @@ class Simulation:
         if len(values) > 2 and values[2] is not None:
             self.bodies.extend(values[2])
 
+        self.engine = None
+
+    def _handle_events(self, before_change=None):
+        """Handle window events, returning whether the simulation was reset or rewound"""
+        changed = False
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.running = False
+            if event.type == pygame.MOUSEWHEEL:
+                self.camera.zoom_at(pygame.mouse.get_pos(), self.config.zoom_step**event.y)
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    self.running = False
+                if self.reset_key and event.key == self.reset_key:
+                    if before_change is not None:
+                        before_change()
+                    self.reset()
+                    changed = True
+                if self.config.history_size and event.key == self.config.rewind_key and len(self.history):
+                    if before_change is not None:
+                        before_change()
+                    self.rewind()
+                    changed = True
+                if self.config.camera_reset_key and event.key == self.config.camera_reset_key:
+                    self.camera.reset()
+                if self.config.profile_key and event.key == self.config.profile_key:
+                    stats = self.profiler.toggle_cprofile()
+                    if stats is None:
+                        logger.info("cProfile started")
+                    else:
+                        logger.info("cProfile stopped, hottest functions:\n%s", stats)
+        return changed
+
     def simulate(self, callback=lambda x: None):
         """Run the main simulation loop"""
+        if self.config.threaded_physics:
+            self._simulate_threaded(callback)
+        else:
+            self._simulate(callback)
+
+        pygame.quit()
+
+        if self.profiler.cprofile is not None:
+            logger.info("cProfile stopped, hottest functions:\n%s", self.profiler.toggle_cprofile())
+        if self.config.trace_path is not None:
+            self.profiler.export_chrome_trace(self.config.trace_path)
+        if self.hash_file is not None:
+            self.hash_file.close()
+            self.hash_file = None
+
+        if self.debug:
+            logger.info("Ticks: %d", self.ticks)
+            logger.info("Average simulation time: %.2f ms", self.avg_simulate_time)
+            logger.info("Average draw time: %.2f ms", self.avg_draw_time)
+            logger.info("%s", self.profiler.report())
+
+    def _simulate(self, callback):
         while self.running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.running = False
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
-                        self.running = False
-                    if self.reset_key and event.key == self.reset_key:
-                        self.reset()
+            self._handle_events()
 
             self.display.fill(self.config.background_color)
 
-            mouse_pos = pygame.mouse.get_pos()
-            mouse_pressed = pygame.mouse.get_pressed()
+            mouse_pos, mouse_pressed = self._mouse_input()
 
             callback(self)
+            self.record_history()
             self.update(self.dt, mouse_pos, mouse_pressed)
             self.draw()
 
             pygame.display.flip()
 
-            self.dt = min(self.clock.tick(self.config.fps) * self.config.fps / 1000, 1)
+            frame_dt = min(self.clock.tick(self.config.fps) * self.config.fps / 1000, 1)
+            self.dt = 1 if self.config.deterministic else frame_dt
 
+            self._update_averages()
             self.ticks += 1
 
-        pygame.quit()
+    def _simulate_threaded(self, callback):
+        # Physics (and the callback) run on their own thread at a fixed dt, this loop only draws
+        physics = PhysicsThread(self, callback)
+        self.dt = physics.dt
+        physics.start()
 
-        if self.debug:
-            print(f"Ticks: {self.ticks}")
-            print(f"Average simulation time: {self.avg_simulate_time:.2f} ms")
-            print(f"Average draw time: {self.avg_draw_time:.2f} ms")
+        while self.running:
+            # The physics thread has to stop before the engine is reset or rewound under it
+            if self._handle_events(before_change=physics.stop):
+                physics = PhysicsThread(self, callback)
+                physics.start()
+
+            self.display.fill(self.config.background_color)
+
+            physics.set_input(*self._mouse_input())
+            positions, state = physics.frame()
+            self.draw(positions=positions, state=state)
+
+            pygame.display.flip()
+
+            self.clock.tick(self.config.fps)
+
+            self._update_averages()
+            self.ticks += 1
+
+        physics.stop()
 
     def stop(self):
         """Stop the simulation"""
@@ -0,0 +1,103 @@
+import numpy as np
+
+# The fields of every store that change while the simulation runs, everything else is fixed by the scene
+SNAPSHOT_FIELDS = {
+    "nodes": ("pos", "vel", "dragging"),
+    "springs": ("total_force", "last_direction", "broken"),
+    "bodies": ("center_of_mass", "destroyed"),
+}
+
+
+def snapshot_dtype(scene):
+    """The fixed-width record type holding the mutable state of a scene, plus the tick it was taken on"""
+    fields = [("tick", "<i8")]
+    for store, names in SNAPSHOT_FIELDS.items():
+        arrays = getattr(scene, store)
+        for name in names:
+            array = getattr(arrays, name)
+            fields.append((f"{store}.{name}", array.dtype, array.shape))
+    return np.dtype(fields)
+
+
+def capture_snapshot(scene, tick, out):
+    """Copies the mutable state of a scene into a snapshot record"""
+    out["tick"] = tick
+    for store, names in SNAPSHOT_FIELDS.items():
+        arrays = getattr(scene, store)
+        for name in names:
+            out[f"{store}.{name}"] = getattr(arrays, name)
+    return out
+
+
+def apply_snapshot(scene, snapshot):
+    """Copies a snapshot record back into the arrays of a scene, in place, returning its tick"""
+    if snapshot.dtype != snapshot_dtype(scene):
+        raise ValueError("Snapshot was taken from a scene with different node, spring or body counts")
+    for store, names in SNAPSHOT_FIELDS.items():
+        arrays = getattr(scene, store)
+        for name in names:
+            np.copyto(getattr(arrays, name), snapshot[f"{store}.{name}"])
+    return int(snapshot["tick"])
+
+
+class SnapshotHistory:
+    """
+    A ring buffer of the last few snapshots of an engine, for rewinding it.
+    All snapshots live in one preallocated structured array, so taking one is a copy of the mutable
+    arrays into the next slot (overwriting the oldest once full) without allocating anything.
+    The history can be passed straight to Simulation.simulate or HeadlessSimulation.run as the
+    callback, taking a snapshot at the start of every interval-th tick.
+    Attributes:
+        capacity (int): How many snapshots are kept.
+        interval (int): Ticks between snapshots when used as a callback.
+    Methods:
+        push(engine):
+            Takes a snapshot of the engine, dropping the oldest one if the buffer is full.
+        get(age=0):
+            Returns a snapshot, 0 being the latest.
+        rewind(engine, age=0):
+            Restores the engine to a snapshot, forgetting it and every newer one.
+        clear():
+            Forgets every snapshot.
+    """
+
+    def __init__(self, capacity, interval=1):
+        self.capacity = capacity
+        self.interval = interval
+        self.buffer = None
+        self.count = 0
+        self.next = 0
+        self.calls = 0
+
+    def __len__(self):
+        return self.count
+
+    def __call__(self, sim):
+        if self.calls % self.interval == 0:
+            self.push(sim.get_engine())
+        self.calls += 1
+
+    def push(self, engine):
+        dtype = snapshot_dtype(engine.scene)
+        if self.buffer is None or self.buffer.dtype != dtype:
+            self.buffer = np.zeros(self.capacity, dtype)
+            self.clear()
+
+        engine.snapshot(self.buffer[self.next])
+        self.next = (self.next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def get(self, age=0):
+        if not 0 <= age < self.count:
+            raise IndexError(f"Only {self.count} snapshots are kept")
+        return self.buffer[(self.next - 1 - age) % self.capacity]
+
+    def rewind(self, engine, age=0):
+        engine.restore(self.get(age))
+        # Rewinding again goes further back
+        self.next = (self.next - 1 - age) % self.capacity
+        self.count -= age + 1
+
+    def clear(self):
+        self.count = 0
+        self.next = 0
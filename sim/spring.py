@@ -1,9 +1,12 @@
 # spring.py
-from math import exp
+from math import exp, sqrt
 
 import pygame
 
 from sim.constants import COLOR_1, COLOR_2, SPRING_COLOR, SPRING_DAMPING, SPRING_FORCE, SPRING_MAX_FORCE, SPRING_WIDTH
+from sim.materials import SPRING_MATERIALS, MaterialColor, MaterialField, SpringMaterial
+from sim.node import accelerate
+from sim.state import Field, SpringArrays, VectorField, bind
 
 
 class Spring:
@@ -30,13 +33,26 @@ class Spring:
     Methods:
     --------
     _calculate_force(dt):
-        Calculates the force exerted by the spring based on the positions and velocities of the points.
+        Calculates the (x, y) force exerted by the spring based on the positions and velocities of the points.
     update(dt):
         Updates the forces applied to the points connected by the spring.
     draw(display):
         Draws the spring as a line between the two points on the given display.
+
+    The numeric attributes live in a SpringArrays row (see Node), and the engine fills in
+    the endpoint indices when it gathers the springs. Color and width live in a shared
+    SpringMaterial row.
     """
 
+    __slots__ = ("_store", "_index", "_material", "_last_direction", "point1", "point2")
+
+    force = Field()
+    desired_length = Field()
+    damping = Field()
+    last_direction = VectorField()
+    color = MaterialField(SPRING_MATERIALS)
+    width = MaterialField(SPRING_MATERIALS)
+
     def __init__(
         self,
         point1,
@@ -48,53 +64,82 @@ class Spring:
         width=SPRING_WIDTH,
     ):
         # Initialize the spring with two points, force, desired length, damping, color, and width
+        bind(self, *SpringArrays.allocate())
+        self._material = SPRING_MATERIALS.intern(SpringMaterial(color, None, None, width))
+
         self.point1 = point1
         self.point2 = point2
         self.force = force
         self.desired_length = desired_length
         self.damping = damping
-        self.color = color
-        self.width = width
 
-        self.last_direction = pygame.Vector2(0, 0)
+    def __del__(self):
+        SPRING_MATERIALS.release(self._material)
 
     def _calculate_force(self, dt):
+        point1, point2 = self.point1, self.point2
+        views1, index1 = point1._store.views, point1._index
+        views2, index2 = point2._store.views, point2._index
+        pinned = views1.static[index1] or views2.static[index2]
+        return self._force(dt, views1, index1, views2, index2, pinned)
+
+    def _force(self, dt, views1, index1, views2, index2, pinned):
+        # Plain floats straight from the arrays (see Node), in the order of operations of the
+        # pygame.Vector2 arithmetic, which divides by multiplying with the reciprocal
+        views, index = self._store.views, self._index
+
         # Calculate the difference in position between the two points
-        delta = self.point2.pos - self.point1.pos
-        distance = delta.length()
+        x, x1, x2 = 2 * index, 2 * index1, 2 * index2
+        pos1, pos2 = views1.pos, views2.pos
+        delta_x = pos2[x2] - pos1[x1]
+        delta_y = pos2[x2 + 1] - pos1[x1 + 1]
+        distance = sqrt(delta_x * delta_x + delta_y * delta_y)
+        last_direction = views.last_direction
         if distance != 0:
-            direction = delta / distance
-            self.last_direction = direction
+            inverse_distance = 1 / distance
+            direction_x, direction_y = delta_x * inverse_distance, delta_y * inverse_distance
+            last_direction[x] = direction_x
+            last_direction[x + 1] = direction_y
         else:
-            direction = self.last_direction
+            direction_x, direction_y = last_direction[x], last_direction[x + 1]
 
         # Calculate the required change in position to achieve the desired length
-        required_delta = direction * self.desired_length
-        force = self.force * (required_delta - delta)
+        desired_length, force = views.desired_length[index], views.force[index]
+        force_x = force * (direction_x * desired_length - delta_x)
+        force_y = force * (direction_y * desired_length - delta_y)
 
         # Calculate the relative velocity between the two points
-        relative_velocity = (self.point2.vel - self.point1.vel).dot(direction)
-        damping_factor = exp(-self.damping * dt)
+        vel1, vel2 = views1.vel, views2.vel
+        relative_velocity = (vel2[x2] - vel1[x1]) * direction_x + (vel2[x2 + 1] - vel1[x1 + 1]) * direction_y
+        damping_factor = exp(-views.damping[index] * dt)
         new_relative_velocity = relative_velocity * damping_factor
         relative_velocity_delta = new_relative_velocity - relative_velocity
 
         # Calculate the damping forces to be applied to the points
-        damping_force = direction * relative_velocity_delta / 2
+        damping_x = direction_x * relative_velocity_delta / 2
+        damping_y = direction_y * relative_velocity_delta / 2
 
-        if self.point1.static or self.point2.static:
-            damping_force *= 2
+        if pinned:
+            damping_x *= 2
+            damping_y *= 2
 
-        total_force = damping_force + force
-        return total_force
+        return damping_x + force_x, damping_y + force_y
 
     def update(self, dt):
-        if self.point1.static and self.point2.static:
+        # The endpoints' rows and static flags are looked up once for the force and both pushes
+        point1, point2 = self.point1, self.point2
+        views1, index1 = point1._store.views, point1._index
+        views2, index2 = point2._store.views, point2._index
+        static1, static2 = views1.static[index1], views2.static[index2]
+        if static1 and static2:
             return
 
         # Uses the calculate force function to actually get the forces
-        total_force = self._calculate_force(dt)
-        self.point1.apply_force(-total_force, dt)
-        self.point2.apply_force(total_force, dt)
+        force_x, force_y = self._force(dt, views1, index1, views2, index2, static1 or static2)
+        if not static1:
+            accelerate(views1, index1, -force_x, -force_y, dt)
+        if not static2:
+            accelerate(views2, index2, force_x, force_y, dt)
 
     def draw(self, display):
         # Draw the spring as a line between the two points
@@ -119,6 +164,12 @@ class DestroyableSpring(Spring):
             Draws the spring on the given display if it is not broken.
     """
 
+    __slots__ = ("_total_force",)
+
+    max_force = Field()
+    broken = Field()
+    total_force = VectorField()
+
     def __init__(
         self,
         point1,
@@ -137,22 +188,34 @@ class DestroyableSpring(Spring):
 
         super().__init__(point1, point2, desired_length, force, damping, **kwargs)
 
+        self._store.destroyable[self._index] = True
         self.max_force = max_force
         self.broken = False
         self.color = color
-        self.total_force = pygame.Vector2(0, 0)
 
     def update(self, dt):
-        if self.broken or (self.point1.static and self.point2.static):
+        views, index = self._store.views, self._index
+        if views.broken[index]:
+            return
+        point1, point2 = self.point1, self.point2
+        views1, index1 = point1._store.views, point1._index
+        views2, index2 = point2._store.views, point2._index
+        static1, static2 = views1.static[index1], views2.static[index2]
+        if static1 and static2:
             return
 
-        self.total_force = self._calculate_force(dt)
-        if self.total_force.magnitude() >= self.max_force:
-            self.broken = True
+        force_x, force_y = self._force(dt, views1, index1, views2, index2, static1 or static2)
+        total_force = views.total_force
+        total_force[2 * index] = force_x
+        total_force[2 * index + 1] = force_y
+        if sqrt(force_x * force_x + force_y * force_y) >= views.max_force[index]:
+            views.broken[index] = True
             return
 
-        self.point1.apply_force(-self.total_force, dt)
-        self.point2.apply_force(self.total_force, dt)
+        if not static1:
+            accelerate(views1, index1, -force_x, -force_y, dt)
+        if not static2:
+            accelerate(views2, index2, force_x, force_y, dt)
 
     def draw(self, display):
         if not self.broken:
@@ -164,6 +227,11 @@ class ColorizedDestroyableSpring(DestroyableSpring):
     A class representing a colorized spring that can break if the force exceeds a maximum threshold.
     """
 
+    __slots__ = ("_color1", "_color2")
+
+    color1 = MaterialField(SPRING_MATERIALS, MaterialColor)
+    color2 = MaterialField(SPRING_MATERIALS, MaterialColor)
+
     def __init__(
         self,
         point1,
@@ -179,17 +247,21 @@ class ColorizedDestroyableSpring(DestroyableSpring):
         super().__init__(point1, point2, desired_length, max_force, force, damping, **kwargs)
 
         # Default colors if none are provided
-        self.color1 = pygame.Color(COLOR_1) if color1 is None else pygame.Color(color1)
-        self.color2 = pygame.Color(COLOR_2) if color2 is None else pygame.Color(color2)
+        self._material = SPRING_MATERIALS.replace(
+            self._material,
+            color1=pygame.Color(COLOR_1) if color1 is None else pygame.Color(color1),
+            color2=pygame.Color(COLOR_2) if color2 is None else pygame.Color(color2),
+        )
 
     def draw(self, display):
         if not self.broken:
             t = self.total_force.magnitude() / self.max_force
+            color1, color2 = self.color1, self.color2
 
             color = pygame.Color(
-                int(self.color1.r + (self.color2.r - self.color1.r) * t),
-                int(self.color1.g + (self.color2.g - self.color1.g) * t),
-                int(self.color1.b + (self.color2.b - self.color1.b) * t),
+                int(color1.r + (color2.r - color1.r) * t),
+                int(color1.g + (color2.g - color1.g) * t),
+                int(color1.b + (color2.b - color1.b) * t),
             )
 
             pygame.draw.line(display, color, self.point1.pos, self.point2.pos, self.width)
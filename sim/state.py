@@ -0,0 +1,325 @@
+from operator import attrgetter
+from types import SimpleNamespace
+
+import numpy as np
+import pygame
+
+
+class Vec2View:
+    """
+    A pygame.Vector2-like view onto one row of an (n, 2) array, given as a flat memoryview of the
+    array and the offset of the row's x in it.
+    Reads come straight from the array and in-place operations write back to it, so
+    `node.pos.x += 1` or `node.vel *= 0.5` behave exactly like they do on a pygame.Vector2.
+    Arithmetic that produces a new vector returns a plain pygame.Vector2.
+    Objects keep one view per vector field (see bind), so reading `node.pos` allocates nothing.
+    """
+
+    __slots__ = ("_data", "_offset")
+
+    def __init__(self, data, offset):
+        self._data = data
+        self._offset = offset
+
+    def _vector(self):
+        return pygame.Vector2(self._data[self._offset], self._data[self._offset + 1])
+
+    @property
+    def x(self):
+        return self._data[self._offset]
+
+    @x.setter
+    def x(self, value):
+        self._data[self._offset] = value
+
+    @property
+    def y(self):
+        return self._data[self._offset + 1]
+
+    @y.setter
+    def y(self, value):
+        self._data[self._offset + 1] = value
+
+    def __len__(self):
+        return 2
+
+    def __getitem__(self, item):
+        if not -2 <= item < 2:
+            raise IndexError("Vec2View index out of range")
+        return self._data[self._offset + item % 2]
+
+    def __setitem__(self, item, value):
+        if not -2 <= item < 2:
+            raise IndexError("Vec2View index out of range")
+        self._data[self._offset + item % 2] = value
+
+    def __iter__(self):
+        return iter((self._data[self._offset], self._data[self._offset + 1]))
+
+    def __repr__(self):
+        return f"Vec2View({self.x}, {self.y})"
+
+    def __eq__(self, other):
+        return self._vector() == other
+
+    def __add__(self, other):
+        return self._vector() + other
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return self._vector() - other
+
+    def __rsub__(self, other):
+        return pygame.Vector2(other) - self._vector()
+
+    def __mul__(self, other):
+        return self._vector() * other
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        return self._vector() / other
+
+    def __neg__(self):
+        return -self._vector()
+
+    def __iadd__(self, other):
+        self._data[self._offset] += other[0]
+        self._data[self._offset + 1] += other[1]
+        return self
+
+    def __isub__(self, other):
+        self._data[self._offset] -= other[0]
+        self._data[self._offset + 1] -= other[1]
+        return self
+
+    def __imul__(self, other):
+        self._data[self._offset] *= other
+        self._data[self._offset + 1] *= other
+        return self
+
+    def __itruediv__(self, other):
+        self._data[self._offset] /= other
+        self._data[self._offset + 1] /= other
+        return self
+
+    def dot(self, other):
+        return self._vector().dot(other)
+
+    def length(self):
+        return self._vector().length()
+
+    magnitude = length
+
+    def length_squared(self):
+        return self._vector().length_squared()
+
+    def distance_to(self, other):
+        return self._vector().distance_to(other)
+
+    def normalize(self):
+        return self._vector().normalize()
+
+    def copy(self):
+        return self._vector()
+
+
+class ArrayStore:
+    """
+    Structure-of-arrays storage. Subclasses declare FIELDS as a mapping of
+    name -> (dtype, width, default), where width is 1 for scalars or 2 for vectors.
+    Objects created before an engine gathers them take a row of a shared chunk (see allocate),
+    rather than each owning a one-row store.
+    Every field is also kept as a flat memoryview in views (vector fields as x0, y0, x1, y1, ...),
+    whose reads hand back plain Python floats and bools at a third of the cost of ndarray.item;
+    the per-object update methods go through these. Fields are C-contiguous and only ever written
+    in place, so the views never go stale.
+    version counts the writes made through Field, copy_from and copy_row, so data derived from the
+    arrays can be cached against it (see DampingFactorCache); code writing an array directly
+    calls changed() afterwards.
+    """
+
+    FIELDS = {}
+    CHUNK_SIZE = 1024
+    _chunk = None
+    _chunk_used = 0
+
+    def __init__(self, size=0):
+        self.size = size
+        self.version = 0
+        for name, (dtype, width, default) in self.FIELDS.items():
+            shape = (size,) if width == 1 else (size, width)
+            setattr(self, name, np.full(shape, default, dtype=dtype))
+        self._create_views()
+
+    @classmethod
+    def allocate(cls):
+        """Returns (store, index) of a fresh row for a new object, taken from the current chunk of this store type"""
+        chunk = cls.__dict__.get("_chunk")
+        if chunk is None or cls._chunk_used == cls.CHUNK_SIZE:
+            chunk = cls._chunk = cls(cls.CHUNK_SIZE)
+            cls._chunk_used = 0
+        index = cls._chunk_used
+        cls._chunk_used += 1
+        return chunk, index
+
+    @classmethod
+    def from_arrays(cls, size, arrays):
+        # Adopts the given arrays by field name without copying them, missing fields get their default
+        store = cls.__new__(cls)
+        store.size = size
+        store.version = 0
+        for name, (dtype, width, default) in cls.FIELDS.items():
+            shape = (size,) if width == 1 else (size, width)
+            if name in arrays:
+                value = np.ascontiguousarray(np.asarray(arrays[name], dtype=dtype).reshape(shape))
+            else:
+                value = np.full(shape, default, dtype=dtype)
+            setattr(store, name, value)
+        store._create_views()
+        return store
+
+    def _create_views(self):
+        self.views = SimpleNamespace(**{name: memoryview(getattr(self, name).reshape(-1)) for name in self.FIELDS})
+
+    def changed(self):
+        """Marks the arrays as written to, invalidating what was cached against the version"""
+        self.version += 1
+
+    def copy(self):
+        return type(self).from_arrays(self.size, {name: getattr(self, name).copy() for name in self.FIELDS})
+
+    def copy_from(self, source):
+        # Overwrites every field in place, so views onto this store stay valid
+        for name in self.FIELDS:
+            np.copyto(getattr(self, name), getattr(source, name))
+        self.changed()
+
+    def copy_row(self, source, src_index, dst_index):
+        # Copy every field of one row from another store into this one
+        for name in self.FIELDS:
+            getattr(self, name)[dst_index] = getattr(source, name)[src_index]
+        self.changed()
+
+
+class NodeArrays(ArrayStore):
+    """Contiguous node state: positions, velocities, masses and per-node flags."""
+
+    FIELDS = {
+        "pos": (np.float64, 2, 0.0),
+        "vel": (np.float64, 2, 0.0),
+        "mass": (np.float64, 1, 1.0),
+        "gravity": (np.float64, 1, 0.0),
+        "radius": (np.float64, 1, 0.0),
+        "elasticity": (np.float64, 1, 0.0),
+        "friction": (np.float64, 1, 0.0),
+        "static": (np.bool_, 1, False),
+        "draggable": (np.bool_, 1, True),
+        "dragging": (np.bool_, 1, False),
+    }
+
+
+class SpringArrays(ArrayStore):
+    """Contiguous spring state: endpoint indices, rest lengths, stiffness, damping and breakage."""
+
+    FIELDS = {
+        "node1": (np.intp, 1, -1),
+        "node2": (np.intp, 1, -1),
+        "force": (np.float64, 1, 0.0),
+        "desired_length": (np.float64, 1, 0.0),
+        "damping": (np.float64, 1, 0.0),
+        "max_force": (np.float64, 1, np.inf),
+        "destroyable": (np.bool_, 1, False),
+        "broken": (np.bool_, 1, False),
+        "total_force": (np.float64, 2, 0.0),
+        "last_direction": (np.float64, 2, 0.0),
+    }
+
+
+class BodyArrays(ArrayStore):
+    """Contiguous pressurized soft body state: pressure, center of mass and destruction."""
+
+    FIELDS = {
+        "pressure": (np.float64, 1, 0.0),
+        "center_of_mass": (np.float64, 2, 0.0),
+        "destroyable": (np.bool_, 1, False),
+        "destroyed": (np.bool_, 1, False),
+    }
+
+
+class Field:
+    """Descriptor exposing one scalar row of an object's backing store as an attribute."""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        # The memoryview hands back a plain Python float/bool, which is much faster to work with than a NumPy scalar
+        return getattr(obj._store.views, self.name)[obj._index]
+
+    def __set__(self, obj, value):
+        store = obj._store
+        getattr(store, self.name)[obj._index] = value
+        store.version += 1
+
+
+class VectorField(property):
+    """
+    Descriptor exposing one (x, y) row of an object's backing store as a Vec2View.
+    The view is kept in the object's "_" + name attribute, which bind refreshes, and read back
+    through a C-level getter, so `node.pos` costs about as much as a plain attribute.
+    Assigning any (x, y) pair writes it into the row.
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        property.__init__(self, attrgetter("_" + name), self._write)
+        owner._vector_fields = getattr(owner, "_vector_fields", ()) + (name,)
+
+    def _write(self, obj, value):
+        view = self.fget(obj)
+        view.x, view.y = value[0], value[1]
+
+
+def bind(obj, store, index):
+    """Points obj at a row of store, along with the Vec2Views of its vector fields"""
+    obj._store = store
+    obj._index = index
+    for name in type(obj)._vector_fields:
+        setattr(obj, "_" + name, Vec2View(getattr(store.views, name), 2 * index))
+
+
+def gather(objects, store_type):
+    """
+    Copies the rows of every object into one freshly allocated store and rebinds
+    each object to its row, so the objects become views onto the shared arrays.
+    """
+    store = store_type(len(objects))
+    # Objects come from a handful of chunks (or earlier stores), so rows are copied one source store at a time
+    sources = {}
+    for index, obj in enumerate(objects):
+        source = sources.get(id(obj._store))
+        if source is None:
+            source = sources[id(obj._store)] = (obj._store, [], [])
+        source[1].append(obj._index)
+        source[2].append(index)
+        bind(obj, store, index)
+
+    for source, rows, indices in sources.values():
+        for name in store_type.FIELDS:
+            getattr(store, name)[indices] = getattr(source, name)[rows]
+    return store
+
+
+def scatter_add(indices, values, size):
+    """
+    Sums (k, 2) values into a (size, 2) array by row index, accumulating repeated indices.
+    Much faster than np.add.at for the many-springs-per-node case.
+    """
+    result = np.empty((size, 2))
+    for axis in range(2):
+        result[:, axis] = np.bincount(indices, values[:, axis], size)
+    return result
@@ -0,0 +1,218 @@
+import numpy as np
+
+# Most segments in one leaf of the hierarchy
+LEAF_SIZE = 4
+
+
+class StaticGeometry:
+    """
+    Obstacles that never move, such as terrain, ramps and walls inside the world, as line segments.
+    Polylines and polygons are split into their edges; nodes collide with the edges from either side.
+    Attributes:
+        segments (np.ndarray): (k, 2, 2) endpoints of every segment.
+    Methods:
+        add_segment(start, end):
+            Adds a single segment.
+        add_polyline(points, closed=False):
+            Adds the segments between consecutive points, and from the last back to the first if closed.
+        add_polygon(points):
+            Adds the edges of a polygon.
+        add_box(left, top, right, bottom):
+            Adds the four edges of an axis aligned rectangle.
+        bvh():
+            Returns the SegmentBVH over the segments, built once and kept until more are added.
+    """
+
+    def __init__(self, segments=None):
+        self._parts = []
+        self._bvh = None
+        if segments is not None:
+            self._add(np.asarray(segments, dtype=np.float64).reshape(-1, 2, 2))
+
+    def __len__(self):
+        return sum(len(part) for part in self._parts)
+
+    @property
+    def segments(self):
+        if not self._parts:
+            return np.empty((0, 2, 2))
+        if len(self._parts) > 1:
+            self._parts = [np.concatenate(self._parts)]
+        return self._parts[0]
+
+    def _add(self, segments):
+        self._parts.append(segments)
+        self._bvh = None
+
+    def bvh(self):
+        if self._bvh is None and len(self):
+            self._bvh = SegmentBVH(self.segments)
+        return self._bvh
+
+    def add_segment(self, start, end):
+        self._add(np.array([[start, end]], dtype=np.float64))
+
+    def add_polyline(self, points, closed=False):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if closed:
+            points = np.concatenate((points, points[:1]))
+        self._add(np.stack((points[:-1], points[1:]), axis=1))
+
+    def add_polygon(self, points):
+        self.add_polyline(points, closed=True)
+
+    def add_box(self, left, top, right, bottom):
+        self.add_polygon([(left, top), (right, top), (right, bottom), (left, bottom)])
+
+
+def _morton_codes(points, bits=16):
+    # Interleaves the bits of the quantized x and y coordinates, so nearby points get nearby codes.
+    # Both axes share one scale, or a flat terrain would be stretched into a tall square grid
+    lower, upper = points.min(axis=0), points.max(axis=0)
+    scale = (2**bits - 1) / max(float((upper - lower).max()), 1e-12)
+    cells = ((points - lower) * scale).astype(np.uint64)
+    codes = np.zeros(len(points), dtype=np.uint64)
+    for bit in range(bits):
+        codes |= ((cells[:, 0] >> np.uint64(bit)) & np.uint64(1)) << np.uint64(2 * bit)
+        codes |= ((cells[:, 1] >> np.uint64(bit)) & np.uint64(1)) << np.uint64(2 * bit + 1)
+    return codes
+
+
+class SegmentBVH:
+    """
+    Bounding volume hierarchy over static segments, built once and queried for many nodes at once.
+    The segments are sorted along a Morton curve through their midpoints and cut into leaves of
+    LEAF_SIZE consecutive segments; every level above pairs up the boxes of the level below, so the
+    whole tree is a few array reductions to build and needs no pointers. A query walks all its
+    circles down the levels together, keeping only the (circle, box) pairs that still overlap, so
+    its cost grows with the logarithm of the segment count rather than with the count itself.
+    Attributes:
+        segments (np.ndarray): (k, 2, 2) segment endpoints, in tree order.
+        order (np.ndarray): The index each tree order segment had in the segments the tree was built from.
+        levels (list): (left, top, right, bottom) boxes of every level, from the root down to the leaves.
+    Methods:
+        contacts(points, radius):
+            Returns the deepest contact of every circle that overlaps a segment.
+        in_box(lower, upper):
+            Returns the tree order indices of the segments whose boxes overlap a rectangle.
+    """
+
+    def __init__(self, segments, leaf_size=LEAF_SIZE):
+        segments = np.asarray(segments, dtype=np.float64).reshape(-1, 2, 2)
+        self.leaf_size = leaf_size
+        self.order = np.argsort(_morton_codes(segments.mean(axis=1)), kind="stable")
+        self.segments = segments[self.order]
+
+        # Leaf boxes, then each level up merges pairs (an odd box out is carried up on its own)
+        leaves = -(-len(self.segments) // leaf_size)
+        padding = np.repeat(self.segments[-1:], leaves * leaf_size - len(self.segments), axis=0)
+        padded = np.concatenate((self.segments, padding))
+        blocks = padded.reshape(leaves, leaf_size * 2, 2)
+        boxes = np.concatenate((blocks.min(axis=1), blocks.max(axis=1)), axis=1)
+        self.levels = [boxes]
+        while len(boxes) > 1:
+            if len(boxes) % 2:
+                boxes = np.concatenate((boxes, boxes[-1:]))
+            lower = np.minimum(boxes[0::2, :2], boxes[1::2, :2])
+            upper = np.maximum(boxes[0::2, 2:], boxes[1::2, 2:])
+            boxes = np.concatenate((lower, upper), axis=1)
+            self.levels.append(boxes)
+        self.levels.reverse()
+
+    def __len__(self):
+        return len(self.segments)
+
+    def _candidates(self, queries):
+        """Returns the (query, tree order segment) pairs whose boxes overlap, for (left, top, right, bottom) queries"""
+        query = np.arange(len(queries))
+        box = np.zeros(len(queries), dtype=np.intp)
+        for depth, boxes in enumerate(self.levels):
+            if depth:
+                # Each surviving pair moves on to both children of its box, if the child exists
+                query = np.repeat(query, 2)
+                box = np.repeat(box * 2, 2)
+                box[1::2] += 1
+                exists = box < len(boxes)
+                query, box = query[exists], box[exists]
+            a, b = queries[query], boxes[box]
+            overlap = (a[:, 0] <= b[:, 2]) & (b[:, 0] <= a[:, 2]) & (a[:, 1] <= b[:, 3]) & (b[:, 1] <= a[:, 3])
+            query, box = query[overlap], box[overlap]
+            if query.size == 0:
+                break
+
+        size = self.leaf_size
+        query = np.repeat(query, size)
+        segment = (box[:, None] * size + np.arange(size)).reshape(-1)
+        exists = segment < len(self.segments)
+        return query[exists], segment[exists]
+
+    def in_box(self, lower, upper):
+        if len(self.segments) == 0:
+            return np.empty(0, dtype=np.intp)
+        lower = np.asarray(lower, dtype=np.float64).reshape(1, 2)
+        upper = np.asarray(upper, dtype=np.float64).reshape(1, 2)
+        segment = self._candidates(np.concatenate((lower, upper), axis=1))[1]
+        ends = self.segments[segment]
+        overlap = np.all((ends.min(axis=1) <= upper) & (lower <= ends.max(axis=1)), axis=1)
+        return segment[overlap]
+
+    def contacts(self, points, radius):
+        """
+        Finds the segments every circle (points, radius) overlaps, and keeps the deepest one per circle.
+        Returns the indices of the colliding circles, the penetration depths and the unit normals
+        pointing out of the segments towards the circles: the (depth, normal) form of wall contacts.
+        """
+        if len(self.segments) == 0 or len(points) == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0), np.empty((0, 2))
+        query, segment = self._candidates(np.concatenate((points - radius[:, None], points + radius[:, None]), axis=1))
+
+        # Closest point of each candidate segment to its circle center
+        start, end = self.segments[segment, 0], self.segments[segment, 1]
+        edge = end - start
+        length = np.einsum("ij,ij->i", edge, edge)
+        offset = points[query] - start
+        t = np.clip(np.einsum("ij,ij->i", offset, edge) / np.maximum(length, 1e-12), 0, 1)
+        delta = offset - edge * t[:, None]
+        distance = np.hypot(delta[:, 0], delta[:, 1])
+        depth = radius[query] - distance
+        hit = depth > 0
+        query, edge, delta, distance, depth = query[hit], edge[hit], delta[hit], distance[hit], depth[hit]
+        if query.size == 0:
+            return query, depth, delta
+
+        # The deepest contact of every circle
+        deepest = np.lexsort((-depth, query))
+        first = np.r_[True, query[deepest][1:] != query[deepest][:-1]]
+        deepest = deepest[first]
+        query, edge, delta = query[deepest], edge[deepest], delta[deepest]
+        distance, depth = distance[deepest], depth[deepest]
+
+        # A center exactly on the segment is pushed out along the segment's left normal
+        normal = np.stack((edge[:, 1], -edge[:, 0]), axis=1)
+        on_segment = distance == 0
+        normal[~on_segment] = delta[~on_segment]
+        normal /= np.maximum(np.hypot(normal[:, 0], normal[:, 1]), 1e-12)[:, None]
+        return query, depth, normal
+
+
+def collide_obstacles(nodes, indices, pos, vel, bvh, dt):
+    """
+    Pushes the given nodes out of the static segments of bvh, in place on their pos and vel rows.
+    Like a wall contact, a node is moved out by its depth along the normal, its velocity into the
+    obstacle is reflected and scaled by its elasticity, and its velocity along the obstacle is slowed
+    by its friction. Nodes already moving away from a segment keep their velocity.
+    """
+    hit, depth, normal = bvh.contacts(pos, nodes.radius[indices])
+    if hit.size == 0:
+        return
+    node = indices[hit]
+    pos[hit] += normal * depth[:, None]
+
+    velocity = vel[hit]
+    normal_speed = np.einsum("ij,ij->i", velocity, normal)
+    approaching = normal_speed < 0
+    normal_velocity = normal * normal_speed[:, None]
+    tangential_velocity = velocity - normal_velocity
+    friction = np.exp(-nodes.friction[node] * dt)
+    bounced = normal_velocity * -nodes.elasticity[node, None] + tangential_velocity * friction[:, None]
+    vel[hit] = np.where(approaching[:, None], bounced, velocity)
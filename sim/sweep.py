@@ -0,0 +1,94 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from itertools import product
+from time import perf_counter
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from sim.headless import HeadlessSimulation
+from sim.sim import SimulationConfig
+
+
+@dataclass
+class SweepResult:
+    """Metrics collected from one headless run of a parameter sweep."""
+
+    params: Dict[str, Any] = field(default_factory=dict)
+    ticks: int = 0
+    first_break_tick: Optional[int] = None  # tick on which the first DestroyableSpring broke
+    broken_springs: int = 0
+    max_spring_force: float = 0.0
+    final_kinetic_energy: float = 0.0
+    wall_time: float = 0.0
+    error: Optional[str] = None
+
+
+def parameter_grid(grid):
+    """Expand a {name: [values]} mapping into one parameter dict per combination"""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in product(*(grid[name] for name in names))]
+
+
+def run_configuration(builder, params, ticks, config=None, dt=1, callback=None):
+    """Build a scene with builder(**params), run it headlessly for a number of ticks and measure it"""
+    start = perf_counter()
+    sim = HeadlessSimulation.from_scene(builder(**params), config, dt)
+    nodes, springs = sim.engine.nodes, sim.engine.springs
+
+    result = SweepResult(params=params, ticks=ticks)
+    for _ in range(ticks):
+        sim.step(callback)
+        if springs.size:
+            force = np.hypot(springs.total_force[:, 0], springs.total_force[:, 1]).max()
+            result.max_spring_force = max(result.max_spring_force, float(force))
+        if result.first_break_tick is None and sim.engine.topology.broken_count:
+            result.first_break_tick = sim.ticks
+
+    movable = ~nodes.static
+    speed2 = np.einsum("ij,ij->i", nodes.vel[movable], nodes.vel[movable])
+    result.final_kinetic_energy = float(0.5 * np.sum(nodes.mass[movable] * speed2))
+    result.broken_springs = int(springs.broken.sum())
+    result.wall_time = perf_counter() - start
+    return result
+
+
+def _run_safely(builder, params, ticks, config, dt, callback):
+    # A failing configuration is reported in its result instead of taking the whole sweep down
+    try:
+        return run_configuration(builder, params, ticks, config, dt, callback)
+    except Exception as error:
+        return SweepResult(params=params, ticks=ticks, error=f"{type(error).__name__}: {error}")
+
+
+def sweep(
+    builder,
+    grid,
+    ticks,
+    config: Optional[SimulationConfig] = None,
+    dt=1,
+    callback=None,
+    processes: Optional[int] = None,
+):
+    """
+    Run every combination of a parameter grid headlessly in a process pool, using all cores by default.
+    Results are yielded as each run finishes, so closing the generator (or breaking out of the loop)
+    cancels the runs that have not started yet.
+    builder and callback are sent to the worker processes, so they must be module level functions,
+    e.g. the build() functions of the demo scripts:
+
+        for result in sweep(bridge.build, {"bridge_damping": [10_000, 50_000], "bridge_strength": [300, 500]}, 600):
+            print(result.params, result.first_break_tick)
+    """
+    configurations = parameter_grid(grid)
+    executor = ProcessPoolExecutor(processes)
+    pending = {executor.submit(_run_safely, builder, params, ticks, config, dt, callback) for params in configurations}
+    try:
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
@@ -0,0 +1,113 @@
+import threading
+from time import perf_counter, sleep
+
+import numpy as np
+
+from sim.render import FrameState, frame_state
+
+
+class PhysicsThread(threading.Thread):
+    """
+    Runs a simulation's engine at a fixed tick rate on a worker thread.
+    Real time is collected in an accumulator and spent in whole fixed-size ticks, so the physics
+    stays deterministic however slowly frames are drawn. After every tick the node positions are
+    published into a pair of snapshot buffers, which the render loop interpolates between, along
+    with a copy of the other arrays the Renderer reads (see FrameState). The render loop draws
+    from these alone, never from the arrays the physics thread is writing.
+    The step itself runs in NumPy (or the numba kernel, which releases the GIL), so physics and
+    rendering can overlap on multicore machines. Ticks are added to the simulation's cProfile
+    session while one is running (see Profiler.cprofile_worker).
+    Attributes:
+        tick_rate (int): Physics ticks per second (config.physics_rate, or config.fps).
+        dt (float): The fixed, normalized time step of every tick (1 is one frame at config.fps).
+        ticks (int): How many ticks have been simulated.
+        max_catch_up (int): Most ticks run back to back after a stall, older time is dropped.
+    Methods:
+        set_input(mouse_pos, mouse_pressed):
+            Hands the latest mouse state to the physics thread.
+        interpolate(out=None):
+            Returns the node positions blended between the last two snapshots.
+        frame(out=None):
+            Returns the interpolated positions and a copy of the FrameState published with them.
+        stop():
+            Stops the thread and waits for it to finish.
+    """
+
+    def __init__(self, simulation, callback=None, max_catch_up=5):
+        super().__init__(daemon=True)
+        self.simulation = simulation
+        self.engine = simulation.get_engine()
+        self.callback = callback
+        self.max_catch_up = max_catch_up
+
+        config = simulation.config
+        self.tick_rate = config.physics_rate or config.fps
+        self.period = 1 / self.tick_rate
+        self.dt = config.fps / self.tick_rate
+        self.ticks = 0
+        self.running = False
+
+        self.input = ((0, 0), (False, False, False))
+        self.lock = threading.Lock()
+        self.previous = self.engine.nodes.pos.copy()
+        self.current = self.engine.nodes.pos.copy()
+        self.state = FrameState(*(array.copy() for array in frame_state(self.engine)))
+        self.current_time = perf_counter()
+
+    def set_input(self, mouse_pos, mouse_pressed):
+        self.input = (mouse_pos, mouse_pressed)
+
+    def run(self):
+        self.running = True
+        accumulator = 0
+        last = perf_counter()
+        while self.running:
+            now = perf_counter()
+            accumulator = min(accumulator + now - last, self.period * self.max_catch_up)
+            last = now
+
+            while accumulator >= self.period and self.running:
+                self._tick()
+                accumulator -= self.period
+
+            sleep(max(self.period - accumulator, 0))
+
+    def _tick(self):
+        simulation = self.simulation
+        with simulation.profiler.cprofile_worker():
+            if self.callback is not None:
+                self.callback(simulation)
+            simulation.record_history()
+            simulation.update(self.dt, *self.input)
+
+        # The oldest buffer becomes the newest snapshot
+        with self.lock:
+            self.previous, self.current = self.current, self.previous
+            self.current[:] = self.engine.nodes.pos
+            for published, array in zip(self.state, frame_state(self.engine)):
+                published[:] = array
+            self.current_time = perf_counter()
+        self.ticks += 1
+
+    def interpolate(self, out=None):
+        with self.lock:
+            return self._interpolate(out)
+
+    def frame(self, out=None):
+        # Positions and state from the same tick, so springs never break or change color out of step
+        with self.lock:
+            positions = self._interpolate(out)
+            state = FrameState(*(array.copy() for array in self.state))
+        return positions, state
+
+    def _interpolate(self, out):
+        alpha = min((perf_counter() - self.current_time) / self.period, 1)
+        out = np.subtract(self.current, self.previous, out=out)
+        out *= alpha
+        out += self.previous
+        return out
+
+    def stop(self):
+        self.running = False
+        if self.is_alive():
+            self.join()
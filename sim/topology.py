@@ -0,0 +1,66 @@
+from collections import deque, namedtuple
+
+import numpy as np
+
+# A spring that broke: the tick it broke on, its index in the engine's SpringArrays and the force that broke it
+BreakEvent = namedtuple("BreakEvent", ["tick", "spring", "force"])
+
+
+class SpringTopology:
+    """
+    Tracks which springs of an engine are still intact.
+    Engines record breaks as they happen, which queues a BreakEvent for each of them, and at the
+    end of every tick the broken springs are compacted out of the live index array that the
+    spring, collision and coloring passes iterate over. Breaks the engine did not record (for
+    example from the per-object engine, or a replayed recording) are picked up by the compaction.
+    Attributes:
+        live (np.ndarray): Indices of the springs that were intact at the start of the tick.
+        broken_count (int): How many springs are broken.
+        events (collections.deque): Break events that have not been drained yet, oldest first.
+    Methods:
+        record(tick, indices, forces):
+            Queues break events for springs that just broke.
+        compact(tick):
+            Drops broken springs from the live set, recording any breaks that were missed.
+        drain():
+            Returns and clears the queued break events.
+        reset():
+            Rebuilds everything from the broken flags, after they were changed from outside.
+    """
+
+    def __init__(self, springs, max_events=10_000):
+        self.springs = springs
+        self.events = deque(maxlen=max_events)
+        self.reset()
+
+    def reset(self):
+        springs = self.springs
+        self.recorded = springs.broken.copy()
+        self.live = np.flatnonzero(~self.recorded)
+        self.broken_count = springs.size - self.live.size
+
+    def record(self, tick, indices, forces):
+        indices = np.asarray(indices, dtype=np.intp)
+        if indices.size == 0:
+            return
+        self.springs.broken[indices] = True
+        self.recorded[indices] = True
+        self.broken_count += indices.size
+        self.events.extend(map(BreakEvent, [tick] * indices.size, indices.tolist(), np.asarray(forces).tolist()))
+
+    def compact(self, tick):
+        springs = self.springs
+        broken = springs.broken[self.live]
+        if not broken.any():
+            return
+
+        missed = self.live[broken & ~self.recorded[self.live]]
+        if missed.size:
+            force = springs.total_force[missed]
+            self.record(tick, missed, np.hypot(force[:, 0], force[:, 1]))
+        self.live = self.live[~broken]
+
+    def drain(self):
+        events = list(self.events)
+        self.events.clear()
+        return events
@@ -0,0 +1,54 @@
+from collections import namedtuple
+
+import numpy as np
+
+from sim.constants import HEIGHT, WIDTH
+
+
+class WorldBounds(namedtuple("WorldBounds", ["left", "top", "right", "bottom"])):
+    """The walls nodes bounce off, independent of the window size."""
+
+    __slots__ = ()
+
+    @classmethod
+    def from_config(cls, config):
+        """The config's world_bounds, or the screen sized world of sim.constants when unset"""
+        bounds = getattr(config, "world_bounds", None)
+        return cls(0, 0, WIDTH, HEIGHT) if bounds is None else cls(*bounds)
+
+    @property
+    def width(self):
+        return self.right - self.left
+
+    @property
+    def height(self):
+        return self.bottom - self.top
+
+    def contains(self, other):
+        """Whether the rectangle other (left, top, right, bottom) lies inside these bounds"""
+        return self.left <= other[0] and self.top <= other[1] and other[2] <= self.right and other[3] <= self.bottom
+
+
+def collide_walls(nodes, indices, pos, vel, bounds, dt):
+    """
+    Pushes the given nodes back inside the bounds, in place on their pos and vel rows.
+    A node that went through a wall is moved back out by its penetration depth, its velocity
+    along the wall normal is reflected and scaled by its elasticity, and the velocity along the
+    wall is slowed by its friction.
+    """
+    radius = nodes.radius[indices]
+    # Wall collisions as (depth, axis, direction of the normal along that axis)
+    walls = (
+        (radius - (pos[:, 0] - bounds.left), 0, 1),
+        (pos[:, 0] + radius - bounds.right, 0, -1),
+        (radius - (pos[:, 1] - bounds.top), 1, 1),
+        (pos[:, 1] + radius - bounds.bottom, 1, -1),
+    )
+    for depth, axis, sign in walls:
+        hit = np.flatnonzero(depth > 0)
+        if hit.size == 0:
+            continue
+        node = indices[hit]
+        pos[hit, axis] += sign * depth[hit]
+        vel[hit, axis] *= -nodes.elasticity[node]
+        vel[hit, 1 - axis] *= np.exp(-nodes.friction[node] * dt)
@@ -0,0 +1,129 @@
+import numpy as np
+
+
+class XpbdSolver:
+    """
+    Extended position based dynamics constraints for the springs and pressurized bodies of an engine.
+    Every spring is a distance constraint with its desired_length as rest length and 1 / force as
+    compliance, so stiff springs become inextensible instead of unstable. Every pressurized body is
+    an area constraint around the (signed) area it had when the engine was built, with the gas law
+    stiffness pressure / area^2 as compliance.
+    Springs are split into color batches that share no nodes, so each batch is projected at once
+    without write conflicts. A spring breaks once its constraint force (lambda / dt^2) reaches its
+    max_force.
+    Attributes:
+        iterations (int): Constraint passes per substep.
+        coloring (SpringColoring): The color batches of the unbroken springs.
+        lambdas (np.ndarray): The accumulated multiplier of every spring in the last substep.
+    Methods:
+        solve(nodes, springs, dt):
+            Projects the predicted node positions onto the constraints, returning the springs that
+            broke and the forces that broke them.
+        damp(nodes, springs, dt):
+            Applies spring damping to the velocities derived from the projected positions.
+    """
+
+    def __init__(self, nodes, springs, pressure, coloring, iterations=1):
+        self.iterations = iterations
+        self.pressure = pressure
+        self.coloring = coloring
+        self.lambdas = np.zeros(springs.size)
+
+        bodies = pressure.bodies
+        self.rest_area = self._signed_area(nodes.pos, bodies.size)
+        self.body_lambdas = np.zeros(bodies.size)
+
+    def _signed_area(self, pos, count):
+        pressure = self.pressure
+        p1, p2 = pos[pressure.ring], pos[pressure.ring_next]
+        return np.bincount(pressure.ring_body, p1[:, 0] * p2[:, 1] - p2[:, 0] * p1[:, 1], count) / 2
+
+    def solve(self, nodes, springs, dt):
+        inverse_mass = np.where(nodes.static, 0.0, 1 / nodes.mass)
+        compliance = 1 / np.maximum(springs.force, 1e-12) / dt**2
+        self.lambdas[:] = 0
+        self.body_lambdas[:] = 0
+
+        for _ in range(self.iterations):
+            for batch in self.coloring.batches:
+                self._project_springs(nodes, springs, batch, inverse_mass, compliance)
+            self._project_areas(nodes, inverse_mass, dt)
+
+        # Constraint forces, and springs breaking under them
+        force = self.lambdas / dt**2
+        springs.total_force[:] = springs.last_direction * force[:, None]
+        snapped = np.flatnonzero((np.abs(force) >= springs.max_force) & ~springs.broken)
+        return snapped, np.abs(force[snapped])
+
+    def _project_springs(self, nodes, springs, batch, inverse_mass, compliance):
+        node1, node2 = springs.node1[batch], springs.node2[batch]
+        w1, w2 = inverse_mass[node1], inverse_mass[node2]
+        weight = w1 + w2
+        movable = weight > 0
+        batch, node1, node2, w1, w2, weight = (
+            batch[movable], node1[movable], node2[movable], w1[movable], w2[movable], weight[movable]
+        )
+
+        delta = nodes.pos[node2] - nodes.pos[node1]
+        distance = np.hypot(delta[:, 0], delta[:, 1])
+        moving = distance != 0
+        direction = springs.last_direction[batch]
+        direction[moving] = delta[moving] / distance[moving, None]
+        springs.last_direction[batch] = direction
+
+        alpha = compliance[batch]
+        constraint = distance - springs.desired_length[batch]
+        delta_lambda = (-constraint - alpha * self.lambdas[batch]) / (weight + alpha)
+        self.lambdas[batch] += delta_lambda
+
+        # No two springs in a batch share a node, so plain fancy indexing cannot lose updates
+        correction = direction * delta_lambda[:, None]
+        nodes.pos[node1] -= correction * w1[:, None]
+        nodes.pos[node2] += correction * w2[:, None]
+
+    def _project_areas(self, nodes, inverse_mass, dt):
+        pressure = self.pressure
+        bodies = pressure.bodies
+        if bodies.size == 0:
+            return
+
+        live = ~bodies.destroyed[pressure.ring_body]
+        ring, owner = pressure.ring[live], pressure.ring_body[live]
+        pos = nodes.pos
+        area = self._signed_area(pos, bodies.size)
+
+        # Gradient of the shoelace area with respect to every outline node
+        following, preceding = pos[pressure.ring_next[live]], pos[pressure.ring_previous[live]]
+        gradient = np.stack((following[:, 1] - preceding[:, 1], preceding[:, 0] - following[:, 0]), axis=1) / 2
+        w = inverse_mass[ring]
+        weight = np.bincount(owner, w * np.einsum("ij,ij->i", gradient, gradient), bodies.size)
+
+        alpha = np.divide(
+            self.rest_area**2, bodies.pressure, out=np.full(bodies.size, np.inf), where=bodies.pressure > 0
+        ) / dt**2
+        with np.errstate(divide="ignore", invalid="ignore"):
+            delta_lambda = (self.rest_area - area - alpha * self.body_lambdas) / (weight + alpha)
+        delta_lambda[~np.isfinite(delta_lambda) | bodies.destroyed] = 0
+        self.body_lambdas += delta_lambda
+
+        # Bodies are solved together, nodes shared between bodies take the sum of their corrections
+        correction = gradient * (w * delta_lambda[owner])[:, None]
+        np.add.at(pos, ring, correction)
+
+    def damp(self, nodes, springs, dt):
+        inverse_mass = np.where(nodes.static, 0.0, 1 / nodes.mass)
+        damping_factor = np.exp(-springs.damping * dt)
+        for batch in self.coloring.batches:
+            node1, node2 = springs.node1[batch], springs.node2[batch]
+            w1, w2 = inverse_mass[node1], inverse_mass[node2]
+            weight = w1 + w2
+            movable = weight > 0
+            batch, node1, node2 = batch[movable], node1[movable], node2[movable]
+            w1, w2, weight = w1[movable], w2[movable], weight[movable]
+
+            # Removes part of the relative velocity along the spring, shared by inverse mass
+            direction = springs.last_direction[batch]
+            relative_velocity = np.einsum("ij,ij->i", nodes.vel[node2] - nodes.vel[node1], direction)
+            change = direction * (relative_velocity * (damping_factor[batch] - 1) / weight)[:, None]
+            nodes.vel[node1] -= change * w1[:, None]
+            nodes.vel[node2] += change * w2[:, None]